@@ -0,0 +1 @@
+"""Benchmarks for the WhatsApp integration service."""
@@ -0,0 +1,109 @@
+"""
+Benchmark conversation history pages on a large synthetic dataset.
+
+Fills a conversation store with ``--messages`` messages spread over
+``--days`` day partitions and ``--contacts`` contacts, then times keyset
+pages at the head of a conversation and deep into it (after walking many
+pages back), and the retention job dropping the oldest partitions. Page
+latency should stay flat as the dataset grows.
+
+Usage:
+    python -m benchmarks.bench_conversations --messages 10000000 --days 30 --contacts 100000
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.report import latency_summary
+from src.conversations import ConversationStore, partition_day
+
+BATCH = 50000
+
+
+def _fill(store: ConversationStore, messages: int, days: int, contacts: int, hot_contact: str):
+    """Append the synthetic messages, one batch per group commit."""
+    now = time.time()
+    per_day = messages // days
+    for d in range(days):
+        day = partition_day(now - (days - 1 - d) * 86400)
+        for start in range(0, per_day, BATCH):
+            rows = []
+            for i in range(start, min(start + BATCH, per_day)):
+                # Every 100th message belongs to one busy contact, the rest are spread out
+                contact = hot_contact if i % 100 == 0 else f"+549110{random.randrange(contacts):07d}"
+                rows.append((
+                    f"wamid.{d}.{i}", contact, "inbound" if i % 2 else "outbound", "text",
+                    "Hola, quiero consultar por mi pedido", None, None, None, now
+                ))
+            store._append(rows, day)
+    
+    async def barrier():
+        await store._submit(lambda conn: None)
+    asyncio.run(barrier())
+
+
+async def _pages(store: ConversationStore, contact: str, pages: int, limit: int):
+    """Walk ``pages`` pages back and return the latency of each."""
+    latencies, cursor = [], None
+    for _ in range(pages):
+        start = time.perf_counter()
+        _, cursor = await store.page(contact, limit=limit, cursor=cursor)
+        latencies.append(time.perf_counter() - start)
+        if cursor is None:
+            break
+    return latencies
+
+
+async def _random_heads(store: ConversationStore, contacts: int, samples: int, limit: int):
+    latencies = []
+    for _ in range(samples):
+        contact = f"+549110{random.randrange(contacts):07d}"
+        start = time.perf_counter()
+        await store.page(contact, limit=limit)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main(messages: int, days: int, contacts: int, limit: int, pages: int):
+    hot_contact = "+5491100000000"
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConversationStore(str(Path(tmp) / "conversations.db"), max_batch=1, synchronous="OFF")
+        store.open()
+        try:
+            start = time.perf_counter()
+            _fill(store, messages, days, contacts, hot_contact)
+            fill_elapsed = time.perf_counter() - start
+            size_mb = sum(f.stat().st_size for f in Path(tmp).iterdir()) / 1e6
+            print(f"fill         messages={messages} partitions={days} elapsed={fill_elapsed:.1f}s size={size_mb:.0f}MB")
+            
+            walk = asyncio.run(_pages(store, hot_contact, pages, limit))
+            head, deep = walk[:10], walk[-10:]
+            for name, latencies in (("head", head), ("deep", deep)):
+                summary = latency_summary(latencies, sum(latencies))
+                print(f"{name:<12} pages={len(latencies)} p50={summary['p50_ms']}ms p99={summary['p99_ms']}ms")
+            summary = latency_summary(walk, sum(walk))
+            print(f"walk         pages={len(walk)} mean={summary['mean_ms']}ms p99={summary['p99_ms']}ms")
+            
+            randoms = asyncio.run(_random_heads(store, contacts, 1000, limit))
+            summary = latency_summary(randoms, sum(randoms))
+            print(f"random       pages={len(randoms)} p50={summary['p50_ms']}ms p99={summary['p99_ms']}ms")
+            
+            start = time.perf_counter()
+            dropped = asyncio.run(store.prune(retention_days=days // 2))
+            print(f"prune        partitions_dropped={dropped} elapsed={time.perf_counter() - start:.2f}s")
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=500)
+    args = parser.parse_args()
+    main(args.messages, args.days, args.contacts, args.limit, args.pages)
@@ -0,0 +1,64 @@
+"""
+Benchmark outbox append throughput with and without group commit.
+
+Many coroutines append single messages concurrently, the way webhook
+handlers do. With group commit the writer thread drains everything queued
+and commits it in one transaction; the baseline (``max_batch=1``) commits
+and fsyncs every message on its own.
+
+Usage:
+    python -m benchmarks.bench_outbox --messages 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from src.outbox import Outbox
+
+
+async def _run(outbox: Outbox, messages: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    payload = {
+        "channel": "whatsapp",
+        "sender": "+5491112345678",
+        "message": "Hola, quiero consultar por mi pedido",
+        "timestamp": "2025-10-05T12:00:00",
+        "message_type": "text"
+    }
+    
+    async def one(i: int):
+        async with semaphore:
+            await outbox.append([{**payload, "message_id": f"wamid.{i}"}])
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    return time.perf_counter() - start
+
+
+def main(messages: int, concurrency: int, synchronous: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, max_batch in (("per-message", 1), ("group", 1000)):
+            outbox = Outbox(str(Path(tmp) / f"{name}.db"), max_batch=max_batch, synchronous=synchronous)
+            outbox.open()
+            try:
+                elapsed = asyncio.run(_run(outbox, messages, concurrency))
+            finally:
+                outbox.close()
+            stats = outbox.stats()
+            print(
+                f"{name:<12} messages={messages} "
+                f"throughput={messages / elapsed:.0f}/s "
+                f"commits={stats['commits']} "
+                f"avg_ops_per_commit={stats['avg_ops_per_commit']:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--synchronous", default="FULL", choices=["OFF", "NORMAL", "FULL"])
+    args = parser.parse_args()
+    main(args.messages, args.concurrency, args.synchronous)
@@ -0,0 +1,102 @@
+"""
+Microbenchmark of the webhook parsing and normalization path.
+
+Compares, per inbound message, the previous path (``request.json()`` with
+the stdlib, validated ``NormalizedMessage``, two ``.dict()`` calls for
+logging and a hand-built dict serialized again for the core) with the fast
+path (raw bytes parsed by ``jsonutil``, ``model_construct`` and a single
+serialization).
+
+Usage:
+    python -m benchmarks.bench_parse --entries 5 --messages 4 --iterations 2000
+"""
+import argparse
+import json
+import os
+import time
+import warnings
+
+# Keep dedup and logging out of the measurement (must be set before importing src)
+os.environ.setdefault("DEDUP_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("LOG_FILE_LEVEL", "WARNING")
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+from benchmarks.payloads import webhook_payload
+from src import jsonutil
+from src.config import settings
+from src.models import NormalizedMessage
+from src.whatsapp_service import extract_messages, to_unified_message
+
+
+def _old_path(raw: bytes) -> int:
+    body = json.loads(raw)
+    count = 0
+    for entry in body.get("entry", []):
+        for change in entry.get("changes", []):
+            value = change.get("value", {})
+            for message in value.get("messages", []):
+                sender = message.get("from", "")
+                if not sender.startswith("+"):
+                    sender = f"+{sender}"
+                normalized = NormalizedMessage(
+                    channel="whatsapp",
+                    sender=sender,
+                    message=message.get("text", {}).get("body", ""),
+                    timestamp=str(message.get("timestamp")),
+                    message_id=message.get("id"),
+                    message_type=message.get("type", "text")
+                )
+                str(normalized.dict())
+                str(normalized.dict())
+                json.dumps({
+                    "channel": normalized.channel,
+                    "sender": normalized.sender,
+                    "message": normalized.message,
+                    "timestamp": normalized.timestamp,
+                    "message_id": normalized.message_id,
+                    "message_type": normalized.message_type
+                })
+                count += 1
+    return count
+
+
+def _fast_path(raw: bytes) -> int:
+    messages = extract_messages(jsonutil.loads(raw))
+    for message in messages:
+        jsonutil.dumps(to_unified_message(message))
+    return len(messages)
+
+
+def _measure(fn, raw: bytes, iterations: int) -> float:
+    messages = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        messages += fn(raw)
+    return (time.perf_counter() - start) / messages
+
+
+def main(entries: int, messages: int, iterations: int):
+    # Addressed to the default tenant, as production webhooks name a registered number
+    payload = webhook_payload(
+        entries=entries,
+        messages_per_entry=messages,
+        statuses_per_entry=messages * 2,
+        phone_number_id=settings.whatsapp_phone_number_id
+    )
+    raw = json.dumps(payload).encode("utf-8")
+    print(f"payload: {len(raw)} bytes, {entries * messages} messages, json backend: {jsonutil.BACKEND}")
+    
+    for name, fn in (("previous", _old_path), ("fast", _fast_path)):
+        fn(raw)  # warm-up
+        per_message = _measure(fn, raw, iterations)
+        print(f"{name:<9} {per_message * 1e6:8.2f} us/message")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.entries, args.messages, args.iterations)
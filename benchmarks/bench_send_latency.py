@@ -0,0 +1,85 @@
+"""
+Benchmark per-send latency with and without the pooled HTTP client.
+
+Runs a local mock Graph API and sends the same number of text messages
+through ``WhatsAppClient`` twice: once opening a fresh ``httpx.AsyncClient``
+per send (the previous behaviour) and once through the shared pool.
+
+Usage:
+    python -m benchmarks.bench_send_latency --sends 500 --concurrency 20
+
+Note that the mock is plain HTTP on localhost, so the gap measured here only
+covers TCP setup and client construction; against graph.facebook.com each
+fresh client also pays a full TLS handshake.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks import mock_servers
+from src.whatsapp_client import WhatsAppClient, create_http_client
+from benchmarks.report import percentile
+
+
+class _PerSendClient(httpx.AsyncClient):
+    """Mimics the old behaviour: every post opens and closes its own client."""
+    
+    async def post(self, *args, **kwargs):
+        async with httpx.AsyncClient() as client:
+            return await client.post(*args, **kwargs)
+
+
+async def _run(client: WhatsAppClient, sends: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            result = await client.send_text_message(f"+54911{i:08d}", "benchmark")
+            latencies.append(time.perf_counter() - start)
+            assert result["success"], result
+    
+    await asyncio.gather(*(one(i) for i in range(sends)))
+    return latencies
+
+
+def _summary(name: str, latencies: list, elapsed: float) -> str:
+    p99 = percentile(latencies, 99)
+    return (
+        f"{name:<10} sends={len(latencies)} "
+        f"mean={statistics.mean(latencies) * 1000:.2f}ms "
+        f"p50={statistics.median(latencies) * 1000:.2f}ms "
+        f"p99={p99 * 1000:.2f}ms "
+        f"throughput={len(latencies) / elapsed:.0f}/s"
+    )
+
+
+async def main(sends: int, concurrency: int, port: int):
+    base_url = f"http://127.0.0.1:{port}"
+    
+    for name, http_client in (("per-send", _PerSendClient()), ("pooled", create_http_client())):
+        client = WhatsAppClient(http_client=http_client)
+        client.base_url = base_url
+        await _run(client, min(sends, 20), concurrency)  # warm-up
+        start = time.perf_counter()
+        latencies = await _run(client, sends, concurrency)
+        print(_summary(name, latencies, time.perf_counter() - start))
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sends", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+    
+    server = mock_servers.run_in_thread(mock_servers.create_graph_api(mock_servers.Behaviour()), port=args.port)
+    try:
+        asyncio.run(main(args.sends, args.concurrency, args.port))
+    finally:
+        server.should_exit = True
@@ -0,0 +1,47 @@
+"""
+Benchmark X-Hub-Signature-256 verification overhead per webhook request.
+
+Usage:
+    python -m benchmarks.bench_signature --iterations 20000
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import time
+
+from benchmarks.payloads import webhook_payload
+from src import jsonutil
+from src.signature import verify_signature
+
+SECRET = b"benchmark_app_secret"
+
+
+def main(iterations: int):
+    for entries in (1, 10, 100):
+        raw = json.dumps(webhook_payload(entries=entries, messages_per_entry=2, statuses_per_entry=2)).encode()
+        header = "sha256=" + hmac.new(SECRET, raw, hashlib.sha256).hexdigest()
+        forged = "sha256=" + "0" * 64
+        
+        timings = {}
+        for name, fn in (
+            ("verify", lambda: verify_signature(raw, header, SECRET)),
+            ("reject", lambda: verify_signature(raw, forged, SECRET)),
+            ("parse", lambda: jsonutil.loads(raw))
+        ):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            timings[name] = (time.perf_counter() - start) / iterations * 1e6
+        
+        print(
+            f"{len(raw):>7} bytes  verify={timings['verify']:.2f}us  "
+            f"reject={timings['reject']:.2f}us  json_parse={timings['parse']:.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,127 @@
+"""
+Local stand-ins for the Graph API and the Core API used by benchmarks.
+
+Both servers accept configurable latency and error injection so scenarios
+can reproduce slow or flaky upstreams.
+
+Usage (standalone):
+    python -m benchmarks.mock_servers --graph-port 8900 --core-port 8901 --latency-ms 20 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class Behaviour:
+    """Latency and error injection for a mock server."""
+    
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    
+    async def apply(self):
+        """Sleep for the configured latency."""
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+    
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+def create_graph_api(behaviour: Behaviour) -> FastAPI:
+    """Mock of the Cloud API ``/{phone_number_id}/messages`` endpoint."""
+    app = FastAPI(title="Mock Graph API")
+    app.state.requests = 0
+    
+    @app.post("/{phone_number_id}/messages")
+    async def messages(phone_number_id: str):
+        app.state.requests += 1
+        await behaviour.apply()
+        if behaviour.should_fail():
+            return JSONResponse(
+                status_code=behaviour.error_status,
+                content={"error": {"message": "Service unavailable", "code": 131016}}
+            )
+        return {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": "0", "wa_id": "0"}],
+            "messages": [{"id": f"wamid.{uuid.uuid4().hex}"}]
+        }
+    
+    return app
+
+
+def create_core_api(behaviour: Behaviour, path: str = "/api/v1/messages/unified") -> FastAPI:
+    """Mock of the Core API unified endpoint and its batch variant."""
+    app = FastAPI(title="Mock Core API")
+    app.state.messages = 0
+    
+    @app.post(path)
+    async def unified(request: Request):
+        await request.body()
+        app.state.messages += 1
+        await behaviour.apply()
+        if behaviour.should_fail():
+            return JSONResponse(status_code=behaviour.error_status, content={"status": "error"})
+        return {"status": "received"}
+    
+    @app.post(f"{path}/batch")
+    async def unified_batch(request: Request):
+        items = await request.json()
+        app.state.messages += len(items)
+        await behaviour.apply()
+        return {"results": [{"success": not behaviour.should_fail()} for _ in items]}
+    
+    return app
+
+
+def run_in_thread(app, host: str = "127.0.0.1", port: int = 8900) -> uvicorn.Server:
+    """
+    Start a uvicorn server for the given app in a daemon thread.
+    
+    Args:
+        app: ASGI application to serve
+        host: Interface to bind
+        port: Port to bind
+        
+    Returns:
+        The running server (set ``should_exit = True`` to stop it)
+    """
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the mock Graph API and Core API")
+    parser.add_argument("--graph-port", type=int, default=8900)
+    parser.add_argument("--core-port", type=int, default=8901)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    
+    behaviour = Behaviour(args.latency_ms, args.jitter_ms, args.error_rate)
+    run_in_thread(create_graph_api(behaviour), port=args.graph_port)
+    run_in_thread(create_core_api(behaviour), port=args.core_port)
+    print(f"Graph API on :{args.graph_port}, Core API on :{args.core_port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
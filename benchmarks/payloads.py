@@ -0,0 +1,76 @@
+"""Generator of realistic Meta webhook payloads for benchmarks."""
+import itertools
+import random
+import time
+from typing import Any, Dict, Iterator, List
+
+_counter = itertools.count()
+
+MESSAGE_TYPES = ("text", "text", "text", "text", "image", "audio", "document")
+
+
+def _message(sender: str, message_type: str) -> Dict[str, Any]:
+    message = {
+        "from": sender,
+        "id": f"wamid.bench{next(_counter):012d}",
+        "timestamp": str(int(time.time())),
+        "type": message_type
+    }
+    if message_type == "text":
+        message["text"] = {"body": "Hola, quisiera saber el estado de mi pedido número 12345"}
+    elif message_type == "image":
+        message["image"] = {"id": "1234567890", "mime_type": "image/jpeg", "sha256": "abc", "caption": "Foto"}
+    else:
+        message[message_type] = {"id": "1234567890", "mime_type": "application/octet-stream"}
+    return message
+
+
+def _status(message_id: str, status: str, recipient: str) -> Dict[str, Any]:
+    return {
+        "id": message_id,
+        "status": status,
+        "timestamp": str(int(time.time())),
+        "recipient_id": recipient
+    }
+
+
+def webhook_payload(
+    entries: int = 1,
+    messages_per_entry: int = 1,
+    statuses_per_entry: int = 0,
+    senders: int = 1000,
+    phone_number_id: str = "PHONE_ID"
+) -> Dict[str, Any]:
+    """
+    Build one webhook payload as Meta sends it.
+    
+    Args:
+        entries: Number of ``entry`` items
+        messages_per_entry: Inbound messages per entry
+        statuses_per_entry: Status updates per entry
+        senders: Size of the simulated sender population
+        phone_number_id: Business phone number id in the metadata
+    """
+    payload_entries: List[Dict[str, Any]] = []
+    for _ in range(entries):
+        sender = f"54911{random.randrange(senders):08d}"
+        value: Dict[str, Any] = {
+            "messaging_product": "whatsapp",
+            "metadata": {"display_phone_number": "15551234567", "phone_number_id": phone_number_id},
+            "contacts": [{"profile": {"name": "Bench User"}, "wa_id": sender}]
+        }
+        if messages_per_entry:
+            value["messages"] = [_message(sender, random.choice(MESSAGE_TYPES)) for _ in range(messages_per_entry)]
+        if statuses_per_entry:
+            value["statuses"] = [
+                _status(f"wamid.out{next(_counter):012d}", random.choice(("sent", "delivered", "read")), sender)
+                for _ in range(statuses_per_entry)
+            ]
+        payload_entries.append({"id": "WABA_ID", "changes": [{"value": value, "field": "messages"}]})
+    return {"object": "whatsapp_business_account", "entry": payload_entries}
+
+
+def webhook_stream(count: int, **kwargs) -> Iterator[Dict[str, Any]]:
+    """Yield ``count`` independent webhook payloads."""
+    for _ in range(count):
+        yield webhook_payload(**kwargs)
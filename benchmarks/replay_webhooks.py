@@ -0,0 +1,127 @@
+"""
+Replay captured webhook traffic against a service instance.
+
+Reads the files written by the webhook capture mode
+(``WEBHOOK_CAPTURE_ENABLED=true``) and re-posts every request, with its
+original signature header, keeping the original gaps between arrivals
+divided by ``--speed`` (``--speed 0`` sends as fast as ``--concurrency``
+allows). Reports throughput, latency percentiles, status codes and how far
+the replay fell behind the captured schedule.
+
+Usage:
+    python -m benchmarks.replay_webhooks data/captures --speed 10 --output replay.json
+    python -m benchmarks.replay_webhooks data/captures --speed 0 --baseline replay.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import httpx
+
+from benchmarks.report import build_report, compare, latency_summary, percentile, write_report
+from src.webhook_capture import read_capture
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    records: Iterable[Tuple[float, Optional[str], bytes]],
+    url: str = "/webhook/whatsapp",
+    speed: float = 1.0,
+    concurrency: int = 50,
+    limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Post captured requests on their original schedule.
+    
+    Args:
+        client: HTTP client to send with
+        records: Captured (arrival epoch, signature, body) records, in arrival order
+        url: Webhook URL
+        speed: Schedule speed-up (1 = real time, 0 = no waiting)
+        concurrency: Maximum requests in flight
+        limit: Stop after this many requests
+        
+    Returns:
+        Latency summary with status code counts and schedule lag
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    lags = []
+    statuses: Counter = Counter()
+    
+    async def one(body: bytes, signature: Optional[str]):
+        headers = {"Content-Type": "application/json"}
+        if signature:
+            headers["X-Hub-Signature-256"] = signature
+        try:
+            sent = time.perf_counter()
+            response = await client.post(url, content=body, headers=headers)
+            latencies.append(time.perf_counter() - sent)
+            statuses[str(response.status_code)] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        finally:
+            semaphore.release()
+    
+    tasks = []
+    first_arrival = None
+    start = time.perf_counter()
+    for arrived_at, signature, body in records:
+        if limit is not None and len(tasks) >= limit:
+            break
+        if first_arrival is None:
+            first_arrival = arrived_at
+        if speed > 0:
+            due = start + (arrived_at - first_arrival) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await semaphore.acquire()
+        if speed > 0:
+            lags.append(max(0.0, time.perf_counter() - due))
+        tasks.append(asyncio.create_task(one(body, signature)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    
+    result = latency_summary(latencies, elapsed)
+    result["statuses"] = dict(statuses)
+    if lags:
+        result["lag_p99_ms"] = round(percentile(lags, 99) * 1000, 3)
+        result["lag_max_ms"] = round(max(lags) * 1000, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("capture", help="Capture directory or file")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/webhook/whatsapp", help="Webhook URL")
+    parser.add_argument("--speed", type=float, default=1.0, help="Schedule speed-up (1, 10, ...; 0 = as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--output", default="replay_report.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Previous report to compare against")
+    args = parser.parse_args()
+    
+    async def run() -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+            return await replay(client, read_capture(args.capture), args.url, args.speed, args.concurrency, args.limit)
+    
+    scenarios = {f"replay_x{args.speed:g}" if args.speed else "replay_max": asyncio.run(run())}
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "baseline")}
+    report = build_report(scenarios, config)
+    write_report(report, args.output)
+    print(json.dumps(scenarios, indent=2))
+    print(f"Report written to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            for line in compare(json.load(f), report):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Latency statistics and machine-readable benchmark reports."""
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(latencies: Sequence[float], elapsed: float) -> Dict[str, float]:
+    """Summarize per-request latencies (seconds) into milliseconds and throughput."""
+    count = len(latencies)
+    return {
+        "requests": count,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3) if count else 0.0
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_report(scenarios: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap scenario results with environment metadata."""
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": config,
+        "scenarios": scenarios
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], keys: List[str] = None) -> List[str]:
+    """
+    Compare two reports scenario by scenario.
+    
+    Returns:
+        Human readable lines with the relative change of each metric
+    """
+    keys = keys or ["throughput_per_s", "p50_ms", "p99_ms"]
+    lines = []
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            continue
+        for key in keys:
+            if key in result and old.get(key):
+                change = (result[key] - old[key]) / old[key] * 100
+                lines.append(f"{name:<22} {key:<18} {old[key]:>10} -> {result[key]:>10} ({change:+.1f}%)")
+    return lines
+
+
+def write_report(report: Dict[str, Any], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,168 @@
+"""
+Reproducible load-test suite for the WhatsApp integration service.
+
+Starts a mock Graph API, a mock Core API and the real service (in-process,
+over real HTTP on localhost), then runs the scenarios below and writes a
+JSON report that can be diffed between releases.
+
+Scenarios:
+    webhook_single     POST /webhook/whatsapp, one message per payload
+    webhook_multi      POST /webhook/whatsapp, multi-entry payloads with statuses
+    send_text          POST /send/whatsapp through the Cloud API client
+    send_bulk          POST /send/whatsapp/bulk with one large NDJSON body
+
+Usage:
+    python -m benchmarks.run_suite --requests 2000 --concurrency 50 --output report.json
+    python -m benchmarks.run_suite --baseline previous.json --core-latency-ms 20 --async-webhooks
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List
+
+GRAPH_PORT = 8910
+CORE_PORT = 8911
+SERVICE_PORT = 8912
+
+
+def _configure_environment(args):
+    """Point the service at the mock servers before its modules are imported."""
+    os.environ.update({
+        "WHATSAPP_API_BASE_URL": f"http://127.0.0.1:{GRAPH_PORT}",
+        "CORE_API_URL": f"http://127.0.0.1:{CORE_PORT}/api/v1/messages/unified",
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE_LEVEL": "WARNING",
+        "RATE_LIMIT_ENABLED": str(not args.no_rate_limit),
+        "WEBHOOK_ASYNC_PROCESSING": str(args.async_webhooks),
+        "CORE_BATCH_ENABLED": str(args.core_batch),
+        "DEDUP_ENABLED": "false"
+    })
+
+
+async def _load(
+    client,
+    requests: int,
+    concurrency: int,
+    make_request: Callable[[int], Any]
+) -> Dict[str, float]:
+    """Run ``requests`` calls with bounded concurrency and summarize latencies."""
+    from benchmarks.report import latency_summary
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    summary = latency_summary(latencies, time.perf_counter() - start)
+    summary["errors"] = errors
+    return summary
+
+
+async def _run_scenarios(args) -> Dict[str, Any]:
+    import httpx
+    from benchmarks.payloads import webhook_payload
+    
+    base = f"http://127.0.0.1:{SERVICE_PORT}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results: Dict[str, Any] = {}
+    
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        single = [webhook_payload(senders=args.senders) for _ in range(args.requests)]
+        results["webhook_single"] = await _load(
+            client, args.requests, args.concurrency,
+            lambda i: client.post("/webhook/whatsapp", json=single[i])
+        )
+        results["webhook_single"]["messages_per_s"] = results["webhook_single"]["throughput_per_s"]
+        
+        multi = [
+            webhook_payload(entries=3, messages_per_entry=3, statuses_per_entry=6, senders=args.senders)
+            for _ in range(args.requests // 4 or 1)
+        ]
+        results["webhook_multi"] = await _load(
+            client, len(multi), args.concurrency,
+            lambda i: client.post("/webhook/whatsapp", json=multi[i])
+        )
+        results["webhook_multi"]["messages_per_s"] = round(results["webhook_multi"]["throughput_per_s"] * 9, 2)
+        
+        results["send_text"] = await _load(
+            client, args.requests, args.concurrency,
+            lambda i: client.post("/send/whatsapp", json={"to": f"+54911{i:08d}", "message": "Benchmark"})
+        )
+        
+        body = "".join(
+            json.dumps({"to": f"+54922{i:08d}", "message": "Benchmark"}) + "\n" for i in range(args.requests)
+        )
+        start = time.perf_counter()
+        response = await client.post(
+            "/send/whatsapp/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        elapsed = time.perf_counter() - start
+        summary = json.loads(response.text.strip().splitlines()[-1])["summary"]
+        results["send_bulk"] = {
+            "requests": summary["total"],
+            "succeeded": summary["succeeded"],
+            "elapsed_s": round(elapsed, 4),
+            "throughput_per_s": round(summary["total"] / elapsed, 2)
+        }
+    
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite against mock upstreams")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--senders", type=int, default=1000, help="Simulated sender population")
+    parser.add_argument("--graph-latency-ms", type=float, default=5.0)
+    parser.add_argument("--core-latency-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected upstream error rate")
+    parser.add_argument("--async-webhooks", action="store_true", help="Enable background webhook processing")
+    parser.add_argument("--core-batch", action="store_true", help="Enable batched Core API forwarding")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Disable the outbound rate limiter")
+    parser.add_argument("--output", default="bench_report.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Previous report to compare against")
+    args = parser.parse_args()
+    
+    _configure_environment(args)
+    
+    from benchmarks.mock_servers import Behaviour, create_core_api, create_graph_api, run_in_thread
+    from benchmarks.report import build_report, compare, write_report
+    from src.whatsapp_service import app
+    
+    servers = [
+        run_in_thread(create_graph_api(Behaviour(args.graph_latency_ms, error_rate=args.error_rate)), port=GRAPH_PORT),
+        run_in_thread(create_core_api(Behaviour(args.core_latency_ms, error_rate=args.error_rate)), port=CORE_PORT),
+        run_in_thread(app, port=SERVICE_PORT)
+    ]
+    try:
+        scenarios = asyncio.run(_run_scenarios(args))
+    finally:
+        for server in servers:
+            server.should_exit = True
+    
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "baseline")}
+    report = build_report(scenarios, config)
+    write_report(report, args.output)
+    print(json.dumps(scenarios, indent=2))
+    print(f"Report written to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            for line in compare(json.load(f), report):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
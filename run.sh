@@ -30,7 +30,7 @@ fi
 mkdir -p logs
 
 echo "✅ Servicio iniciado en: http://localhost:8000"
-echo "📝 Logs en: logs/whatsapp_service_$(date +%Y%m%d).log"
+echo "📝 Logs en: logs/whatsapp_service.log (rotación diaria)"
 echo ""
 echo "Endpoints disponibles:"
 echo "  - GET  http://localhost:8000/              (Health check)"
@@ -43,5 +43,5 @@ echo "━━━━━━━━━━━━━━━━━━━━━━━━
 echo ""
 
 # Ejecutar el servicio
-poetry run python -m src.whatsapp_service
+poetry run python -m src.whatsapp_service --reload
 
@@ -0,0 +1,173 @@
+"""Concurrency-limited fan-out for bulk WhatsApp sends."""
+import asyncio
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Union
+import anyio
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from src import jsonutil
+from src.models import SendMessageRequest, SendMessageResponse
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# A bulk item is either an already decoded object or a raw NDJSON line
+BulkItem = Union[Dict[str, Any], bytes]
+
+
+async def iter_list(items: Iterable[Dict[str, Any]]) -> AsyncIterator[BulkItem]:
+    """Adapt a decoded JSON array to the async item stream used by ``fan_out``."""
+    for item in items:
+        yield item
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], body_read: Optional[asyncio.Event] = None) -> AsyncIterator[BulkItem]:
+    """
+    Split a streamed request body into NDJSON lines without buffering it all.
+    
+    Args:
+        chunks: Raw body chunks (e.g. ``request.stream()``)
+        body_read: Event set once the whole body has been received
+        
+    Yields:
+        Non-empty lines as bytes
+    """
+    async def next_chunk() -> Optional[bytes]:
+        async for chunk in chunks:
+            if chunk:
+                return chunk
+        return None
+    
+    buffer = b""
+    chunk = await next_chunk()
+    while chunk is not None:
+        # Read one chunk ahead, so the end of the body is known before the
+        # lines of the last chunk are handed out
+        following = await next_chunk()
+        if following is None and body_read is not None:
+            body_read.set()
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+        chunk = following
+    if body_read is not None:
+        body_read.set()
+    if buffer.strip():
+        yield buffer
+
+
+async def _send_one(
+    index: int,
+    item: BulkItem,
+    send: Callable[[SendMessageRequest], Awaitable[SendMessageResponse]]
+) -> Dict[str, Any]:
+    """Validate and send one bulk item, never raising."""
+    result: Dict[str, Any] = {"index": index}
+    try:
+        data = jsonutil.loads(item) if isinstance(item, bytes) else item
+        request = SendMessageRequest.model_validate(data)
+        result["to"] = request.to
+        response = await send(request)
+        result.update(success=response.success, message_id=response.message_id, error=response.error)
+    except ValidationError as e:
+        result.update(success=False, error=f"Invalid send request: {e.errors()}")
+    except ValueError as e:
+        result.update(success=False, error=f"Invalid JSON: {str(e)}")
+    except HTTPException as e:
+        result.update(success=False, error=e.detail)
+    except Exception as e:
+        logger.error("Bulk send item %s failed: %s", index, e)
+        result.update(success=False, error=str(e))
+    return result
+
+
+async def fan_out(
+    items: AsyncIterator[BulkItem],
+    send: Callable[[SendMessageRequest], Awaitable[SendMessageResponse]],
+    concurrency: int
+) -> AsyncIterator[bytes]:
+    """
+    Send items with at most ``concurrency`` in flight, streaming results.
+    
+    The next item is only read once a slot is free, so memory stays flat
+    regardless of how many items the caller streams in.
+    
+    Args:
+        items: Stream of bulk items
+        send: Coroutine function performing one send
+        concurrency: Maximum concurrent sends
+        
+    Yields:
+        One NDJSON line per item, in completion order, then a summary line
+    """
+    pending = set()
+    total = succeeded = 0
+    
+    def line(result: Dict[str, Any]) -> bytes:
+        return jsonutil.dumps(result) + b"\n"
+    
+    try:
+        index = 0
+        async for item in items:
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    total += 1
+                    succeeded += result["success"]
+                    yield line(result)
+            pending.add(asyncio.create_task(_send_one(index, item, send)))
+            index += 1
+        
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                total += 1
+                succeeded += result["success"]
+                yield line(result)
+        
+        logger.info("Bulk send finished: %s/%s succeeded", succeeded, total)
+        yield line({"summary": {"total": total, "succeeded": succeeded, "failed": total - succeeded}})
+    finally:
+        # Client went away: do not leave orphaned sends running
+        for task in pending:
+            task.cancel()
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that may keep reading the request body while streaming.
+    
+    The stock StreamingResponse listens for client disconnects by calling
+    ``receive()`` concurrently, which would steal the request body chunks a
+    streamed NDJSON upload still needs. Here the body iterator is the only
+    consumer of ``receive()`` until it sets ``body_read``; from then on
+    ``receive()`` is watched for the disconnect, which cancels the stream
+    (and with it the sends still in flight).
+    """
+    
+    media_type = "application/x-ndjson"
+    
+    def __init__(self, content: AsyncIterator[bytes], body_read: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+    
+    async def _listen_after_body(self, receive):
+        await self.body_read.wait()
+        await self.listen_for_disconnect(receive)
+    
+    async def __call__(self, scope, receive, send):
+        async with anyio.create_task_group() as task_group:
+            async def wrap(func: Callable[[], Awaitable[None]]):
+                await func()
+                task_group.cancel_scope.cancel()
+            
+            task_group.start_soon(wrap, partial(self.stream_response, send))
+            await wrap(partial(self._listen_after_body, receive))
+        
+        if self.background is not None:
+            await self.background()
@@ -11,13 +11,30 @@ class Settings(BaseSettings):
     whatsapp_phone_number_id: str = "DEMO_PHONE_ID"
     whatsapp_verify_token: str = "my_verify_token_123"
     whatsapp_business_account_id: str = "DEMO_BUSINESS_ID"
+    whatsapp_app_secret: Optional[str] = None  # When set, webhook POSTs must carry a valid X-Hub-Signature-256
+    
+    # Additional business numbers served by this process: JSON list of
+    # {"phone_number_id", "access_token", "name", "core_api_url", "messages_per_second"}
+    tenants_file: Optional[str] = None
     
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    api_workers: Optional[int] = None  # Worker processes; 0 = one per CPU. Default: 1, or one per CPU with a shared state backend
+    api_reload: bool = False  # Development auto-reload (forces a single process)
+    
+    # State shared between worker processes (dedup claims and rate limit buckets)
+    shared_state_backend: str = "memory"  # "memory" (single process), "sqlite" (one host) or "redis"
+    shared_state_path: str = "data/shared_state.db"
+    shared_state_redis_url: Optional[str] = None  # e.g. "redis://localhost:6379/0"; requires the "redis" package
     
     # Logging
     log_level: str = "INFO"
+    log_file_level: str = "INFO"  # Set to DEBUG to record full payloads in the log file
+    log_format: str = "text"  # "text" or "json" (one JSON object per line)
+    log_dir: str = "logs"
+    log_to_file: bool = True  # Turned off for multi-worker runs, which log to stdout only
+    log_retention_days: int = 14
     
     # WhatsApp API Base URL
     whatsapp_api_base_url: str = "https://graph.facebook.com/v18.0"
@@ -25,6 +42,121 @@ class Settings(BaseSettings):
     # Core API URL for forwarding normalized messages
     core_api_url: str = "http://localhost:8003/api/v1/messages/unified"
     
+    # Send the "reply" the core may return in its response to a forwarded message
+    core_replies_enabled: bool = False
+    core_reply_shards: int = 16  # Replies are sent in order per sender, concurrently across shards
+
+    # Outbound HTTP connection pool (shared by all WhatsApp API calls)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_timeout: float = 30.0
+    http_enable_http2: bool = False  # Requires the optional "h2" package
+    
+    # Asynchronous webhook processing (ack Meta first, process in background workers)
+    webhook_async_processing: bool = False
+    webhook_queue_maxsize: int = 10000
+    webhook_workers: int = 4
+    webhook_drain_timeout: float = 10.0
+    
+    # Batched forwarding to the Core API
+    core_batch_enabled: bool = False
+    core_batch_url: Optional[str] = None  # Defaults to "<core_api_url>/batch"
+    core_batch_max_size: int = 100
+    core_batch_max_wait_ms: float = 50.0
+    
+    # Per-sender ordered forwarding: each sender's messages reach the core one
+    # at a time and in order, different senders in parallel across shards
+    ordered_forwarding_enabled: bool = False
+    ordered_forwarding_shards: int = 64
+    
+    # Durable outbox for Core API forwarding
+    outbox_enabled: bool = False
+    outbox_path: str = "data/outbox.db"
+    outbox_synchronous: str = "FULL"  # SQLite synchronous pragma: FULL survives power loss
+    outbox_queue_max_wait: float = 30.0  # Queued deliveries older than this leave their entries to the retrier
+    outbox_inflight_grace: Optional[float] = None  # Seconds before the retrier may pick up a fresh entry (default: derived)
+    outbox_retry_poll_interval: float = 1.0
+    outbox_retry_base_delay: float = 1.0
+    outbox_retry_max_delay: float = 300.0
+    outbox_max_attempts: int = 10
+    outbox_retention: float = 604800  # Seconds delivered and dead entries are kept (7 days)
+    outbox_prune_interval: float = 3600.0
+    
+    # Webhook message-id deduplication (Meta redelivers events for up to 7 days)
+    dedup_enabled: bool = True
+    dedup_max_entries: int = 100000
+    dedup_ttl: float = 604800
+    dedup_persist_path: Optional[str] = None  # e.g. "data/dedup.db" to survive restarts
+    dedup_flush_interval: float = 1.0
+    
+    # Message status tracking (sent/delivered/read/failed receipts)
+    status_store_enabled: bool = False
+    status_store_path: str = "data/status.db"
+    status_store_synchronous: str = "NORMAL"  # Receipts are re-sent by Meta, so skip the fsync per commit
+    status_store_retention: float = 2592000  # Seconds a status is kept after its last update (30 days)
+    status_store_prune_interval: float = 3600.0
+    
+    # Conversation history (inbound and outbound messages, one partition per UTC day)
+    conversations_enabled: bool = False
+    conversations_path: str = "data/conversations.db"
+    conversations_retention_days: int = 90  # Whole day partitions older than this are dropped
+    conversations_prune_interval: float = 3600.0
+    
+    # Inbound media download (media ids resolved and cached locally before forwarding)
+    media_download_enabled: bool = False
+    media_cache_dir: str = "data/media"
+    media_workers: int = 2  # Separate from the webhook workers so large videos don't stall text
+    media_queue_maxsize: int = 1000
+    media_max_bytes: int = 104857600  # 100 MB
+    media_download_timeout: float = 25.0  # Counted in the outbox in-flight grace
+    media_chunk_size: int = 65536
+    
+    # Outbound media upload reuse (images are uploaded once and sent by media id)
+    media_upload_enabled: bool = False
+    media_upload_ttl: float = 2505600  # 29 days; Meta keeps uploaded media for 30
+    media_upload_max_entries: int = 10000
+    
+    # Message templates (fetched from each business account and compiled on first use)
+    template_refresh_interval: float = 3600.0  # Seconds before cached templates are refreshed in the background
+    template_miss_refresh_interval: float = 60.0  # Minimum seconds between refreshes triggered by unknown templates
+    template_cache_dir: Optional[str] = "data/templates"  # Last fetched definitions, used if the Graph API is down at startup
+    
+    # 24-hour customer service window: free-form (non-template) messages only reach
+    # customers who wrote in the last 24 hours, so closed-window sends can be
+    # answered without calling Meta
+    service_window_policy: str = "off"  # "off" (track only), "reject" or "template"
+    service_window_template: Optional[str] = None  # Template sent instead under "template"; its single body parameter receives the text
+    service_window_template_language: Optional[str] = None
+    service_window_max_entries: int = 1000000
+    service_window_persist_path: str = "data/service_windows.db"  # Reloaded on startup when a policy is active
+    service_window_flush_interval: float = 5.0
+    
+    # Raw webhook capture for replay with benchmarks/replay_webhooks.py.
+    # Captured payloads contain customer messages: enable only for a bounded period
+    webhook_capture_enabled: bool = False
+    webhook_capture_dir: str = "data/captures"
+    webhook_capture_rotate_bytes: int = 268435456  # Uncompressed bytes per file (256 MB)
+    webhook_capture_max_files: int = 20
+    
+    # Bulk send endpoint
+    bulk_send_concurrency: int = 50
+    
+    # Outbound rate limiting (Cloud API throughput and pair rate limits)
+    rate_limit_enabled: bool = True
+    rate_limit_messages_per_second: float = 80.0
+    rate_limit_burst: float = 80.0
+    rate_limit_pair_messages_per_second: float = 1 / 6  # One message every 6 seconds per recipient
+    rate_limit_pair_burst: float = 45.0
+    
+    # Retries and circuit breaker for Cloud API calls
+    retry_max_attempts: int = 3
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 10.0
+    retry_deadline: float = 45.0  # Total time budget per send, including retries
+    circuit_breaker_failure_threshold: int = 5
+    circuit_breaker_reset_timeout: float = 30.0
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -0,0 +1,300 @@
+"""Conversation history: inbound and outbound messages, partitioned by day."""
+import re
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.logger import get_logger
+from src.sqlite_store import GroupCommitStore
+
+logger = get_logger(__name__)
+
+DIRECTION_INBOUND = "inbound"
+DIRECTION_OUTBOUND = "outbound"
+
+COLUMNS = (
+    "message_id", "contact", "direction", "message_type", "body",
+    "media_id", "phone_number_id", "timestamp", "recorded_at"
+)
+
+PARTITION_PREFIX = "messages_"
+PARTITION_NAME = re.compile(r"^messages_(\d{8})$")
+
+# Free pages returned to the file system per writer transaction while pruning
+VACUUM_CHUNK = 5000
+
+INSERT = f"INSERT OR IGNORE INTO {{table}} ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def partition_day(epoch: float) -> str:
+    """Return the UTC day (YYYYMMDD) of an epoch, which names its partition."""
+    return time.strftime("%Y%m%d", time.gmtime(epoch))
+
+
+def _partition_ddl(day: str) -> List[str]:
+    table = PARTITION_PREFIX + day
+    return [
+        f"CREATE TABLE IF NOT EXISTS {table} (seq INTEGER PRIMARY KEY, {', '.join(COLUMNS)})",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_contact ON {table} (contact)",
+        f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_message_id ON {table} (message_id)"
+    ]
+
+
+def _list_partitions(conn: sqlite3.Connection) -> List[str]:
+    """Return the days with a partition in the database, oldest first."""
+    return sorted(
+        match.group(1)
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        if (match := PARTITION_NAME.match(name))
+    )
+
+
+def _contact(phone: str) -> str:
+    """Normalize a phone number to the "+<digits>" form used for inbound senders."""
+    return "+" + phone.lstrip("+")
+
+
+def parse_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Split a pagination cursor into its partition day and sequence number.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    day, _, seq = cursor.partition(".")
+    if len(day) != 8 or not day.isdigit() or not seq.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return day, int(seq)
+
+
+class ConversationStore(GroupCommitStore):
+    """
+    Append-only log of every message exchanged with each contact.
+    
+    Messages go to one table per UTC day, indexed by contact and by wamid.
+    A page of a conversation walks the day tables from newest to oldest with
+    a keyset condition (``seq < cursor``) on the contact index, so its cost
+    depends on the page size and the number of days kept, never on the
+    total number of messages. Retention drops whole day tables instead of
+    deleting rows, and the freed pages are returned with an incremental
+    vacuum.
+    
+    Writes are queued without waiting and group-committed by the writer
+    thread; reads run on a small pool of read-only connections so a long
+    page query never holds up the writer. Reads and pruning list the day
+    tables from the database each time, so partitions created or dropped
+    by other worker processes sharing the file are seen.
+    """
+    
+    NAME = "conversation store"
+    
+    def __init__(self, path: str, max_batch: int = 1000, synchronous: str = "NORMAL", readers: int = 2):
+        super().__init__(path, max_batch=max_batch, synchronous=synchronous, readers=readers)
+        self._partitions: List[str] = []
+        self.recorded = 0
+        self.pages = 0
+        self.partitions_dropped = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = super()._connect()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Switching a database to incremental auto-vacuum needs a VACUUM,
+            # which is only cheap while it is still empty
+            if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+            else:
+                logger.warning("Conversation store %s was created without auto-vacuum; pruned space is reused but not released", self.path)
+        self._partitions = _list_partitions(conn)
+        return conn
+    
+    @property
+    def partitions(self) -> List[str]:
+        """Days (YYYYMMDD) with a partition known to this process, oldest first."""
+        return list(self._partitions)
+    
+    def _append(self, rows: List[tuple], day: str):
+        """Queue rows for the partition of ``day`` (created by the writer thread on first use)."""
+        def op(conn: sqlite3.Connection):
+            if day not in self._partitions:
+                for statement in _partition_ddl(day):
+                    conn.execute(statement)
+                self._partitions = sorted({*self._partitions, day})
+            conn.executemany(INSERT.format(table=PARTITION_PREFIX + day), rows)
+        
+        self.recorded += len(rows)
+        self._submit_nowait(op)
+    
+    def record_inbound(self, messages: Iterable[Any]):
+        """
+        Queue inbound messages for the log without waiting for the commit.
+        
+        Args:
+            messages: Normalized inbound messages
+        """
+        now = time.time()
+        rows = [
+            (
+                message.message_id, _contact(message.sender), DIRECTION_INBOUND, message.message_type,
+                message.message, message.media_id, message.phone_number_id, message.timestamp, now
+            )
+            for message in messages
+        ]
+        if rows:
+            self._append(rows, partition_day(now))
+    
+    def record_outbound(
+        self,
+        message_id: Optional[str],
+        to: str,
+        message_type: str,
+        body: str,
+        phone_number_id: Optional[str] = None,
+        media_url: Optional[str] = None
+    ):
+        """Queue a message accepted by the Cloud API for the log without waiting for the commit."""
+        now = time.time()
+        timestamp = datetime.fromtimestamp(int(now)).isoformat()
+        self._append(
+            [(message_id, _contact(to), DIRECTION_OUTBOUND, message_type, body, media_url, phone_number_id, timestamp, now)],
+            partition_day(now)
+        )
+    
+    def _page(self, contact: str, limit: int, cursor: Optional[Tuple[str, int]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        conn = self._reader()
+        messages: List[Dict[str, Any]] = []
+        last: Optional[Tuple[str, int]] = None
+        for day in reversed(_list_partitions(conn)):
+            if cursor is not None and day > cursor[0]:
+                continue
+            query = f"SELECT seq, {', '.join(COLUMNS)} FROM {PARTITION_PREFIX}{day} WHERE contact = ?"
+            params: List[Any] = [contact]
+            if cursor is not None and day == cursor[0]:
+                query += " AND seq < ?"
+                params.append(cursor[1])
+            query += " ORDER BY seq DESC LIMIT ?"
+            params.append(limit + 1 - len(messages))
+            try:
+                rows = conn.execute(query, params).fetchall()
+            except sqlite3.OperationalError as e:
+                if "no such table" in str(e):
+                    continue  # Dropped while the page was read
+                raise
+            for row in rows:
+                if len(messages) == limit:
+                    return messages, f"{last[0]}.{last[1]}"
+                messages.append(dict(zip(COLUMNS, row[1:])))
+                last = (day, row[0])
+        return messages, None
+    
+    async def page(self, contact: str, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return one page of a conversation, newest message first.
+        
+        Args:
+            contact: Contact phone number (with or without "+")
+            limit: Maximum messages in the page
+            cursor: ``next_cursor`` of the previous page, or None for the newest messages
+            
+        Returns:
+            The messages and the cursor of the next (older) page, or None when there are no more
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        position = parse_cursor(cursor) if cursor else None
+        self.pages += 1
+        return await self._read(self._page, _contact(contact), limit, position)
+    
+    def _last_inbound(self, contact: str, phone_number_id: str, include_unaddressed: bool, since: float) -> Optional[float]:
+        conn = self._reader()
+        first = partition_day(since)
+        latest: Optional[float] = None
+        for day in reversed(_list_partitions(conn)):
+            if day < first:
+                break
+            try:
+                rows = conn.execute(
+                    f"SELECT timestamp FROM {PARTITION_PREFIX}{day} "
+                    "WHERE contact = ? AND direction = ? AND (phone_number_id = ? OR (? AND phone_number_id IS NULL))",
+                    (contact, DIRECTION_INBOUND, phone_number_id, include_unaddressed)
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                if "no such table" in str(e):
+                    continue
+                raise
+            for (timestamp,) in rows:
+                try:
+                    sent_at = datetime.fromisoformat(timestamp).timestamp()
+                except (TypeError, ValueError):
+                    continue
+                if latest is None or sent_at > latest:
+                    latest = sent_at
+        return latest if latest is not None and latest >= since else None
+    
+    async def last_inbound(
+        self,
+        contact: str,
+        phone_number_id: str,
+        since: float,
+        include_unaddressed: bool = False
+    ) -> Optional[float]:
+        """
+        Return when the customer sent their latest message to a business number.
+        
+        Args:
+            contact: Contact phone number (with or without "+")
+            phone_number_id: Business number that received the message
+            since: Ignore messages recorded or sent before this epoch
+            include_unaddressed: Also count messages whose webhook named no number
+                (they are routed to the default tenant)
+            
+        Returns:
+            Epoch at which the customer sent the latest message (the message
+            timestamp, not when it was recorded), or None if there is none since ``since``
+        """
+        return await self._read(self._last_inbound, _contact(contact), phone_number_id, include_unaddressed, since)
+    
+    async def prune(self, retention_days: int) -> int:
+        """
+        Drop the partitions older than the retention period and release their space.
+        
+        Returns:
+            Number of dropped partitions
+        """
+        cutoff = partition_day(time.time() - retention_days * 86400)
+        
+        def drop(conn: sqlite3.Connection):
+            partitions = _list_partitions(conn)
+            expired = [day for day in partitions if day < cutoff]
+            for day in expired:
+                conn.execute(f"DROP TABLE IF EXISTS {PARTITION_PREFIX}{day}")
+            self._partitions = [day for day in partitions if day >= cutoff]
+            return len(expired)
+        
+        def release(conn: sqlite3.Connection):
+            # The sqlite3 module steps this pragma once, which frees a single page
+            for _ in range(VACUUM_CHUNK):
+                if not conn.execute("PRAGMA freelist_count").fetchone()[0]:
+                    return False
+                conn.execute("PRAGMA incremental_vacuum")
+            return True
+        
+        dropped = await self._submit(drop)
+        if dropped:
+            # Released in chunks so queued writes are committed in between
+            while await self._submit(release):
+                pass
+        self.partitions_dropped += dropped
+        return dropped
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return recording, partition and group commit metrics."""
+        return {
+            **super().stats(),
+            "recorded": self.recorded,
+            "pages": self.pages,
+            "partitions": len(self._partitions),
+            "oldest_partition": self._partitions[0] if self._partitions else None,
+            "partitions_dropped": self.partitions_dropped
+        }
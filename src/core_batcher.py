@@ -0,0 +1,170 @@
+"""Batching forwarder for the Core API."""
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.core_client import CoreApiClient
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Status codes meaning the core has no batch endpoint
+BATCH_UNSUPPORTED_STATUS = (404, 405, 501)
+
+
+class CoreBatchForwarder:
+    """
+    Accumulates unified messages and forwards them as one array POST.
+    
+    A batch is flushed when it reaches ``max_size`` messages or when the
+    oldest message has waited ``max_wait_ms``. Each submitted message gets a
+    future resolved with its own delivery result. If the core does not
+    support the batch endpoint the forwarder switches to single-message mode
+    for the rest of the process lifetime.
+    
+    When an ``on_reply`` callback is given, it is called with each accepted
+    message and the "reply" the core returned for it (if any) once the
+    batch's futures are resolved. It runs on the flush loop, so it must hand
+    the reply off (e.g. to a queue) rather than send it.
+    """
+    
+    def __init__(
+        self,
+        core_client: CoreApiClient,
+        max_size: int = 100,
+        max_wait_ms: float = 50,
+        on_reply: Optional[Callable[[Dict[str, Any], Any], None]] = None
+    ):
+        self.core_client = core_client
+        self.on_reply = on_reply
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_supported = True
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        
+        # Metrics
+        self.batches = 0
+        self.batched_messages = 0
+        self.single_messages = 0
+        self.failed_messages = 0
+    
+    @property
+    def running(self) -> bool:
+        """Whether the flush loop is active."""
+        return self._task is not None and not self._task.done()
+    
+    async def start(self):
+        """Start the background flush loop."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._flush_loop(), name="core-batch-flusher")
+        logger.info("Core batch forwarder started (max_size=%s, max_wait=%.0fms)", self.max_size, self.max_wait * 1000)
+    
+    def submit(self, message: Dict[str, Any]) -> asyncio.Future:
+        """
+        Add a message to the current batch.
+        
+        Args:
+            message: Unified message dictionary
+            
+        Returns:
+            Future resolved with True when the core accepted the message
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((message, future))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_size:
+            self._full.set()
+        return future
+    
+    async def _flush_loop(self):
+        """Wait for messages and flush on size or time, whichever comes first."""
+        while not self._stopping:
+            await self._wakeup.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+    
+    async def flush(self):
+        """Send everything currently pending."""
+        while self._pending:
+            items = self._pending[:self.max_size]
+            del self._pending[:self.max_size]
+            await self._send(items)
+        self._wakeup.clear()
+        self._full.clear()
+    
+    async def _send(self, items: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        """Deliver one batch and resolve each item's future."""
+        messages = [message for message, _ in items]
+        results = None
+        replies = [None] * len(messages)
+        
+        if self.batch_supported:
+            response = await self.core_client.send_batch(messages)
+            if response.get("status_code") in BATCH_UNSUPPORTED_STATUS:
+                logger.warning(
+                    "Core batch endpoint returned %s, falling back to single-message forwarding",
+                    response["status_code"]
+                )
+                self.batch_supported = False
+            else:
+                results = response["results"]
+                replies = response.get("replies") or replies
+                self.batches += 1
+                self.batched_messages += len(messages)
+        
+        if results is None:
+            responses = [await self.core_client.send_message(message) for message in messages]
+            results = [response["success"] for response in responses]
+            replies = [
+                response["data"].get("reply") if isinstance(response.get("data"), dict) else None
+                for response in responses
+            ]
+            self.single_messages += len(messages)
+        
+        for (message, future), success in zip(items, results):
+            if not success:
+                self.failed_messages += 1
+                logger.error("❌ Failed to forward message %s to core", message.get('message_id'))
+            if not future.done():
+                future.set_result(success)
+        
+        if self.on_reply is not None:
+            for message, reply, success in zip(messages, replies, results):
+                if success and reply:
+                    try:
+                        self.on_reply(message, reply)
+                    except Exception as e:
+                        logger.error("Error handing off core reply to message %s: %s", message.get("message_id"), e)
+    
+    async def stop(self):
+        """Flush remaining messages and stop the flush loop."""
+        if not self.running:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._full.set()
+        await self._task
+        await self.flush()
+        logger.info("Core batch forwarder stopped")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return batching metrics."""
+        return {
+            "running": self.running,
+            "batch_supported": self.batch_supported,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "batched_messages": self.batched_messages,
+            "single_messages": self.single_messages,
+            "failed_messages": self.failed_messages,
+            "avg_batch_size": (self.batched_messages / self.batches) if self.batches else 0.0
+        }
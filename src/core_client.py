@@ -0,0 +1,114 @@
+"""HTTP client for forwarding normalized messages to the Core API."""
+import httpx
+from typing import Optional, Dict, Any, List
+from src import jsonutil
+from src.config import settings
+from src.logger import get_logger
+from src.whatsapp_client import create_http_client
+
+logger = get_logger(__name__)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class CoreApiClient:
+    """Client for the Core API unified messages endpoints."""
+    
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None, url: Optional[str] = None):
+        self.url = url or settings.core_api_url
+        self.batch_url = (settings.core_batch_url if url is None else None) or f"{self.url.rstrip('/')}/batch"
+        self.http_client = http_client
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client, creating one lazily if none was injected."""
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = create_http_client()
+        return self.http_client
+    
+    async def aclose(self):
+        """Close the pooled HTTP client and release its connections."""
+        if self.http_client is not None and not self.http_client.is_closed:
+            await self.http_client.aclose()
+        self.http_client = None
+    
+    async def send_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST a single unified message to the Core API.
+        
+        Args:
+            message: Unified message dictionary
+            
+        Returns:
+            Dictionary with "success", "status_code" and the response "data"
+        """
+        try:
+            response = await self._get_http_client().post(
+                self.url,
+                content=jsonutil.dumps(message),
+                headers=JSON_HEADERS
+            )
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        
+        return {
+            "success": response.status_code == 200,
+            "status_code": response.status_code,
+            "data": _json_or_none(response)
+        }
+    
+    async def send_batch(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        POST a list of unified messages to the Core API batch endpoint.
+        
+        The core may answer with a list of per-item results, or an object with
+        a "results" list, where each item has a boolean "success". If no
+        per-item results are returned, a 200 means every item was accepted.
+        
+        Args:
+            messages: Unified message dictionaries
+            
+        Returns:
+            Dictionary with "success", "status_code", per-item "results" and
+            per-item "replies" (the "reply" of each result item, or None)
+        """
+        try:
+            response = await self._get_http_client().post(
+                self.batch_url,
+                content=jsonutil.dumps(messages),
+                headers=JSON_HEADERS
+            )
+        except Exception as e:
+            return {"success": False, "error": str(e), "results": [False] * len(messages), "replies": [None] * len(messages)}
+        
+        if response.status_code != 200:
+            return {
+                "success": False,
+                "status_code": response.status_code,
+                "results": [False] * len(messages),
+                "replies": [None] * len(messages)
+            }
+        
+        data = _json_or_none(response)
+        items = data.get("results") if isinstance(data, dict) else data
+        if isinstance(items, list) and len(items) == len(messages):
+            results = [bool(item.get("success", True)) if isinstance(item, dict) else bool(item) for item in items]
+            replies = [item.get("reply") if isinstance(item, dict) else None for item in items]
+        else:
+            results = [True] * len(messages)
+            replies = [None] * len(messages)
+        
+        return {
+            "success": all(results),
+            "status_code": response.status_code,
+            "results": results,
+            "replies": replies,
+            "data": data
+        }
+
+
+def _json_or_none(response: httpx.Response) -> Any:
+    """Decode a JSON response body, returning None if it is not JSON."""
+    try:
+        return jsonutil.loads(response.content) if response.content else None
+    except ValueError:
+        return None
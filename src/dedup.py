@@ -0,0 +1,146 @@
+"""Message-ID deduplication for webhook redeliveries."""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Dict, Optional
+from src.logger import get_logger
+from src.shared_state import SharedState
+
+logger = get_logger(__name__)
+
+
+class MessageDeduplicator:
+    """
+    Bounded TTL/LRU set of seen WhatsApp message ids (wamids).
+    
+    Lookups only touch memory, which holds at most ``max_entries`` ids. When a
+    ``persist_path`` is given, newly seen ids are buffered and written to a
+    local SQLite file by ``flush()`` so the most recent ids can be reloaded
+    after a restart.
+    
+    With several worker processes, a ``shared`` state backend lets workers
+    ``claim`` ids so a redelivery landing on another worker is dropped too.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 100000,
+        ttl: float = 604800,
+        persist_path: Optional[str] = None,
+        shared: Optional[SharedState] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.shared = shared
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._unsaved: deque = deque(maxlen=max_entries)  # Thread-safe append/popleft; bounded if flushes fail
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_hits = 0
+    
+    def is_duplicate(self, message_id: Optional[str]) -> bool:
+        """
+        Check a message id and remember it.
+        
+        Args:
+            message_id: WhatsApp message id; messages without id are never duplicates
+            
+        Returns:
+            True if the id was already seen and has not expired
+        """
+        if not message_id:
+            return False
+        
+        now = time.time()
+        expires_at = self._seen.get(message_id)
+        if expires_at is not None and expires_at > now:
+            self._seen.move_to_end(message_id)
+            self.hits += 1
+            return True
+        
+        self.misses += 1
+        expires_at = now + self.ttl
+        self._seen[message_id] = expires_at
+        self._seen.move_to_end(message_id)
+        if self.persist_path is not None:
+            self._unsaved.append((message_id, expires_at))
+        
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+            self.evictions += 1
+        return False
+    
+    async def claim(self, message_id: Optional[str]) -> bool:
+        """
+        Claim a message id across worker processes.
+        
+        Args:
+            message_id: WhatsApp message id
+            
+        Returns:
+            True if this worker is the first to claim it (always True without shared state)
+        """
+        if self.shared is None or not message_id:
+            return True
+        claimed = await self.shared.add_if_absent(f"dedup:{message_id}", self.ttl)
+        if not claimed:
+            self.shared_hits += 1
+        return claimed
+    
+    def load(self):
+        """Open the persistence file and reload the most recent unexpired ids."""
+        if self.persist_path is None or self._conn is not None:
+            return
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.persist_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (message_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_expires ON seen (expires_at)")
+        
+        rows = self._conn.execute(
+            "SELECT message_id, expires_at FROM seen WHERE expires_at > ? ORDER BY expires_at DESC LIMIT ?",
+            (time.time(), self.max_entries)
+        ).fetchall()
+        for message_id, expires_at in reversed(rows):
+            self._seen[message_id] = expires_at
+        logger.info("Deduplication cache loaded %s ids from %s", len(rows), self.persist_path)
+    
+    def flush(self):
+        """Write buffered ids to the persistence file and purge expired rows."""
+        if self._conn is None:
+            return
+        with self._lock:
+            rows = [self._unsaved.popleft() for _ in range(len(self._unsaved))]
+            if rows:
+                with self._conn:
+                    self._conn.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?)", rows)
+                    self._conn.execute("DELETE FROM seen WHERE expires_at <= ?", (time.time(),))
+    
+    def close(self):
+        """Flush and close the persistence file."""
+        if self._conn is None:
+            return
+        self.flush()
+        self._conn.close()
+        self._conn = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and memory usage."""
+        return {
+            "size": len(self._seen),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "shared_hits": self.shared_hits,
+            "persistent": self.persist_path is not None
+        }
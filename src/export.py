@@ -0,0 +1,285 @@
+"""
+Streaming export of the message history and status events.
+
+Records are read from the conversation and status stores in batches and
+encoded as they go, as NDJSON or as a Parquet file (requires the optional
+"pyarrow" package, ``poetry install -E export``), so an export of any size
+runs in constant memory. Used by ``GET /export/{kind}`` and from the command
+line::
+
+    python -m src.export messages --since 2025-10-01 --until 2025-10-02 --output messages.ndjson
+    python -m src.export statuses --since 2025-10-01 --format parquet --output statuses.parquet
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from src import jsonutil
+from src.config import settings
+from src.conversations import COLUMNS as MESSAGE_COLUMNS, PARTITION_NAME, partition_day
+from src.status_store import COLUMNS as STATUS_COLUMNS
+
+KINDS = ("messages", "statuses")
+FORMATS = ("ndjson", "parquet")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+
+# Column types of the Parquet files (every other column is a string)
+_FLOAT_COLUMNS = {"recorded_at", "updated_at"}
+_INT_COLUMNS = {"accepted_at", "sent_at", "delivered_at", "read_at", "failed_at"}
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """
+    Open a read-only connection that can be used from any thread.
+    
+    Raises:
+        FileNotFoundError: If the database does not exist
+    """
+    if not Path(path).exists():
+        raise FileNotFoundError(path)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+def _rows(conn: sqlite3.Connection, queries: Iterable[tuple], columns: tuple, batch_size: int) -> Iterator[Dict[str, Any]]:
+    try:
+        for query, params in queries:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(columns, row))
+    finally:
+        conn.close()
+
+
+def iter_messages(path: str, since: float, until: float, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the messages recorded in ``[since, until)`` from a conversation store.
+    
+    Only the day partitions overlapping the range are read, in order.
+    
+    Args:
+        path: Conversation store database
+        since: Start epoch (inclusive)
+        until: End epoch (exclusive)
+        batch_size: Rows fetched from SQLite at a time
+        
+    Returns:
+        Iterator of message dictionaries
+        
+    Raises:
+        FileNotFoundError: If the database does not exist
+    """
+    conn = _connect(path)
+    first, last = partition_day(since), partition_day(until)
+    days = sorted(
+        match.group(1)
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        if (match := PARTITION_NAME.match(name)) and first <= match.group(1) <= last
+    )
+    queries = (
+        (
+            f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM messages_{day} "
+            "WHERE recorded_at >= ? AND recorded_at < ? ORDER BY seq",
+            (since, until)
+        )
+        for day in days
+    )
+    return _rows(conn, queries, MESSAGE_COLUMNS, batch_size)
+
+
+def iter_statuses(path: str, since: float, until: float, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the message statuses last updated in ``[since, until)`` from a status store.
+    
+    Args:
+        path: Status store database
+        since: Start epoch (inclusive)
+        until: End epoch (exclusive)
+        batch_size: Rows fetched from SQLite at a time
+        
+    Returns:
+        Iterator of status dictionaries, oldest update first
+        
+    Raises:
+        FileNotFoundError: If the database does not exist
+    """
+    conn = _connect(path)
+    query = (
+        f"SELECT {', '.join(STATUS_COLUMNS)} FROM message_status "
+        "WHERE updated_at >= ? AND updated_at < ? ORDER BY updated_at"
+    )
+    return _rows(conn, [(query, (since, until))], STATUS_COLUMNS, batch_size)
+
+
+def iter_records(kind: str, since: float, until: float) -> Iterator[Dict[str, Any]]:
+    """Stream the records of an export kind from the configured stores."""
+    if kind == "messages":
+        return iter_messages(settings.conversations_path, since, until)
+    if kind == "statuses":
+        return iter_statuses(settings.status_store_path, since, until)
+    raise ValueError(f"Unknown export kind: {kind}")
+
+
+def to_ndjson(records: Iterable[Dict[str, Any]], chunk_size: int = 65536) -> Iterator[bytes]:
+    """
+    Encode records as NDJSON, yielding chunks of about ``chunk_size`` bytes.
+    """
+    chunk: List[bytes] = []
+    size = 0
+    for record in records:
+        line = jsonutil.dumps(record) + b"\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def _import_pyarrow():
+    """
+    Import the optional Parquet dependencies.
+    
+    Raises:
+        RuntimeError: If the "pyarrow" package is not installed
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package")
+    return pa, pq
+
+
+class _ChunkSink:
+    """Write-only file object collecting what the Parquet writer emits."""
+    
+    closed = False
+    
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def to_parquet(records: Iterable[Dict[str, Any]], columns: tuple, row_group_size: int = 20000) -> Iterator[bytes]:
+    """
+    Encode records as a Parquet file, one row group at a time.
+    
+    Args:
+        records: Records to encode
+        columns: Column names, in file order
+        row_group_size: Rows buffered per row group (bounds memory use)
+        
+    Returns:
+        Iterator of file chunks, one per row group plus the footer
+        
+    Raises:
+        RuntimeError: If the "pyarrow" package is not installed
+    """
+    pa, pq = _import_pyarrow()
+    
+    def column_type(name: str):
+        if name in _FLOAT_COLUMNS:
+            return pa.float64()
+        if name in _INT_COLUMNS:
+            return pa.int64()
+        return pa.string()
+    
+    schema = pa.schema([(name, column_type(name)) for name in columns])
+    
+    def chunks() -> Iterator[bytes]:
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        batch: List[Dict[str, Any]] = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == row_group_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+                yield sink.drain()
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        writer.close()
+        yield sink.drain()
+    
+    return chunks()
+
+
+def export(kind: str, since: float, until: float, fmt: str = "ndjson") -> Iterator[bytes]:
+    """
+    Stream an export file.
+    
+    Args:
+        kind: "messages" (conversation history) or "statuses" (delivery statuses)
+        since: Start epoch (inclusive)
+        until: End epoch (exclusive)
+        fmt: "ndjson" or "parquet"
+        
+    Returns:
+        Iterator of file chunks
+        
+    Raises:
+        ValueError: If the kind or format is unknown
+        FileNotFoundError: If the store of the kind does not exist
+        RuntimeError: If Parquet is requested without "pyarrow" installed
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "parquet":
+        _import_pyarrow()  # Before the store is opened, so a missing package leaves no connection behind
+    records = iter_records(kind, since, until)
+    if fmt == "parquet":
+        return to_parquet(records, MESSAGE_COLUMNS if kind == "messages" else STATUS_COLUMNS)
+    return to_ndjson(records)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point: write an export to a file or stdout."""
+    parser = argparse.ArgumentParser(description="Export message history or statuses")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Start (ISO date/time, local time); default 24 hours ago")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="End (ISO date/time, local time); default now")
+    parser.add_argument("--format", dest="fmt", choices=FORMATS, default="ndjson")
+    parser.add_argument("--output", help="Output file (default stdout)")
+    args = parser.parse_args(argv)
+    
+    until = args.until.timestamp() if args.until else time.time()
+    since = args.since.timestamp() if args.since else until - 86400
+    chunks = export(args.kind, since, until, args.fmt)
+    if args.output:
+        with open(args.output, "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
+    else:
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Scheduler running jobs in order per key and concurrently across keys."""
+import asyncio
+import heapq
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class KeyedScheduler:
+    """
+    Shards jobs by key onto FIFO queues, each drained by one worker task.
+    
+    Every job for a key lands on the same shard, so jobs for one key (e.g. a
+    sender's messages) run strictly in submission order, one at a time,
+    while other shards make progress concurrently. Keys are mapped with
+    CRC32, so the mapping is stable across processes.
+    """
+    
+    def __init__(self, shards: int = 64, hot_keys: int = 5):
+        self.shard_count = shards
+        self.hot_keys = hot_keys
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._pending_by_key: Dict[str, int] = {}
+        self._accepting = False
+        
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_key_depth = 0
+        self.processed_per_shard = [0] * shards
+    
+    @property
+    def running(self) -> bool:
+        """Whether the scheduler is accepting jobs."""
+        return self._accepting
+    
+    def shard_for(self, key: str) -> int:
+        """Return the shard index of a key."""
+        return zlib.crc32(key.encode("utf-8")) % self.shard_count
+    
+    async def start(self):
+        """Create the shard queues and their workers."""
+        if self._accepting:
+            return
+        self._queues = [asyncio.Queue() for _ in range(self.shard_count)]
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"keyed-shard-{i}")
+            for i in range(self.shard_count)
+        ]
+        self._accepting = True
+        logger.info("Keyed scheduler started with %s shards", self.shard_count)
+    
+    def submit(self, key: str, job: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """
+        Queue a job behind the earlier jobs of the same key.
+        
+        Args:
+            key: Ordering key (e.g. the sender's phone number)
+            job: Zero-argument coroutine function
+            
+        Returns:
+            Future resolved with the job's result (or exception)
+            
+        Raises:
+            RuntimeError: If the scheduler is not running
+        """
+        if not self._accepting:
+            raise RuntimeError("Keyed scheduler is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queues[self.shard_for(key)].put_nowait((key, job, future))
+        
+        depth = self._pending_by_key.get(key, 0) + 1
+        self._pending_by_key[key] = depth
+        if depth > self.max_key_depth:
+            self.max_key_depth = depth
+        self.submitted += 1
+        return future
+    
+    async def _worker(self, index: int):
+        """Run the jobs of one shard one after another until cancelled."""
+        queue = self._queues[index]
+        while True:
+            key, job, future = await queue.get()
+            try:
+                result = await job()
+                if not future.done():
+                    future.set_result(result)
+                self.completed += 1
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                depth = self._pending_by_key[key] - 1
+                if depth:
+                    self._pending_by_key[key] = depth
+                else:
+                    del self._pending_by_key[key]
+                self.processed_per_shard[index] += 1
+                queue.task_done()
+    
+    async def stop(self, drain_timeout: float = 10.0):
+        """
+        Stop accepting jobs, let queued jobs finish and cancel the workers.
+        
+        Args:
+            drain_timeout: Maximum seconds to wait for queued jobs
+        """
+        if not self._queues:
+            return
+        self._accepting = False
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Keyed scheduler drain timed out with %s jobs pending", self.depth)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues = []
+        logger.info("Keyed scheduler stopped")
+    
+    @property
+    def depth(self) -> int:
+        """Jobs queued or running across all shards."""
+        return sum(self._pending_by_key.values())
+    
+    def shard_skew(self) -> float:
+        """
+        Ratio of the busiest shard's depth to the mean depth.
+        
+        1.0 means load is spread evenly; large values mean a few hot keys
+        (or an unlucky hash) are concentrating work on one shard.
+        """
+        depths = [queue.qsize() for queue in self._queues]
+        total = sum(depths)
+        if not total:
+            return 0.0
+        return max(depths) / (total / len(depths))
+    
+    def hot_key_depth(self) -> int:
+        """Pending jobs of the key with the longest queue."""
+        return max(self._pending_by_key.values(), default=0)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return ordering and skew metrics."""
+        hottest = heapq.nlargest(self.hot_keys, self._pending_by_key.items(), key=lambda item: item[1])
+        processed = self.processed_per_shard
+        mean_processed = sum(processed) / len(processed) if processed else 0
+        return {
+            "running": self._accepting,
+            "shards": self.shard_count,
+            "depth": self.depth,
+            "active_keys": len(self._pending_by_key),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "shard_skew": self.shard_skew(),
+            "processed_skew": (max(processed) / mean_processed) if mean_processed else 0.0,
+            "hot_keys": [{"key": key, "pending": pending} for key, pending in hottest],
+            "hot_key_depth": self.hot_key_depth(),
+            "max_key_depth": self.max_key_depth
+        }
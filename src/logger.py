@@ -1,44 +1,106 @@
 """Logging configuration for WhatsApp service."""
+import atexit
+import copy
+import json
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import List
 from src.config import settings
 
 
-# Create logs directory if it doesn't exist
-logs_dir = Path("logs")
-logs_dir.mkdir(exist_ok=True)
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ExcInfoQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves the exception to the listener's formatters.
+    
+    The stock ``prepare`` formats the traceback into the message and drops
+    ``exc_info``, so the JSON formatter could never emit its "exception"
+    field. Only the message arguments are merged here.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
 
 # Configure logging format
 log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 date_format = "%Y-%m-%d %H:%M:%S"
 
 # Create formatters
-formatter = logging.Formatter(log_format, datefmt=date_format)
+if settings.log_format == "json":
+    formatter = JsonFormatter()
+else:
+    formatter = logging.Formatter(log_format, datefmt=date_format)
 
 # Console handler
 console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setLevel(getattr(logging, settings.log_level))
 console_handler.setFormatter(formatter)
 
-# File handler (daily log file)
-log_filename = logs_dir / f"whatsapp_service_{datetime.now().strftime('%Y%m%d')}.log"
-file_handler = logging.FileHandler(log_filename, encoding="utf-8")
-file_handler.setLevel(logging.DEBUG)
-file_handler.setFormatter(formatter)
+handlers: List[logging.Handler] = [console_handler]
 
-# Configure root logger
+# File handler, rotated at midnight (previous days are kept as whatsapp_service.log.YYYY-MM-DD).
+# Only for single-process runs: worker processes rolling one file over would
+# delete each other's rotated files.
+if settings.log_to_file:
+    logs_dir = Path(settings.log_dir)
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    log_filename = logs_dir / "whatsapp_service.log"
+    file_handler = TimedRotatingFileHandler(
+        log_filename,
+        when="midnight",
+        backupCount=settings.log_retention_days,
+        encoding="utf-8"
+    )
+    file_handler.setLevel(getattr(logging, settings.log_file_level))
+    file_handler.setFormatter(formatter)
+    handlers.append(file_handler)
+
+# Records are queued on the calling thread and written by a background listener,
+# so disk and console I/O never block the event loop.
+log_queue: "queue.Queue" = queue.Queue(-1)
+queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+queue_listener.start()
+atexit.register(queue_listener.stop)
+
+# Configure root logger. Its level is the most verbose handler level, so
+# disabled levels are filtered before any message formatting happens.
 logger = logging.getLogger("whatsapp_service")
-logger.setLevel(logging.DEBUG)
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+logger.setLevel(min(handler.level for handler in handlers))
+logger.addHandler(ExcInfoQueueHandler(log_queue))
 
 # Prevent duplicate logs
 logger.propagate = False
 
 
 def get_logger(name: str = "whatsapp_service") -> logging.Logger:
-    """Get a logger instance."""
+    """
+    Get a logger instance.
+    
+    Module loggers (e.g. ``get_logger(__name__)``) are placed under the
+    "whatsapp_service" logger so they share its handlers.
+    """
+    if name != "whatsapp_service" and not name.startswith("whatsapp_service."):
+        name = f"whatsapp_service.{name}"
     return logging.getLogger(name)
-
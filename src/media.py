@@ -0,0 +1,184 @@
+"""Inbound media download pipeline with a content-addressed local cache."""
+import asyncio
+import hashlib
+import mimetypes
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+from src import metrics
+from src.logger import get_logger
+from src.whatsapp_client import WhatsAppClient
+
+logger = get_logger(__name__)
+
+# Inbound message types whose payload carries a media id
+MEDIA_TYPES = ("image", "audio", "video", "document", "sticker")
+
+
+class MediaTooLarge(Exception):
+    """Raised when a download exceeds the configured size limit."""
+
+
+class MediaCache:
+    """
+    Directory of media files named by the SHA-256 of their content.
+    
+    Files live at ``<directory>/<first two hex digits>/<sha256><ext>``, so the
+    same image sent by many users is stored once. Downloads are written to
+    ``<directory>/tmp`` first and renamed into place when complete, so a
+    cached path never points at a partial file.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.tmp_dir = self.directory / "tmp"
+        self._lock = threading.Lock()  # store() runs on worker threads
+        
+        # Metrics
+        self.stored = 0
+        self.duplicates = 0
+    
+    def path_for(self, sha256: str, mime_type: Optional[str]) -> Path:
+        """Return the cache path of a file with the given hash and MIME type."""
+        extension = mimetypes.guess_extension((mime_type or "").split(";")[0].strip()) or ""
+        return self.directory / sha256[:2] / f"{sha256}{extension}"
+    
+    def lookup(self, sha256: str, mime_type: Optional[str]) -> Optional[Path]:
+        """Return the cached path for a hash, or None if it was never stored."""
+        path = self.path_for(sha256, mime_type)
+        return path if path.exists() else None
+    
+    def temp_path(self) -> Path:
+        """Return a fresh path for an in-progress download."""
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        return self.tmp_dir / f"{uuid.uuid4().hex}.part"
+    
+    def store(self, temp_path: Path, sha256: str, mime_type: Optional[str]) -> Path:
+        """
+        Move a completed download into the cache.
+        
+        Args:
+            temp_path: File written by the downloader
+            sha256: Hex digest of its content
+            mime_type: MIME type reported by the Graph API
+            
+        Returns:
+            Final cache path (an existing file if the content was already cached)
+        """
+        path = self.path_for(sha256, mime_type)
+        with self._lock:
+            if path.exists():
+                temp_path.unlink(missing_ok=True)
+                self.duplicates += 1
+                return path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, path)
+            self.stored += 1
+        return path
+
+
+class MediaDownloader:
+    """
+    Resolves inbound media ids and streams the files into a ``MediaCache``.
+    
+    Downloads are written chunk by chunk while being hashed, so memory use
+    does not grow with the file size. When the Graph API metadata already
+    carries the SHA-256 of a cached file the download is skipped entirely.
+    """
+    
+    def __init__(
+        self,
+        client: WhatsAppClient,
+        cache: MediaCache,
+        max_bytes: int = 100 * 1024 * 1024,
+        timeout: float = 25.0,
+        chunk_size: int = 65536
+    ):
+        self.client = client
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        
+        # Metrics
+        self.downloaded = 0
+        self.cache_hits = 0
+        self.failed = 0
+        self.bytes_downloaded = 0
+    
+    async def fetch(self, media_id: str, client: Optional[WhatsAppClient] = None) -> Dict[str, Any]:
+        """
+        Make a media file available in the local cache.
+        
+        Args:
+            media_id: Id from the inbound message (e.g. ``message["image"]["id"]``)
+            client: Client of the tenant that received the media (defaults to ``self.client``)
+            
+        Returns:
+            Dictionary with "path", "sha256", "mime_type", "size" and "cached"
+            
+        Raises:
+            Exception: If resolving or downloading fails, times out or exceeds ``max_bytes``
+        """
+        try:
+            with metrics.MEDIA_DOWNLOAD_DURATION.time():
+                result = await asyncio.wait_for(self._fetch(media_id, client or self.client), timeout=self.timeout)
+        except Exception:
+            self.failed += 1
+            metrics.MEDIA_DOWNLOADS.labels("failed").inc()
+            raise
+        metrics.MEDIA_DOWNLOADS.labels("cached" if result["cached"] else "downloaded").inc()
+        return result
+    
+    async def _fetch(self, media_id: str, client: WhatsAppClient) -> Dict[str, Any]:
+        info = await client.get_media_info(media_id)
+        mime_type = info.get("mime_type")
+        expected = info.get("sha256")
+        
+        if expected:
+            path = self.cache.lookup(expected, mime_type)
+            if path is not None:
+                self.cache_hits += 1
+                logger.debug("Media %s already cached at %s", media_id, path)
+                return {"path": str(path), "sha256": expected, "mime_type": mime_type, "size": path.stat().st_size, "cached": True}
+        
+        temp_path = self.cache.temp_path()
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with client.stream_media(info["url"]) as response:
+                response.raise_for_status()
+                with open(temp_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise MediaTooLarge(f"Media {media_id} exceeds {self.max_bytes} bytes")
+                        digest.update(chunk)
+                        await asyncio.to_thread(f.write, chunk)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        
+        sha256 = digest.hexdigest()
+        if expected and sha256 != expected:
+            logger.warning("Media %s hash mismatch: Graph API reported %s, downloaded %s", media_id, expected, sha256)
+        path = await asyncio.to_thread(self.cache.store, temp_path, sha256, mime_type)
+        
+        self.downloaded += 1
+        self.bytes_downloaded += size
+        metrics.MEDIA_BYTES.inc(size)
+        logger.info("Media %s downloaded (%s bytes) to %s", media_id, size, path)
+        return {"path": str(path), "sha256": sha256, "mime_type": mime_type, "size": size, "cached": False}
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return download and cache metrics."""
+        return {
+            "downloaded": self.downloaded,
+            "cache_hits": self.cache_hits,
+            "failed": self.failed,
+            "bytes_downloaded": self.bytes_downloaded,
+            "files_stored": self.cache.stored,
+            "duplicate_downloads": self.cache.duplicates
+        }
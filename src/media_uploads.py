@@ -0,0 +1,116 @@
+"""Reuse cache for media uploaded to the Cloud API."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MediaUploadCache:
+    """
+    Maps media URLs and content hashes to uploaded Cloud API media ids.
+    
+    A campaign that sends one image to many recipients uploads it once and
+    sends every message by media id, so Meta does not re-fetch the link for
+    each send. Concurrent sends of the same key wait for a single upload.
+    Entries expire after ``ttl`` seconds (uploaded media is kept by Meta for
+    30 days) and the least recently used ones are evicted beyond
+    ``max_entries``.
+    """
+    
+    def __init__(self, ttl: float = 2505600, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.invalidations = 0
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached media id for a key, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        media_id, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return media_id
+    
+    def put(self, key: str, media_id: str):
+        """Cache a media id for a key."""
+        self._entries[key] = (media_id, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, media_id: str):
+        """Forget every key pointing at a media id (e.g. after Meta rejected it)."""
+        stale = [key for key, (cached_id, _) in self._entries.items() if cached_id == media_id]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self.invalidations += 1
+            logger.info("Media id %s invalidated", media_id)
+    
+    async def get_or_upload(self, key: str, upload: Callable[[], Awaitable[str]]) -> str:
+        """
+        Return the media id for a key, uploading it on a miss.
+        
+        Args:
+            key: Media URL or content hash
+            upload: Coroutine function performing the upload and returning the media id
+            
+        Returns:
+            Cloud API media id
+            
+        Raises:
+            Exception: Whatever ``upload`` raised (shared with concurrent callers)
+        """
+        media_id = self.get(key)
+        if media_id is not None:
+            self.hits += 1
+            return media_id
+        
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+        
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            media_id = await upload()
+        except BaseException as e:
+            self.failures += 1
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+        
+        self.put(key, media_id)
+        future.set_result(media_id)
+        return media_id
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache metrics."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "invalidations": self.invalidations
+        }
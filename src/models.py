@@ -1,6 +1,6 @@
 """Data models for WhatsApp integration."""
-from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Literal
 from datetime import datetime
 
 
@@ -13,15 +13,34 @@ class NormalizedMessage(BaseModel):
     timestamp: str = Field(..., description="ISO format timestamp")
     message_id: Optional[str] = Field(None, description="Original message ID from WhatsApp")
     message_type: Optional[str] = Field("text", description="Type of message: text, image, etc.")
+    media_id: Optional[str] = Field(None, description="WhatsApp media id (image, audio, video, document, sticker)")
+    media_mime_type: Optional[str] = Field(None, description="MIME type of the media")
+    media_path: Optional[str] = Field(None, description="Local cache path of the downloaded media")
+    media_sha256: Optional[str] = Field(None, description="SHA-256 of the media content")
+    phone_number_id: Optional[str] = Field(None, description="Business phone number id that received the message")
 
 
 class SendMessageRequest(BaseModel):
     """Request model for sending WhatsApp messages."""
     
+    model_config = ConfigDict(populate_by_name=True)
+    
+    from_phone_number_id: Optional[str] = Field(
+        None,
+        alias="from",
+        description="Business phone_number_id to send from (defaults to the configured number)"
+    )
     to: str = Field(..., description="Recipient phone number with country code (e.g., +54911...)")
-    message: str = Field(..., description="Message text to send")
-    message_type: Literal["text", "image"] = Field("text", description="Type of message")
-    media_url: Optional[str] = Field(None, description="URL of media (for image type)")
+    message: str = Field("", description="Message text to send (caption for images, unused for templates)")
+    message_type: Literal["text", "image", "template"] = Field("text", description="Type of message")
+    media_url: Optional[str] = Field(None, description="URL of media (for image type, or a template's media header)")
+    template_name: Optional[str] = Field(None, description="Approved template name (for template type)")
+    template_language: Optional[str] = Field(
+        None,
+        description="Template language code, e.g. es_AR (optional if the template has one language)"
+    )
+    template_params: List[str] = Field(default_factory=list, description="Values for the template body placeholders, in order")
+    template_header_params: List[str] = Field(default_factory=list, description="Values for the template header placeholders")
 
 
 class SendMessageResponse(BaseModel):
@@ -46,3 +65,53 @@ class HealthResponse(BaseModel):
     service: str
     timestamp: str
 
+
+
+class MessageStatus(BaseModel):
+    """Latest known status of an outbound message."""
+    
+    message_id: str
+    status: Literal["accepted", "sent", "delivered", "read", "failed"]
+    recipient: Optional[str] = None
+    accepted_at: Optional[int] = Field(None, description="Epoch seconds")
+    sent_at: Optional[int] = Field(None, description="Epoch seconds")
+    delivered_at: Optional[int] = Field(None, description="Epoch seconds")
+    read_at: Optional[int] = Field(None, description="Epoch seconds")
+    failed_at: Optional[int] = Field(None, description="Epoch seconds")
+    error: Optional[str] = None
+    updated_at: float
+
+
+class StatusLookupRequest(BaseModel):
+    """Request model for the bulk status lookup endpoint."""
+    
+    message_ids: List[str] = Field(..., max_length=1000, description="WhatsApp message ids (wamid)")
+
+
+class StatusLookupResponse(BaseModel):
+    """Response model for the bulk status lookup endpoint."""
+    
+    statuses: List[MessageStatus]
+    missing: List[str]
+
+
+class ConversationMessage(BaseModel):
+    """One inbound or outbound message of a conversation."""
+    
+    message_id: Optional[str] = None
+    contact: str = Field(..., description="Customer phone number with country code")
+    direction: Literal["inbound", "outbound"]
+    message_type: Optional[str] = None
+    body: Optional[str] = None
+    media_id: Optional[str] = Field(None, description="Media id (inbound) or media URL (outbound)")
+    phone_number_id: Optional[str] = None
+    timestamp: Optional[str] = Field(None, description="ISO format timestamp")
+    recorded_at: float
+
+
+class ConversationPage(BaseModel):
+    """Response model for the conversation history endpoint."""
+    
+    contact: str
+    messages: List[ConversationMessage] = Field(..., description="Newest first")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get older messages; null on the last page")
@@ -0,0 +1,327 @@
+"""Durable on-disk outbox for messages forwarded to the Core API."""
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from src import jsonutil
+from src.logger import get_logger
+from src.sqlite_store import GroupCommitStore
+
+logger = get_logger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_DELIVERED = "delivered"
+STATUS_DEAD = "dead"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class Outbox(GroupCommitStore):
+    """
+    SQLite (WAL) backed outbox with group commit.
+    
+    Appends from concurrent webhook handlers share commits (see
+    ``GroupCommitStore``), so durability does not cost one fsync per message.
+    """
+    
+    NAME = "outbox"
+    SCHEMA = SCHEMA
+    
+    async def append(self, messages: List[Dict[str, Any]], delay: float = 0.0) -> List[int]:
+        """
+        Durably record messages as pending.
+        
+        Args:
+            messages: Unified message dictionaries
+            delay: Seconds before the retry scheduler may pick them up
+            
+        Returns:
+            Outbox ids, in the same order as the messages
+        """
+        now = time.time()
+        rows = [(m.get("message_id"), jsonutil.dumps(m).decode("utf-8"), now + delay, now) for m in messages]
+        
+        def op(conn):
+            ids = []
+            for row in rows:
+                cursor = conn.execute(
+                    "INSERT INTO outbox (message_id, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                    row
+                )
+                ids.append(cursor.lastrowid)
+            return ids
+        
+        return await self._submit(op)
+    
+    async def mark_delivered(self, ids: List[int]):
+        """Mark entries as delivered."""
+        await self._submit(lambda conn: conn.executemany(
+            "UPDATE outbox SET status = ?, last_error = NULL WHERE id = ?",
+            [(STATUS_DELIVERED, i) for i in ids]
+        ))
+    
+    async def mark_failed(self, entry_id: int, error: str, next_attempt_at: Optional[float]):
+        """
+        Record a failed delivery attempt.
+        
+        Args:
+            entry_id: Outbox id
+            error: Error description
+            next_attempt_at: Epoch of the next attempt, or None to give up (dead letter)
+        """
+        status = STATUS_PENDING if next_attempt_at is not None else STATUS_DEAD
+        await self._submit(lambda conn: conn.execute(
+            "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (status, next_attempt_at or 0, error, entry_id)
+        ))
+    
+    async def due(self, limit: int = 100, now: Optional[float] = None, lease: float = 60.0) -> List[Dict[str, Any]]:
+        """
+        Claim pending entries whose next attempt time has passed.
+        
+        Claimed entries have their next attempt pushed ``lease`` seconds ahead
+        in the same statement, so retriers in other worker processes sharing
+        the file do not pick them up while they are being retried.
+        """
+        now = time.time() if now is None else now
+        return await self._submit(lambda conn: _rows(conn.execute(
+            """
+            UPDATE outbox SET next_attempt_at = ?
+            WHERE id IN (
+                SELECT id FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?
+            )
+            RETURNING *
+            """,
+            (now + lease, STATUS_PENDING, now, limit)
+        )))
+    
+    async def entries(self, status: Optional[str] = None, since: float = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Return entries filtered by status and creation time, oldest first."""
+        if status:
+            query = "SELECT * FROM outbox WHERE status = ? AND created_at >= ? ORDER BY id LIMIT ?"
+            params = (status, since, limit)
+        else:
+            query = "SELECT * FROM outbox WHERE created_at >= ? ORDER BY id LIMIT ?"
+            params = (since, limit)
+        return await self._submit(lambda conn: _rows(conn.execute(query, params)))
+    
+    async def counts(self) -> Dict[str, int]:
+        """Return the number of entries per status."""
+        rows = await self._submit(lambda conn: conn.execute(
+            "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+        ).fetchall())
+        return dict(rows)
+    
+    async def prune(self, older_than: float) -> int:
+        """
+        Delete delivered and dead entries created before the given epoch.
+        
+        Returns:
+            Number of deleted rows
+        """
+        return await self._submit(lambda conn: conn.execute(
+            "DELETE FROM outbox WHERE status IN (?, ?) AND created_at < ?",
+            (STATUS_DELIVERED, STATUS_DEAD, older_than)
+        ).rowcount)
+
+
+def _rows(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    """Convert cursor rows to dictionaries with the payload decoded."""
+    columns = [c[0] for c in cursor.description]
+    rows = []
+    for values in cursor.fetchall():
+        row = dict(zip(columns, values))
+        row["payload"] = jsonutil.loads(row["payload"])
+        rows.append(row)
+    return rows
+
+
+def backoff_delay(attempts: int, base: float, maximum: float) -> float:
+    """
+    Exponential backoff with full jitter.
+    
+    Args:
+        attempts: Number of attempts already made (1 for the first retry)
+        base: Base delay in seconds
+        maximum: Upper bound in seconds
+        
+    Returns:
+        Seconds to wait before the next attempt
+    """
+    return random.uniform(0, min(maximum, base * (2 ** (attempts - 1))))
+
+
+class OutboxRetrier:
+    """Background task that re-forwards pending outbox entries with backoff."""
+    
+    def __init__(
+        self,
+        outbox: Outbox,
+        send: Callable[[Dict[str, Any]], Awaitable[bool]],
+        poll_interval: float = 1.0,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0,
+        max_attempts: int = 10,
+        batch_size: int = 100
+    ):
+        self.outbox = outbox
+        self.send = send
+        self.poll_interval = poll_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        
+        # Metrics
+        self.retried = 0
+        self.recovered = 0
+        self.dead = 0
+    
+    async def start(self):
+        """Start the retry loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="outbox-retrier")
+    
+    async def stop(self):
+        """Stop the retry loop."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def _loop(self):
+        while True:
+            try:
+                if await self.run_once() < self.batch_size:
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Outbox retry loop error: %s", e, exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+    
+    async def run_once(self) -> int:
+        """
+        Retry every due entry once.
+        
+        Returns:
+            Number of entries processed
+        """
+        entries = await self.outbox.due(limit=self.batch_size)
+        for entry in entries:
+            self.retried += 1
+            if await self.send(entry["payload"]):
+                self.recovered += 1
+                await self.outbox.mark_delivered([entry["id"]])
+            else:
+                await self.record_failure(entry["id"], entry["attempts"] + 1, "Core API delivery failed")
+        return len(entries)
+    
+    async def record_failure(self, entry_id: int, attempts: int, error: str):
+        """Schedule the next attempt for an entry, or dead-letter it."""
+        if attempts >= self.max_attempts:
+            self.dead += 1
+            logger.error("Outbox entry %s dead-lettered after %s attempts", entry_id, attempts)
+            await self.outbox.mark_failed(entry_id, error, None)
+        else:
+            delay = backoff_delay(attempts, self.base_delay, self.max_delay)
+            await self.outbox.mark_failed(entry_id, error, time.time() + delay)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return retry metrics."""
+        return {
+            "running": self._task is not None,
+            "retried": self.retried,
+            "recovered": self.recovered,
+            "dead": self.dead
+        }
+
+
+async def _replay(args):
+    """Re-forward outbox entries to the Core API (CLI helper)."""
+    from src.core_client import CoreApiClient
+    
+    outbox = Outbox(args.path)
+    outbox.open()
+    core_client = CoreApiClient()
+    try:
+        entries = await outbox.entries(
+            status=None if args.status == "all" else args.status,
+            since=args.since,
+            limit=args.limit
+        )
+        delivered = 0
+        for entry in entries:
+            if args.dry_run:
+                print(json.dumps({"id": entry["id"], "status": entry["status"], "payload": entry["payload"]}))
+                continue
+            result = await core_client.send_message(entry["payload"])
+            if result["success"]:
+                delivered += 1
+                await outbox.mark_delivered([entry["id"]])
+            else:
+                await outbox.mark_failed(entry["id"], str(result.get("error") or result.get("status_code")), time.time())
+        if not args.dry_run:
+            print(f"Replayed {len(entries)} entries, {delivered} delivered")
+    finally:
+        await core_client.aclose()
+        outbox.close()
+
+
+async def _show_counts(args):
+    outbox = Outbox(args.path)
+    outbox.open()
+    try:
+        print(json.dumps(await outbox.counts()))
+    finally:
+        outbox.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Outbox command line interface.
+    
+    Examples:
+        python -m src.outbox stats
+        python -m src.outbox replay --status dead
+        python -m src.outbox replay --status pending --since 1700000000 --dry-run
+    """
+    from src.config import settings
+    
+    parser = argparse.ArgumentParser(prog="python -m src.outbox", description="Inspect and replay the Core API outbox")
+    parser.add_argument("--path", default=settings.outbox_path, help="Outbox database file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    subparsers.add_parser("stats", help="Show entry counts per status")
+    
+    replay = subparsers.add_parser("replay", help="Re-forward entries to the Core API")
+    replay.add_argument("--status", choices=[STATUS_PENDING, STATUS_DEAD, STATUS_DELIVERED, "all"], default=STATUS_DEAD)
+    replay.add_argument("--since", type=float, default=0, help="Only entries created after this epoch")
+    replay.add_argument("--limit", type=int, default=1000)
+    replay.add_argument("--dry-run", action="store_true", help="Print the entries instead of sending them")
+    
+    args = parser.parse_args(argv)
+    if args.command == "stats":
+        asyncio.run(_show_counts(args))
+    else:
+        asyncio.run(_replay(args))
+
+
+if __name__ == "__main__":
+    main()
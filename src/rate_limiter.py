@@ -0,0 +1,143 @@
+"""Outbound rate limiting for the WhatsApp Cloud API."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from src.shared_state import SharedState
+
+
+class TokenBucket:
+    """
+    Token bucket using reservations.
+    
+    Each caller takes a token immediately, letting the balance go negative,
+    and sleeps until its token would have been refilled. Waiters are served
+    in arrival order without any lock.
+    """
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+    
+    def reserve(self) -> float:
+        """
+        Take one token.
+        
+        Returns:
+            Seconds the caller must wait before using it
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+    
+    @property
+    def idle(self) -> bool:
+        """Whether the bucket is full again (it can be dropped without changing behaviour)."""
+        return self.tokens + (time.monotonic() - self.updated_at) * self.rate >= self.burst
+
+
+class OutboundRateLimiter:
+    """
+    Throughput limits for outbound messages.
+    
+    Applies a messages-per-second bucket per business phone_number_id and a
+    pair-rate bucket per recipient. Sends over the limit wait for their turn
+    instead of being rejected by Meta with error 130429 / 131056.
+    
+    With a ``shared`` state backend the buckets live there, so worker
+    processes together stay within the limits instead of each one getting
+    the full rate.
+    """
+    
+    def __init__(
+        self,
+        messages_per_second: float = 80,
+        burst: float = 80,
+        pair_messages_per_second: float = 1 / 6,
+        pair_burst: float = 45,
+        max_recipients: int = 100000,
+        shared: Optional[SharedState] = None,
+        sender_rates: Optional[Dict[str, float]] = None
+    ):
+        self.messages_per_second = messages_per_second
+        self.burst = burst
+        self.pair_messages_per_second = pair_messages_per_second
+        self.pair_burst = pair_burst
+        self.max_recipients = max_recipients
+        self.shared = shared
+        self.sender_rates = sender_rates or {}  # Per phone_number_id overrides (rate and burst)
+        self._senders: Dict[str, TokenBucket] = {}
+        self._recipients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        
+        # Metrics
+        self.acquired = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.max_wait = 0.0
+    
+    def _recipient_bucket(self, key: str) -> TokenBucket:
+        bucket = self._recipients.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.pair_messages_per_second, self.pair_burst)
+            self._recipients[key] = bucket
+            # Bound memory: drop the least recently used bucket if it is idle
+            if len(self._recipients) > self.max_recipients:
+                oldest_key, oldest = next(iter(self._recipients.items()))
+                if oldest.idle:
+                    del self._recipients[oldest_key]
+        else:
+            self._recipients.move_to_end(key)
+        return bucket
+    
+    async def acquire(self, phone_number_id: str, recipient: str) -> float:
+        """
+        Wait until a message from ``phone_number_id`` to ``recipient`` may be sent.
+        
+        Args:
+            phone_number_id: Business phone number id sending the message
+            recipient: Recipient phone number
+            
+        Returns:
+            Seconds spent throttled
+        """
+        rate = self.sender_rates.get(phone_number_id)
+        burst = rate if rate is not None else self.burst
+        rate = rate if rate is not None else self.messages_per_second
+        
+        if self.shared is not None:
+            delay = max(
+                await self.shared.reserve(f"rate:{phone_number_id}", rate, burst),
+                await self.shared.reserve(f"rate:{phone_number_id}:{recipient}", self.pair_messages_per_second, self.pair_burst)
+            )
+        else:
+            sender_bucket = self._senders.get(phone_number_id)
+            if sender_bucket is None:
+                sender_bucket = self._senders[phone_number_id] = TokenBucket(rate, burst)
+            
+            recipient_bucket = self._recipient_bucket(f"{phone_number_id}:{recipient}")
+            delay = max(sender_bucket.reserve(), recipient_bucket.reserve())
+        
+        self.acquired += 1
+        if delay > 0:
+            self.throttled += 1
+            self.throttled_seconds += delay
+            if delay > self.max_wait:
+                self.max_wait = delay
+            await asyncio.sleep(delay)
+        return delay
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return throttling metrics."""
+        return {
+            "messages_per_second": self.messages_per_second,
+            "pair_messages_per_second": self.pair_messages_per_second,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "throttled_seconds": self.throttled_seconds,
+            "max_wait_seconds": self.max_wait,
+            "tracked_recipients": len(self._recipients)
+        }
@@ -0,0 +1,153 @@
+"""Retry policy and circuit breaker for WhatsApp Cloud API calls."""
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+# Graph API error codes worth retrying: transient server errors and rate limits
+RETRYABLE_ERROR_CODES = {
+    1,       # API Unknown
+    2,       # API Service (temporary downtime)
+    4,       # API Too Many Calls (app rate limit)
+    17,      # API User Too Many Calls
+    80007,   # WhatsApp Business Account rate limit
+    130429,  # Cloud API throughput reached
+    131000,  # Something went wrong
+    131016,  # Service unavailable
+    131056,  # Pair rate limit hit
+    133004,  # Server temporarily unavailable
+}
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def graph_error_code(response_data: Any) -> Optional[int]:
+    """Extract the Graph API error code from a response body, if any."""
+    if isinstance(response_data, dict) and isinstance(response_data.get("error"), dict):
+        code = response_data["error"].get("code")
+        return code if isinstance(code, int) else None
+    return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header.
+    
+    Args:
+        value: Header value, either seconds or an HTTP date
+        
+    Returns:
+        Seconds to wait, or None if absent or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter bounded by a total deadline."""
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0, deadline: float = 45.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+    
+    def is_retryable(self, status_code: Optional[int], error_code: Optional[int] = None) -> bool:
+        """
+        Classify a failed attempt.
+        
+        Args:
+            status_code: HTTP status, or None for timeouts and connection errors
+            error_code: Graph API error code from the response body
+        """
+        if status_code is None:
+            return True
+        if error_code is not None:
+            return error_code in RETRYABLE_ERROR_CODES
+        return status_code in RETRYABLE_STATUS_CODES
+    
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait before the next attempt.
+        
+        A server-provided Retry-After takes precedence over the computed delay.
+        """
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the Graph API looks down.
+    
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected without touching the network. Once ``reset_timeout``
+    has passed a single probe call is let through (half-open); its outcome
+    closes or re-opens the circuit.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        
+        # Metrics
+        self.rejected = 0
+        self.times_opened = 0
+    
+    def allow(self) -> bool:
+        """Whether a call may go out now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+    
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+    
+    def record_failure(self):
+        """Count a server-side failure, opening the circuit past the threshold."""
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+    
+    def release(self):
+        """Give up a half-open probe slot without recording an outcome."""
+        self._probe_in_flight = False
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return circuit state and counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,202 @@
+"""Customer service window tracking (free-form messages need an inbound message in the last 24 hours)."""
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Dict, Optional
+from src.logger import get_logger
+from src.shared_state import SharedState
+
+logger = get_logger(__name__)
+
+
+def window_key(phone_number_id: str, contact: str) -> str:
+    """Key of the window between a business number and a customer."""
+    return f"{phone_number_id}:{contact.lstrip('+')}"
+
+
+class ServiceWindowTracker:
+    """
+    Bounded in-memory index of the last inbound message time per customer.
+    
+    Meta only delivers free-form (non-template) messages to customers who
+    wrote to the business number within the last ``window`` seconds; other
+    sends are rejected after a full round trip. Looking the customer up here
+    answers that in memory before calling the Graph API. The least recently
+    active customers are evicted beyond ``max_entries``. With a
+    ``persist_path``, updates are buffered and written to a local SQLite file
+    by ``flush()`` (from a worker thread) and the open windows are reloaded
+    on startup.
+    
+    With several worker processes, a ``shared`` state backend holds the
+    windows of every worker: ``share()`` publishes the local updates and
+    ``check()`` looks a customer up there when the local index misses.
+    """
+    
+    def __init__(
+        self,
+        window: float = 86400,
+        max_entries: int = 1000000,
+        persist_path: Optional[str] = None,
+        shared: Optional[SharedState] = None
+    ):
+        self.window = window
+        self.max_entries = max_entries
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.shared = shared
+        self._last_inbound: "OrderedDict[str, float]" = OrderedDict()
+        self._unsaved: deque = deque()  # Thread-safe append/popleft
+        self._unshared: deque = deque()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        
+        # Metrics
+        self.open_hits = 0
+        self.closed_hits = 0
+        self.evictions = 0
+        self.avoided = 0
+        self.rerouted = 0
+        self.shared_hits = 0
+    
+    def _remember(self, key: str, timestamp: float) -> bool:
+        """Update the in-memory index; False if it already holds a later message."""
+        if timestamp < self._last_inbound.get(key, 0.0):
+            return False
+        self._last_inbound[key] = timestamp
+        self._last_inbound.move_to_end(key)
+        while len(self._last_inbound) > self.max_entries:
+            self._last_inbound.popitem(last=False)
+            self.evictions += 1
+        return True
+    
+    def touch(self, phone_number_id: str, contact: str, timestamp: float):
+        """
+        Record an inbound message from a customer.
+        
+        Args:
+            phone_number_id: Business number that received the message
+            contact: Customer phone number
+            timestamp: Epoch at which the customer sent the message
+        """
+        key = window_key(phone_number_id, contact)
+        if not self._remember(key, timestamp):
+            return  # Late redelivery of an older message
+        if self._conn is not None:
+            self._unsaved.append((key, timestamp))
+        if self.shared is not None:
+            self._unshared.append((key, timestamp))
+    
+    def expires_at(self, phone_number_id: str, contact: str) -> Optional[float]:
+        """Return when the customer's window closes (or closed), or None if they never wrote."""
+        last = self._last_inbound.get(window_key(phone_number_id, contact))
+        return None if last is None else last + self.window
+    
+    def is_open(self, phone_number_id: str, contact: str, now: Optional[float] = None) -> bool:
+        """Whether a free-form message to the customer would be delivered."""
+        expires_at = self.expires_at(phone_number_id, contact)
+        if expires_at is not None and expires_at > (time.time() if now is None else now):
+            self.open_hits += 1
+            return True
+        self.closed_hits += 1
+        return False
+    
+    async def check(self, phone_number_id: str, contact: str) -> bool:
+        """
+        Whether a free-form message would be delivered, counting windows opened on other workers.
+        
+        Args:
+            phone_number_id: Sending business number
+            contact: Customer phone number
+        """
+        if self.is_open(phone_number_id, contact):
+            return True
+        if self.shared is None:
+            return False
+        key = window_key(phone_number_id, contact)
+        last = await self.shared.get_value(f"window:{key}")
+        if last is None or last + self.window <= time.time():
+            return False
+        self._remember(key, last)
+        self.shared_hits += 1
+        return True
+    
+    async def share(self):
+        """Publish the windows touched since the last call to the other workers."""
+        if self.shared is None or not self._unshared:
+            return
+        updates = {}
+        for _ in range(len(self._unshared)):
+            key, timestamp = self._unshared.popleft()
+            updates[key] = max(timestamp, updates.get(key, 0.0))
+        now = time.time()
+        await asyncio.gather(*(
+            self.shared.put_max(f"window:{key}", timestamp, timestamp + self.window - now)
+            for key, timestamp in updates.items()
+            if timestamp + self.window > now
+        ))
+    
+    def record_avoided(self):
+        """Count a send answered locally because the window was closed."""
+        self.avoided += 1
+    
+    def record_rerouted(self):
+        """Count a send replaced by the fallback template because the window was closed."""
+        self.rerouted += 1
+    
+    def load(self):
+        """Open the persistence file and reload the windows that are still open."""
+        if self.persist_path is None or self._conn is not None:
+            return
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.persist_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS last_inbound (key TEXT PRIMARY KEY, at REAL NOT NULL) WITHOUT ROWID")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_inbound_at ON last_inbound (at)")
+        
+        rows = self._conn.execute(
+            "SELECT key, at FROM last_inbound WHERE at > ? ORDER BY at DESC LIMIT ?",
+            (time.time() - self.window, self.max_entries)
+        ).fetchall()
+        for key, at in reversed(rows):
+            self._remember(key, at)
+        logger.info("Service windows loaded %s customers from %s", len(rows), self.persist_path)
+    
+    def flush(self):
+        """Write buffered updates to the persistence file and purge closed windows."""
+        if self._conn is None:
+            return
+        with self._lock:
+            rows = [self._unsaved.popleft() for _ in range(len(self._unsaved))]
+            if rows:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO last_inbound VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET at = MAX(at, excluded.at)",
+                        rows
+                    )
+                    self._conn.execute("DELETE FROM last_inbound WHERE at <= ?", (time.time() - self.window,))
+    
+    def close(self):
+        """Flush and close the persistence file."""
+        if self._conn is None:
+            return
+        self.flush()
+        self._conn.close()
+        self._conn = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return index size and the sends that were answered without the Graph API."""
+        return {
+            "customers": len(self._last_inbound),
+            "max_entries": self.max_entries,
+            "persistent": self.persist_path is not None,
+            "shared": self.shared is not None,
+            "open_hits": self.open_hits,
+            "closed_hits": self.closed_hits,
+            "shared_hits": self.shared_hits,
+            "evictions": self.evictions,
+            "avoided_sends": self.avoided,
+            "rerouted_to_template": self.rerouted
+        }
@@ -0,0 +1,312 @@
+"""State shared between worker processes (deduplication claims, rate limit buckets and service windows)."""
+import abc
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SharedState(abc.ABC):
+    """
+    Interface of a shared-state backend.
+    
+    The operations mirror what a Redis deployment would use (``SET NX EX``
+    and a token bucket script), so a local backend can stand in for Redis
+    on a single host.
+    """
+    
+    name = "base"
+    
+    @abc.abstractmethod
+    async def add_if_absent(self, key: str, ttl: float) -> bool:
+        """
+        Atomically set a key unless it already exists (``SET key 1 NX EX ttl``).
+        
+        Returns:
+            True if the key was set by this call
+        """
+    
+    @abc.abstractmethod
+    async def reserve(self, key: str, rate: float, burst: float) -> float:
+        """
+        Take one token from a shared token bucket (created full on first use).
+        
+        Returns:
+            Seconds the caller must wait before using the token
+        """
+    
+    @abc.abstractmethod
+    async def put_max(self, key: str, value: float, ttl: float):
+        """Store a value unless a larger one is already stored; the key expires ``ttl`` seconds after the larger value is set."""
+    
+    @abc.abstractmethod
+    async def get_value(self, key: str) -> Optional[float]:
+        """
+        Return the value stored by ``put_max``.
+        
+        Returns:
+            The value, or None if the key is missing or expired
+        """
+    
+    async def close(self):
+        """Release connections."""
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return backend metrics."""
+        return {"backend": self.name}
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv (expires_at);
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    full_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_buckets_full ON buckets (full_at);
+CREATE TABLE IF NOT EXISTS latest (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_latest_expires ON latest (expires_at);
+"""
+
+
+class SQLiteSharedState(SharedState):
+    """
+    Shared state in a local SQLite (WAL) file, for worker processes on one host.
+    
+    Every operation is a short ``BEGIN IMMEDIATE`` transaction, which SQLite
+    serializes across processes. Calls run on a single dedicated thread so
+    the event loop never waits on the file lock. Expired keys and full
+    buckets are purged every ``purge_every`` writes.
+    """
+    
+    name = "sqlite"
+    
+    def __init__(self, path: str, purge_every: int = 1000, busy_timeout: float = 5.0):
+        self.path = Path(path)
+        self.purge_every = purge_every
+        self.busy_timeout = busy_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        self._writes = 0
+        
+        # Metrics
+        self.claims = 0
+        self.conflicts = 0
+        self.reservations = 0
+    
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), isolation_level=None, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SQLITE_SCHEMA)
+            self._conn = conn
+            logger.info("Shared state opened at %s", self.path)
+        return self._conn
+    
+    def _transaction(self, fn: Callable[[sqlite3.Connection, float], Any]) -> Any:
+        """Run ``fn(conn, now)`` in an immediate transaction (called on the state thread)."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, now)
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+                conn.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+                conn.execute("DELETE FROM latest WHERE expires_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+    
+    async def _run(self, fn: Callable[[sqlite3.Connection, float], Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._transaction, fn)
+    
+    async def add_if_absent(self, key: str, ttl: float) -> bool:
+        def op(conn, now):
+            conn.execute("DELETE FROM kv WHERE key = ? AND expires_at <= ?", (key, now))
+            return conn.execute("INSERT OR IGNORE INTO kv VALUES (?, ?)", (key, now + ttl)).rowcount == 1
+        
+        added = await self._run(op)
+        self.claims += 1
+        if not added:
+            self.conflicts += 1
+        return added
+    
+    async def reserve(self, key: str, rate: float, burst: float) -> float:
+        def op(conn, now):
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            tokens -= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (burst - tokens) / rate)
+            )
+            return -tokens / rate if tokens < 0 else 0.0
+        
+        self.reservations += 1
+        return await self._run(op)
+    
+    async def put_max(self, key: str, value: float, ttl: float):
+        def op(conn, now):
+            conn.execute("DELETE FROM latest WHERE key = ? AND expires_at <= ?", (key, now))
+            conn.execute(
+                "INSERT INTO latest VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "expires_at = CASE WHEN excluded.value > value THEN excluded.expires_at ELSE expires_at END, "
+                "value = MAX(value, excluded.value)",
+                (key, value, now + ttl)
+            )
+        
+        await self._run(op)
+    
+    async def get_value(self, key: str) -> Optional[float]:
+        def op(conn, now):
+            row = conn.execute("SELECT value FROM latest WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+            return None if row is None else row[0]
+        
+        return await self._run(op)
+    
+    async def close(self):
+        def close_connection():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        
+        await asyncio.get_running_loop().run_in_executor(self._executor, close_connection)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "path": str(self.path),
+            "claims": self.claims,
+            "conflicts": self.conflicts,
+            "reservations": self.reservations
+        }
+
+
+# Token bucket reservation, atomic on the Redis server. Uses the server clock
+# so workers on different hosts agree on time. Returns the wait as a string
+# because Redis truncates Lua numbers to integers.
+RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated_at) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+if tokens < 0 then
+    return tostring(-tokens / rate)
+end
+return '0'
+"""
+
+# Keep the larger of the stored and the new value; the key expires with the larger one
+PUT_MAX_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]))
+if current == nil or tonumber(ARGV[1]) > current then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+"""
+
+
+class RedisSharedState(SharedState):
+    """
+    Shared state in Redis, for workers spread over several hosts.
+    
+    Requires the optional "redis" package.
+    """
+    
+    name = "redis"
+    
+    def __init__(self, url: str, key_prefix: str = "whatsapp:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("The redis shared state backend requires the 'redis' package")
+        self.url = url
+        self.key_prefix = key_prefix
+        self._client = redis.from_url(url)
+        self._reserve = self._client.register_script(RESERVE_SCRIPT)
+        self._put_max = self._client.register_script(PUT_MAX_SCRIPT)
+        
+        # Metrics
+        self.claims = 0
+        self.conflicts = 0
+        self.reservations = 0
+    
+    async def add_if_absent(self, key: str, ttl: float) -> bool:
+        added = bool(await self._client.set(self.key_prefix + key, 1, nx=True, ex=max(1, int(ttl))))
+        self.claims += 1
+        if not added:
+            self.conflicts += 1
+        return added
+    
+    async def reserve(self, key: str, rate: float, burst: float) -> float:
+        self.reservations += 1
+        return float(await self._reserve(keys=[self.key_prefix + key], args=[rate, burst]))
+    
+    async def put_max(self, key: str, value: float, ttl: float):
+        await self._put_max(keys=[self.key_prefix + key], args=[repr(value), max(1, int(ttl))])
+    
+    async def get_value(self, key: str) -> Optional[float]:
+        value = await self._client.get(self.key_prefix + key)
+        return None if value is None else float(value)
+    
+    async def close(self):
+        await self._client.aclose()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "claims": self.claims,
+            "conflicts": self.conflicts,
+            "reservations": self.reservations
+        }
+
+
+def create_shared_state(backend: str, path: str, redis_url: Optional[str]) -> Optional[SharedState]:
+    """
+    Build the configured shared-state backend.
+    
+    Args:
+        backend: "memory" (per-process state, single worker), "sqlite" or "redis"
+        path: SQLite file for the "sqlite" backend
+        redis_url: Connection URL for the "redis" backend
+        
+    Returns:
+        Backend instance, or None for "memory"
+        
+    Raises:
+        ValueError: If the backend name is unknown or redis_url is missing
+    """
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        return SQLiteSharedState(path)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("shared_state_redis_url is required for the redis backend")
+        return RedisSharedState(redis_url)
+    raise ValueError(f"Unknown shared state backend: {backend}")
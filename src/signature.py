@@ -0,0 +1,29 @@
+"""Verification of Meta webhook signatures (X-Hub-Signature-256)."""
+import hmac
+from typing import Optional
+
+SIGNATURE_PREFIX = "sha256="
+
+
+def verify_signature(body: bytes, signature_header: Optional[str], app_secret: bytes) -> bool:
+    """
+    Check that a webhook body was signed by Meta with the app secret.
+    
+    The HMAC is computed once over the raw request bytes (no re-serialization)
+    and compared in constant time.
+    
+    Args:
+        body: Raw request body exactly as received
+        signature_header: Value of the X-Hub-Signature-256 header ("sha256=<hex>")
+        app_secret: App secret from the Meta developer dashboard
+        
+    Returns:
+        True if the signature matches
+    """
+    if not signature_header or not signature_header.startswith(SIGNATURE_PREFIX):
+        return False
+    try:
+        received = bytes.fromhex(signature_header[len(SIGNATURE_PREFIX):])
+    except ValueError:
+        return False
+    return hmac.compare_digest(hmac.digest(app_secret, body, "sha256"), received)
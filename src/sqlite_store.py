@@ -0,0 +1,182 @@
+"""Base class for SQLite stores written through a group-commit thread."""
+import asyncio
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class GroupCommitStore:
+    """
+    SQLite (WAL) database owned by a single writer thread.
+    
+    Every operation is handed to the writer thread, which drains all
+    operations queued at that moment and runs them in one transaction. Under
+    load many writes share one commit (and one fsync) instead of paying an
+    fsync each, while every caller still only resumes after its own data is
+    committed. The event loop never blocks on disk I/O.
+    
+    Subclasses define ``SCHEMA`` and ``NAME`` and build their operations as
+    functions taking the connection. Writes that nobody waits for can be
+    queued with ``_submit_nowait``. Queries that need not see writes still
+    queued run with ``_read`` on a small pool of read-only connections, so
+    they neither wait behind nor hold up the writer.
+    """
+    
+    NAME = "store"
+    SCHEMA = ""
+    
+    def __init__(self, path: str, max_batch: int = 1000, synchronous: str = "FULL", readers: int = 2):
+        self.path = Path(path)
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        self._ops: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix=f"{self.NAME.replace(' ', '-')}-reader")
+        self._reader_local = threading.local()
+        self._reader_connections: List[sqlite3.Connection] = []
+        self._reader_lock = threading.Lock()
+        
+        # Metrics
+        self.commits = 0
+        self.operations = 0
+    
+    @property
+    def is_open(self) -> bool:
+        """Whether the writer thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the connection used by the writer thread and apply the schema."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=5000")  # Other worker processes may hold the write lock
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.executescript(self.SCHEMA)
+        return conn
+    
+    def open(self):
+        """Create the database if needed and start the writer thread."""
+        if self.is_open:
+            return
+        conn = self._connect()
+        self._thread = threading.Thread(target=self._writer, args=(conn,), name=f"{self.NAME}-writer", daemon=True)
+        self._thread.start()
+        logger.info("%s opened at %s", self.NAME.capitalize(), self.path)
+    
+    def close(self):
+        """Finish pending operations and stop the writer thread."""
+        if not self.is_open:
+            return
+        self._ops.put(None)
+        self._thread.join()
+        self._thread = None
+        with self._reader_lock:
+            for conn in self._reader_connections:
+                conn.close()
+            self._reader_connections = []
+        self._reader_local = threading.local()
+        logger.info("%s closed", self.NAME.capitalize())
+    
+    def _writer(self, conn: sqlite3.Connection):
+        """Writer thread: run queued operations in group-committed transactions."""
+        running = True
+        while running:
+            batch = [self._ops.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._ops.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [op for op in batch if op is not None]
+            if not batch:
+                continue
+            
+            outcomes = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for fn, future, loop in batch:
+                    # A failing operation is rolled back alone and only fails its own caller
+                    conn.execute("SAVEPOINT op")
+                    try:
+                        outcomes.append((future, loop, fn(conn), None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO op")
+                        outcomes.append((future, loop, None, e))
+                    conn.execute("RELEASE op")
+                conn.execute("COMMIT")
+                self.commits += 1
+                self.operations += len(batch)
+            except Exception as e:
+                logger.error("%s commit failed: %s", self.NAME.capitalize(), e)
+                if conn.in_transaction:
+                    conn.rollback()
+                outcomes = [(future, loop, None, e) for _, future, loop in batch]
+            
+            for future, loop, result, error in outcomes:
+                if future is None:
+                    if error is not None:
+                        logger.error("%s write failed: %s", self.NAME.capitalize(), error)
+                    continue
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+        conn.close()
+    
+    def _submit(self, fn: Callable[[sqlite3.Connection], Any]) -> Awaitable[Any]:
+        """Queue an operation for the writer thread and return an awaitable result."""
+        if not self.is_open:
+            raise RuntimeError(f"{self.NAME.capitalize()} is not open")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._ops.put((fn, future, loop))
+        return future
+    
+    def _submit_nowait(self, fn: Callable[[sqlite3.Connection], Any]):
+        """Queue an operation without waiting for it (safe from any thread)."""
+        if not self.is_open:
+            raise RuntimeError(f"{self.NAME.capitalize()} is not open")
+        self._ops.put((fn, None, None))
+    
+    def _reader(self) -> sqlite3.Connection:
+        """Return the read-only connection of the current reader thread."""
+        conn = getattr(self._reader_local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._reader_local.conn = conn
+            with self._reader_lock:
+                self._reader_connections.append(conn)
+        return conn
+    
+    async def _read(self, fn: Callable[..., Any], *args) -> Any:
+        """Run ``fn(*args)`` on a reader thread (it gets its connection from ``_reader``)."""
+        if not self.is_open:
+            raise RuntimeError(f"{self.NAME.capitalize()} is not open")
+        return await asyncio.get_running_loop().run_in_executor(self._readers, fn, *args)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return group commit metrics."""
+        return {
+            "open": self.is_open,
+            "commits": self.commits,
+            "operations": self.operations,
+            "avg_ops_per_commit": (self.operations / self.commits) if self.commits else 0.0,
+            "queued": self._ops.qsize()
+        }
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Optional[Exception]):
+    """Resolve a future on its event loop thread."""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
@@ -0,0 +1,200 @@
+"""Message status tracking (sent, delivered, read and failed receipts)."""
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from src.sqlite_store import GroupCommitStore
+
+STATUS_ACCEPTED = "accepted"  # Accepted by the Cloud API (recorded by /send/whatsapp)
+STATUS_SENT = "sent"
+STATUS_DELIVERED = "delivered"
+STATUS_READ = "read"
+STATUS_FAILED = "failed"
+
+# Receipts can arrive out of order (e.g. "read" before "delivered"), so the
+# current status is the most advanced one seen so far.
+STATUS_RANK = {
+    STATUS_ACCEPTED: 0,
+    STATUS_SENT: 1,
+    STATUS_DELIVERED: 2,
+    STATUS_READ: 3,
+    STATUS_FAILED: 4
+}
+
+# SQLite's default limit of bound parameters per statement is 999
+_LOOKUP_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_status (
+    message_id TEXT PRIMARY KEY,
+    recipient TEXT,
+    status TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    accepted_at INTEGER,
+    sent_at INTEGER,
+    delivered_at INTEGER,
+    read_at INTEGER,
+    failed_at INTEGER,
+    error TEXT,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_message_status_updated ON message_status (updated_at);
+"""
+
+UPSERT = """
+INSERT INTO message_status (
+    message_id, recipient, status, rank, accepted_at, sent_at, delivered_at, read_at, failed_at, error, updated_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (message_id) DO UPDATE SET
+    recipient = COALESCE(message_status.recipient, excluded.recipient),
+    status = CASE WHEN excluded.rank >= message_status.rank THEN excluded.status ELSE message_status.status END,
+    rank = MAX(message_status.rank, excluded.rank),
+    accepted_at = COALESCE(message_status.accepted_at, excluded.accepted_at),
+    sent_at = COALESCE(message_status.sent_at, excluded.sent_at),
+    delivered_at = COALESCE(message_status.delivered_at, excluded.delivered_at),
+    read_at = COALESCE(message_status.read_at, excluded.read_at),
+    failed_at = COALESCE(message_status.failed_at, excluded.failed_at),
+    error = COALESCE(excluded.error, message_status.error),
+    updated_at = excluded.updated_at
+"""
+
+COLUMNS = (
+    "message_id", "recipient", "status", "accepted_at", "sent_at",
+    "delivered_at", "read_at", "failed_at", "error", "updated_at"
+)
+
+
+def status_row(event: Dict[str, Any], now: float) -> Optional[tuple]:
+    """
+    Convert a webhook status object into an upsert row.
+    
+    Args:
+        event: Status object from ``value.statuses`` (id, status, timestamp, recipient_id, errors)
+        now: Current epoch, stored as the update time
+        
+    Returns:
+        Row for ``UPSERT``, or None if the event has no id or an unknown status
+    """
+    message_id = event.get("id")
+    status = event.get("status")
+    if not message_id or status not in STATUS_RANK:
+        return None
+    
+    timestamps = dict.fromkeys(STATUS_RANK)
+    timestamps[status] = int(event.get("timestamp") or now)
+    
+    error = None
+    errors = event.get("errors")
+    if errors:
+        first = errors[0]
+        error = f"{first.get('code')}: {first.get('title') or first.get('message', '')}"
+    
+    return (
+        message_id,
+        event.get("recipient_id"),
+        status,
+        STATUS_RANK[status],
+        timestamps[STATUS_ACCEPTED],
+        timestamps[STATUS_SENT],
+        timestamps[STATUS_DELIVERED],
+        timestamps[STATUS_READ],
+        timestamps[STATUS_FAILED],
+        error,
+        now
+    )
+
+
+class StatusStore(GroupCommitStore):
+    """
+    SQLite store of the latest status of each outbound message, keyed by wamid.
+    
+    Status events outnumber inbound messages roughly three to one, so they are
+    recorded without waiting: ``record`` only queues the upsert and the writer
+    thread group-commits whatever has accumulated. Each message is a single
+    row (primary key lookup) holding the current status and the time of every
+    transition.
+    """
+    
+    NAME = "status store"
+    SCHEMA = SCHEMA
+    
+    def __init__(self, path: str, max_batch: int = 1000, synchronous: str = "NORMAL"):
+        super().__init__(path, max_batch=max_batch, synchronous=synchronous)
+        self.recorded = 0
+        self.ignored = 0
+    
+    def record(self, events: Iterable[Dict[str, Any]]):
+        """
+        Queue status events for storage without waiting for the commit.
+        
+        Args:
+            events: Status objects as sent by Meta in ``value.statuses``
+        """
+        now = time.time()
+        rows = []
+        for event in events:
+            row = status_row(event, now)
+            if row is None:
+                self.ignored += 1
+            else:
+                rows.append(row)
+        if rows:
+            self.recorded += len(rows)
+            self._submit_nowait(lambda conn: conn.executemany(UPSERT, rows))
+    
+    def record_accepted(self, message_id: str, recipient: str):
+        """Record a message accepted by the Cloud API, before any receipt arrives."""
+        self.record([{"id": message_id, "status": STATUS_ACCEPTED, "recipient_id": recipient}])
+    
+    async def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Return the status of a message, or None if it is unknown."""
+        found = await self.get_many([message_id])
+        return found.get(message_id)
+    
+    async def get_many(self, message_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up the status of several messages.
+        
+        Runs on a read-only connection, so events still queued for the
+        writer (a few milliseconds' worth) are not visible yet.
+        
+        Args:
+            message_ids: WhatsApp message ids (wamid)
+            
+        Returns:
+            Status dictionaries keyed by message id; unknown ids are omitted
+        """
+        ids = list(dict.fromkeys(message_ids))
+        
+        def op():
+            conn = self._reader()
+            found = {}
+            for start in range(0, len(ids), _LOOKUP_CHUNK):
+                chunk = ids[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM message_status WHERE message_id IN ({placeholders})",
+                    chunk
+                )
+                for values in cursor:
+                    found[values[0]] = dict(zip(COLUMNS, values))
+            return found
+        
+        return await self._read(op) if ids else {}
+    
+    async def prune(self, older_than: float) -> int:
+        """
+        Delete statuses not updated since the given epoch.
+        
+        Returns:
+            Number of deleted rows
+        """
+        return await self._submit(lambda conn: conn.execute(
+            "DELETE FROM message_status WHERE updated_at < ?", (older_than,)
+        ).rowcount)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return recording and group commit metrics."""
+        return {
+            **super().stats(),
+            "recorded": self.recorded,
+            "ignored": self.ignored
+        }
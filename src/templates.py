@@ -0,0 +1,256 @@
+"""Message templates fetched from the business account, compiled for fast sends."""
+import asyncio
+import re
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from src import jsonutil
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+MEDIA_HEADER_FORMATS = ("IMAGE", "VIDEO", "DOCUMENT")
+
+
+class TemplateError(ValueError):
+    """Raised when a template is unknown or its parameters do not match."""
+
+
+def _placeholders(text: Optional[str]) -> List[str]:
+    """Return the distinct placeholder names of a component text, in order."""
+    names = []
+    for name in PLACEHOLDER.findall(text or ""):
+        if name not in names:
+            names.append(name)
+    return names
+
+
+class CompiledTemplate:
+    """
+    An approved template with its send payload prepared ahead of time.
+    
+    The parts that never change between recipients (name, language and the
+    layout of the parameters) are built once when the template is compiled;
+    ``build`` only fills in the recipient and the parameter values.
+    """
+    
+    __slots__ = ("name", "language", "category", "header_format", "header_params", "body_params", "_static")
+    
+    def __init__(self, definition: Dict[str, Any]):
+        self.name = definition["name"]
+        self.language = definition["language"]
+        self.category = definition.get("category")
+        self.header_format: Optional[str] = None
+        self.header_params: List[str] = []
+        self.body_params: List[str] = []
+        
+        for component in definition.get("components", []):
+            kind = component.get("type", "").upper()
+            if kind == "HEADER":
+                self.header_format = component.get("format", "TEXT").upper()
+                if self.header_format == "TEXT":
+                    self.header_params = _placeholders(component.get("text"))
+                elif self.header_format in MEDIA_HEADER_FORMATS:
+                    self.header_params = ["media"]
+            elif kind == "BODY":
+                self.body_params = _placeholders(component.get("text"))
+        
+        # Shared by every payload built from this template; never mutated
+        self._static = {"name": self.name, "language": {"code": self.language}}
+    
+    def _text_parameters(self, names: List[str], values: Sequence[Any]) -> List[Dict[str, Any]]:
+        if names and not names[0].isdigit():
+            return [{"type": "text", "parameter_name": name, "text": str(value)} for name, value in zip(names, values)]
+        return [{"type": "text", "text": str(value)} for value in values]
+    
+    def build(self, to: str, body_params: Sequence[Any] = (), header_params: Sequence[Any] = ()) -> Dict[str, Any]:
+        """
+        Build the Cloud API payload for one recipient.
+        
+        Args:
+            to: Recipient phone number
+            body_params: Values for the body placeholders, in order
+            header_params: Values for the header placeholders, or the media URL for media headers
+            
+        Returns:
+            Message payload
+            
+        Raises:
+            TemplateError: If the number of parameters does not match the template
+        """
+        if len(body_params) != len(self.body_params):
+            raise TemplateError(f"Template {self.name} expects {len(self.body_params)} body parameters, got {len(body_params)}")
+        if len(header_params) != len(self.header_params):
+            raise TemplateError(f"Template {self.name} expects {len(self.header_params)} header parameters, got {len(header_params)}")
+        
+        if not body_params and not header_params:
+            template = self._static
+        else:
+            components = []
+            if header_params:
+                if self.header_format in MEDIA_HEADER_FORMATS:
+                    media_type = self.header_format.lower()
+                    parameters = [{"type": media_type, media_type: {"link": header_params[0]}}]
+                else:
+                    parameters = self._text_parameters(self.header_params, header_params)
+                components.append({"type": "header", "parameters": parameters})
+            if body_params:
+                components.append({"type": "body", "parameters": self._text_parameters(self.body_params, body_params)})
+            template = {**self._static, "components": components}
+        
+        return {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": to.replace("+", ""),
+            "type": "template",
+            "template": template
+        }
+
+
+class TemplateCache:
+    """
+    Approved templates of a business account, compiled and kept in memory.
+    
+    Templates are fetched on first use and refreshed in the background once
+    they are older than ``refresh_interval``, so sends never wait for the
+    Graph API after the first load. A lookup miss triggers an immediate
+    refresh (at most every ``miss_refresh_interval`` seconds) to pick up
+    newly approved templates. With a ``cache_path`` the definitions are also
+    saved to disk and used when the Graph API cannot be reached at startup.
+    
+    Every refresh is timed from the last attempt, successful or not, so
+    while the Graph API is failing it is called at most once every
+    ``miss_refresh_interval`` seconds.
+    """
+    
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        refresh_interval: float = 3600.0,
+        miss_refresh_interval: float = 60.0,
+        cache_path: Optional[str] = None
+    ):
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.miss_refresh_interval = miss_refresh_interval
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._templates: Dict[Tuple[str, str], CompiledTemplate] = {}
+        self._available = False  # Templates were loaded, from the Graph API or the saved definitions
+        self._stale = False  # Loaded from the saved definitions: refresh on next use
+        self._loaded_at: Optional[float] = None  # Last successful fetch
+        self._attempted_at: Optional[float] = None  # Last fetch, successful or not
+        self._last_error: Optional[Exception] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        
+        # Metrics
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.lookups = 0
+        self.misses = 0
+    
+    def _compile(self, definitions: List[Dict[str, Any]]):
+        self._templates = {
+            (definition["name"], definition["language"]): CompiledTemplate(definition)
+            for definition in definitions
+            if definition.get("status", "APPROVED") == "APPROVED"
+        }
+    
+    async def refresh(self):
+        """
+        Fetch and compile the templates, replacing the cached set.
+        
+        Concurrent callers share one in-flight fetch instead of each calling
+        the Graph API.
+        """
+        await asyncio.shield(self._start_refresh())
+    
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._load())
+            # Background refreshes have no awaiter; failures are logged by _load
+            self._refreshing.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._refreshing
+    
+    async def _load(self):
+        self._attempted_at = time.monotonic()
+        self._last_error = None
+        try:
+            definitions = await self.fetch()
+        except Exception as e:
+            self.refresh_failures += 1
+            self._last_error = e
+            logger.error("Could not fetch message templates: %s", e)
+            if not self._available and self.cache_path is not None and self.cache_path.exists():
+                self._compile(jsonutil.loads(self.cache_path.read_bytes()))
+                self._available = True
+                self._stale = True
+                logger.warning("Using %s cached templates from %s", len(self._templates), self.cache_path)
+                return
+            raise
+        self._compile(definitions)
+        self._available = True
+        self._stale = False
+        self._loaded_at = time.monotonic()
+        self.refreshes += 1
+        logger.info("Loaded %s approved message templates", len(self._templates))
+        if self.cache_path is not None:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(self.cache_path.write_bytes, jsonutil.dumps(definitions))
+    
+    async def get(self, name: str, language: Optional[str] = None) -> CompiledTemplate:
+        """
+        Return a compiled template.
+        
+        Args:
+            name: Template name
+            language: Language code (e.g. "es_AR"); optional if the template has a single language
+            
+        Returns:
+            Compiled template
+            
+        Raises:
+            TemplateError: If no approved template matches
+            Exception: If the templates were never loaded and the Graph API call fails
+                (the last failure is raised again until the next attempt is due)
+        """
+        self.lookups += 1
+        if not self._available:
+            if not self._retry_due() and self._last_error is not None:
+                raise self._last_error
+            await self.refresh()
+        elif (self._stale or time.monotonic() - self._loaded_at > self.refresh_interval) and self._retry_due():
+            self._start_refresh()  # The cached templates stay in use meanwhile
+        
+        template = self._find(name, language)
+        if template is None and self._retry_due():
+            await self.refresh()
+            template = self._find(name, language)
+        if template is None:
+            self.misses += 1
+            raise TemplateError(f"No approved template {name}" + (f" in {language}" if language else ""))
+        return template
+    
+    def _retry_due(self) -> bool:
+        """Whether the last fetch attempt is old enough to call the Graph API again."""
+        return self._attempted_at is None or time.monotonic() - self._attempted_at > self.miss_refresh_interval
+    
+    def _find(self, name: str, language: Optional[str]) -> Optional[CompiledTemplate]:
+        if language is not None:
+            return self._templates.get((name, language))
+        matches = [template for (template_name, _), template in self._templates.items() if template_name == name]
+        if len(matches) > 1:
+            raise TemplateError(f"Template {name} exists in several languages; specify one")
+        return matches[0] if matches else None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache metrics."""
+        return {
+            "templates": len(self._templates),
+            "age_seconds": (time.monotonic() - self._loaded_at) if self._loaded_at is not None else None,
+            "stale": self._stale,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "lookups": self.lookups,
+            "misses": self.misses
+        }
@@ -0,0 +1,75 @@
+"""Registry of the WhatsApp business phone numbers (tenants) served by one process."""
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from pydantic import BaseModel, Field
+from src import jsonutil
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Tenant(BaseModel):
+    """Credentials and routing of one business phone number."""
+    
+    phone_number_id: str = Field(..., description="Cloud API phone number id")
+    access_token: str = Field(..., description="Access token allowed to send from this number")
+    name: Optional[str] = Field(None, description="Human readable name, for logs")
+    business_account_id: Optional[str] = None
+    core_api_url: Optional[str] = Field(None, description="Core API endpoint for this tenant (defaults to core_api_url)")
+    messages_per_second: Optional[float] = Field(None, description="Throughput limit override for this number")
+
+
+def load_tenants(path: str) -> List[Tenant]:
+    """
+    Read tenants from a JSON file holding a list of tenant objects.
+    
+    Args:
+        path: JSON file path
+        
+    Returns:
+        Validated tenants
+    """
+    data = jsonutil.loads(Path(path).read_bytes())
+    tenants = [Tenant(**item) for item in data]
+    logger.info("Loaded %s tenants from %s", len(tenants), path)
+    return tenants
+
+
+class TenantRegistry:
+    """
+    Lookup of tenants by phone_number_id.
+    
+    The default tenant (built from the single-number settings) serves
+    requests that do not name a number, so single-tenant deployments keep
+    working unchanged.
+    """
+    
+    def __init__(self, default: Tenant, tenants: Optional[List[Tenant]] = None):
+        self.default = default
+        self._tenants: Dict[str, Tenant] = {default.phone_number_id: default}
+        for tenant in tenants or []:
+            if tenant.phone_number_id == default.phone_number_id:
+                self.default = tenant
+            elif tenant.phone_number_id in self._tenants:
+                raise ValueError(f"Duplicate tenant phone_number_id: {tenant.phone_number_id}")
+            self._tenants[tenant.phone_number_id] = tenant
+    
+    def get(self, phone_number_id: Optional[str]) -> Optional[Tenant]:
+        """
+        Return the tenant for a phone number id.
+        
+        Args:
+            phone_number_id: Phone number id, or None for the default tenant
+            
+        Returns:
+            Tenant, or None if the id is not registered
+        """
+        if phone_number_id is None:
+            return self.default
+        return self._tenants.get(phone_number_id)
+    
+    def __iter__(self) -> Iterator[Tenant]:
+        return iter(self._tenants.values())
+    
+    def __len__(self) -> int:
+        return len(self._tenants)
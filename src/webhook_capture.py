@@ -0,0 +1,178 @@
+"""Capture of raw webhook requests for replay (see benchmarks/replay_webhooks.py)."""
+import gzip
+import heapq
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Record header: arrival epoch, body length, signature length
+RECORD_HEADER = struct.Struct("<dIH")
+FILE_PATTERN = "webhooks-*.cap.gz"
+
+
+class WebhookCapture:
+    """
+    Appends raw webhook bodies, their arrival time and signature header to
+    gzip files, rotated by size.
+    
+    ``record`` only queues the body; a writer thread compresses and writes
+    it, so capturing adds no disk I/O to the webhook request. When the queue
+    is full the body is dropped (and counted) rather than slowing Meta's
+    request down. Each file is a gzip stream of length-prefixed records,
+    flushed whenever the writer goes idle so a crash loses at most the
+    records of the last burst.
+    """
+    
+    def __init__(
+        self,
+        directory: str,
+        rotate_bytes: int = 268435456,
+        max_files: int = 20,
+        queue_size: int = 10000,
+        compresslevel: int = 1
+    ):
+        self.directory = Path(directory)
+        self.rotate_bytes = rotate_bytes
+        self.max_files = max_files
+        self.compresslevel = compresslevel
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        
+        # Metrics
+        self.captured = 0
+        self.dropped = 0
+        self.files = 0
+        self.bytes_written = 0
+    
+    @property
+    def is_open(self) -> bool:
+        """Whether the writer thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def open(self):
+        """Start the writer thread."""
+        if self.is_open:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, name="webhook-capture", daemon=True)
+        self._thread.start()
+        logger.warning("Webhook capture enabled: raw payloads (with customer data) are written to %s", self.directory)
+    
+    def close(self):
+        """Write the queued bodies and stop the writer thread."""
+        if not self.is_open:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        logger.info("Webhook capture closed after %s requests (%s dropped)", self.captured, self.dropped)
+    
+    def record(self, body: bytes, signature: Optional[str] = None):
+        """
+        Queue a webhook request for capture without waiting.
+        
+        Args:
+            body: Raw request body
+            signature: X-Hub-Signature-256 header, kept so signed replays still verify
+        """
+        try:
+            self._queue.put_nowait((time.time(), body, (signature or "").encode("ascii", "ignore")))
+        except queue.Full:
+            self.dropped += 1
+    
+    def _open_file(self) -> gzip.GzipFile:
+        path = self.directory / f"webhooks-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self.files}.cap.gz"
+        self.files += 1
+        logger.info("Capturing webhooks to %s", path)
+        existing = sorted(self.directory.glob(FILE_PATTERN), key=lambda p: p.stat().st_mtime)
+        for old in existing[:max(0, len(existing) - self.max_files + 1)]:
+            old.unlink(missing_ok=True)
+        return gzip.open(path, "wb", compresslevel=self.compresslevel)
+    
+    def _writer(self):
+        """Writer thread: append queued records, rotating files by uncompressed size."""
+        output = self._open_file()
+        written = 0
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                arrived_at, body, signature = item
+                output.write(RECORD_HEADER.pack(arrived_at, len(body), len(signature)))
+                output.write(signature)
+                output.write(body)
+                size = RECORD_HEADER.size + len(signature) + len(body)
+                written += size
+                self.bytes_written += size
+                self.captured += 1
+                if written >= self.rotate_bytes:
+                    output.close()
+                    output = self._open_file()
+                    written = 0
+                elif self._queue.empty():
+                    output.flush(zlib.Z_SYNC_FLUSH)
+        finally:
+            output.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return capture counters."""
+        return {
+            "enabled": self.is_open,
+            "directory": str(self.directory),
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "files": self.files,
+            "bytes_written": self.bytes_written
+        }
+
+
+def capture_files(path: str) -> List[Path]:
+    """Return the capture files of a directory (or the file itself), oldest first."""
+    target = Path(path)
+    if target.is_file():
+        return [target]
+    return sorted(target.glob(FILE_PATTERN), key=lambda p: p.stat().st_mtime)
+
+
+def _read_file(file: Path) -> Iterator[Tuple[float, Optional[str], bytes]]:
+    with gzip.open(file, "rb") as source:
+        while True:
+            try:
+                header = source.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                arrived_at, body_length, signature_length = RECORD_HEADER.unpack(header)
+                signature = source.read(signature_length)
+                body = source.read(body_length)
+            except (EOFError, zlib.error):
+                return  # Cut short by a crash
+            if len(body) < body_length:
+                return
+            yield arrived_at, signature.decode("ascii") or None, body
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, Optional[str], bytes]]:
+    """
+    Iterate the records of capture files in arrival order.
+    
+    Files written concurrently by several worker processes are merged by
+    arrival time. A file cut short by a crash is read up to its last
+    complete record.
+    
+    Args:
+        path: Capture file, or a directory of capture files
+        
+    Returns:
+        Iterator of (arrival epoch, signature header or None, raw body)
+    """
+    return heapq.merge(*(_read_file(file) for file in capture_files(path)), key=lambda record: record[0])
@@ -0,0 +1,138 @@
+"""In-process queue for asynchronous webhook processing."""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class WebhookIngestQueue:
+    """
+    Bounded asyncio queue drained by a pool of worker tasks.
+    
+    The webhook handler enqueues the raw payload and acknowledges Meta right
+    away; workers run the actual processing (normalization, forwarding) in
+    the background.
+    """
+    
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        maxsize: int = 10000,
+        workers: int = 4
+    ):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.worker_count = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._accepting = False
+        
+        # Metrics
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    @property
+    def running(self) -> bool:
+        """Whether the queue is accepting new items."""
+        return self._accepting
+    
+    @property
+    def depth(self) -> int:
+        """Number of items waiting to be processed."""
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    async def start(self):
+        """Create the queue and spawn the worker tasks."""
+        if self._accepting:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"webhook-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        self._accepting = True
+        logger.info("Webhook ingest queue started with %s workers (maxsize=%s)", self.worker_count, self.maxsize)
+    
+    def enqueue(self, item: Any) -> bool:
+        """
+        Put an item on the queue without waiting.
+        
+        Args:
+            item: Payload to hand to the handler
+            
+        Returns:
+            True if the item was queued, False if the queue is full or stopped
+        """
+        if not self._accepting:
+            return False
+        try:
+            self._queue.put_nowait((time.monotonic(), item))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+    
+    async def _worker(self, index: int):
+        """Process queued items until cancelled."""
+        while True:
+            enqueued_at, item = await self._queue.get()
+            wait = time.monotonic() - enqueued_at
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+            try:
+                await self.handler(item)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("Webhook worker %s failed to process item: %s", index, e, exc_info=True)
+            finally:
+                self._queue.task_done()
+    
+    async def stop(self, drain_timeout: float = 10.0):
+        """
+        Stop accepting items, drain what is queued and cancel the workers.
+        
+        Args:
+            drain_timeout: Maximum seconds to wait for queued items to finish
+        """
+        if self._queue is None:
+            return
+        self._accepting = False
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Webhook queue drain timed out with %s items pending", self._queue.qsize())
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Webhook ingest queue stopped")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return queue and backpressure metrics."""
+        completed = self.processed + self.failed
+        return {
+            "running": self._accepting,
+            "workers": len(self._workers),
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "maxsize": self.maxsize,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": (self.total_wait / completed * 1000) if completed else 0.0,
+            "max_wait_ms": self.max_wait * 1000
+        }
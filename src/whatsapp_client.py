@@ -1,23 +1,404 @@
 """WhatsApp Cloud API client for sending messages."""
+import asyncio
+import hashlib
+import time
 import httpx
-from typing import Optional, Dict, Any
+from functools import partial
+from typing import Optional, Dict, Any, List, Sequence
+from src import metrics
 from src.config import settings
 from src.logger import get_logger
+from src.media_uploads import MediaUploadCache
+from src.rate_limiter import OutboundRateLimiter
+from src.retry import CircuitBreaker, RetryPolicy, graph_error_code, parse_retry_after
+from src.templates import CompiledTemplate
 
 logger = get_logger(__name__)
 
+# Attempts with less time left in the send deadline fail fast instead of
+# going out with a timeout too short to get an answer
+MIN_ATTEMPT_TIMEOUT = 1.0
+
+# Largest image the Cloud API accepts; bigger ones are sent by link instead of uploaded
+IMAGE_MAX_BYTES = 5 * 1024 * 1024
+
+# Graph API errors meaning a media id can no longer be used (expired or unknown)
+MEDIA_ERROR_CODES = {131052, 131053}
+
+
+def media_id_rejected(response_data: Any) -> bool:
+    """Whether a failed send was rejected because of its media id, not the recipient or other parameters."""
+    code = graph_error_code(response_data)
+    if code in MEDIA_ERROR_CODES:
+        return True
+    if code == 100:  # Invalid parameter: only when the parameter is the media id
+        error = response_data["error"]
+        details = f"{error.get('message', '')} {(error.get('error_data') or {}).get('details', '')}"
+        return "media" in details.lower()
+    return False
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the pooled HTTP client shared by all outbound WhatsApp API calls.
+    
+    Connections are kept alive between sends so each message does not pay a
+    new TCP + TLS handshake. HTTP/2 is only enabled when requested in settings
+    and the optional "h2" package is installed.
+    
+    Returns:
+        Configured httpx.AsyncClient
+    """
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry
+    )
+    
+    http2 = settings.http_enable_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1")
+            http2 = False
+    
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=settings.http_timeout,
+        http2=http2
+    )
+
 
 class WhatsAppClient:
     """Client for interacting with WhatsApp Cloud API."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        rate_limiter: Optional[OutboundRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        media_uploads: Optional[MediaUploadCache] = None,
+        phone_number_id: Optional[str] = None,
+        access_token: Optional[str] = None
+    ):
         self.base_url = settings.whatsapp_api_base_url
-        self.phone_number_id = settings.whatsapp_phone_number_id
-        self.access_token = settings.whatsapp_access_token
+        self.phone_number_id = phone_number_id or settings.whatsapp_phone_number_id
+        self.access_token = access_token or settings.whatsapp_access_token
         self.headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
         }
+        self.http_client = http_client
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.media_uploads = media_uploads
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client, creating one lazily if none was injected."""
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = create_http_client()
+        return self.http_client
+    
+    async def aclose(self):
+        """Close the pooled HTTP client and release its connections."""
+        if self.http_client is not None and not self.http_client.is_closed:
+            await self.http_client.aclose()
+        self.http_client = None
+    
+    async def _post_message(self, to: str, payload: Dict[str, Any], kind: str) -> Dict[str, Any]:
+        """
+        POST a message payload to the Cloud API, recording send metrics.
+        
+        Args:
+            to: Recipient phone number (used for logging)
+            payload: Message payload
+            kind: Human readable message kind for logging (e.g., "Message", "Image")
+            
+        Returns:
+            Dictionary with "success" and either "data" or "error"
+        """
+        label = kind.lower()
+        metrics.SEND_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        result = {"success": False}
+        try:
+            result = await self._post_with_retries(to, payload, kind)
+            return result
+        finally:
+            metrics.SEND_IN_FLIGHT.dec()
+            metrics.SEND_DURATION.labels(label).observe(time.perf_counter() - start)
+            metrics.SEND_REQUESTS.labels(label, "success" if result["success"] else "failure").inc()
+    
+    async def _post_with_retries(self, to: str, payload: Dict[str, Any], kind: str) -> Dict[str, Any]:
+        """
+        POST a message payload to the Cloud API messages endpoint.
+        
+        Transient failures (timeouts, connection errors, 5xx, 429 and
+        retryable Graph API error codes) are retried with backoff within the
+        retry policy's deadline, honoring Retry-After. The deadline starts
+        once the rate limiter lets the first attempt through, and an attempt
+        with less than ``MIN_ATTEMPT_TIMEOUT`` left fails without posting.
+        While the circuit breaker is open the call fails fast without
+        touching the network.
+        
+        Args:
+            to: Recipient phone number (used for logging)
+            payload: Message payload
+            kind: Human readable message kind for logging (e.g., "Message", "Image")
+            
+        Returns:
+            Dictionary with "success" and either "data" or "error"
+        """
+        url = f"{self.base_url}/{self.phone_number_id}/messages"
+        policy = self.retry_policy
+        max_attempts = policy.max_attempts if policy is not None else 1
+        budget = policy.deadline if policy is not None else settings.http_timeout
+        deadline = None
+        attempt = 0
+        result = None
+        
+        while True:
+            attempt += 1
+            
+            if self.circuit_breaker is not None and not self.circuit_breaker.allow():
+                logger.error("Circuit open, not sending %s to %s", kind.lower(), to)
+                return {
+                    "success": False,
+                    "error": "Graph API unavailable (circuit open)",
+                    "attempts": attempt
+                }
+            probe = self.circuit_breaker is not None and self.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+            settled = False
+            
+            try:
+                if self.rate_limiter is not None:
+                    waited = await self.rate_limiter.acquire(self.phone_number_id, to)
+                    if waited:
+                        logger.debug("%s to %s throttled for %.3fs", kind, to, waited)
+                
+                # The budget starts once the first attempt is cleared to go, so
+                # throttling does not eat into the request timeout
+                if deadline is None:
+                    deadline = time.monotonic() + budget
+                remaining = deadline - time.monotonic()
+                if remaining < MIN_ATTEMPT_TIMEOUT:
+                    logger.warning("Send deadline exhausted before sending %s to %s", kind.lower(), to)
+                    return result or {
+                        "success": False,
+                        "error": "Send deadline exhausted",
+                        "attempts": attempt
+                    }
+                timeout = min(settings.http_timeout, remaining)
+                
+                retry_after = None
+                try:
+                    response = await self._get_http_client().post(
+                        url,
+                        json=payload,
+                        headers=self.headers,
+                        timeout=timeout
+                    )
+                    
+                    try:
+                        response_data = response.json()
+                    except ValueError:
+                        response_data = {"raw": response.text}
+                    
+                    if response.status_code == 200:
+                        if self.circuit_breaker is not None:
+                            self.circuit_breaker.record_success()
+                            settled = True
+                        logger.info("%s sent successfully to %s", kind, to)
+                        logger.debug("Response: %s", response_data)
+                        return {
+                            "success": True,
+                            "data": response_data
+                        }
+                    
+                    logger.error("Failed to send %s: %s - %s", kind.lower(), response.status_code, response_data)
+                    result = {
+                        "success": False,
+                        "error": response_data,
+                        "status_code": response.status_code,
+                        "attempts": attempt
+                    }
+                    status_code = response.status_code
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    
+                except httpx.TimeoutException:
+                    logger.error("Timeout while sending %s to %s", kind.lower(), to)
+                    result = {
+                        "success": False,
+                        "error": "Request timeout",
+                        "attempts": attempt
+                    }
+                    status_code = None
+                except httpx.TransportError as e:
+                    logger.error("Error sending %s: %s", kind.lower(), e)
+                    result = {
+                        "success": False,
+                        "error": str(e),
+                        "attempts": attempt
+                    }
+                    status_code = None
+                except Exception as e:
+                    logger.error("Error sending %s: %s", kind.lower(), e)
+                    return {
+                        "success": False,
+                        "error": str(e),
+                        "attempts": attempt
+                    }
+                
+                error_code = graph_error_code(result["error"])
+                metrics.SEND_ERRORS.labels(error_code or status_code or "network").inc()
+                
+                # Only server-side trouble counts against the circuit; a 4xx means
+                # the API is up, and a timeout cut short by our own deadline proves nothing
+                if self.circuit_breaker is not None:
+                    if status_code is not None and status_code < 500:
+                        self.circuit_breaker.record_success()
+                        settled = True
+                    elif status_code is not None or result["error"] != "Request timeout" or timeout >= settings.http_timeout:
+                        self.circuit_breaker.record_failure()
+                        settled = True
+            finally:
+                # Give the half-open probe slot back if this attempt ended
+                # without an outcome (cancelled, deadline, unexpected error)
+                if probe and not settled:
+                    self.circuit_breaker.release()
+            
+            if policy is None or attempt >= max_attempts:
+                return result
+            if not policy.is_retryable(status_code, error_code):
+                return result
+            
+            delay = policy.backoff(attempt, retry_after)
+            if time.monotonic() + delay >= deadline:
+                logger.warning("Retry deadline exhausted sending %s to %s", kind.lower(), to)
+                return result
+            
+            logger.info("Retrying %s to %s in %.2fs (attempt %s/%s)", kind.lower(), to, delay, attempt + 1, max_attempts)
+            await asyncio.sleep(delay)
+    
+    async def get_media_info(self, media_id: str) -> Dict[str, Any]:
+        """
+        Resolve a media id through the Graph API media endpoint.
+        
+        Args:
+            media_id: Id of an inbound media object
+            
+        Returns:
+            Media metadata: "url" (short-lived download URL), "mime_type", "sha256" and "file_size"
+            
+        Raises:
+            httpx.HTTPError: If the request fails or Meta returns an error status
+        """
+        response = await self._get_http_client().get(f"{self.base_url}/{media_id}", headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+    
+    def stream_media(self, url: str):
+        """
+        Open a streaming download of a media URL returned by ``get_media_info``.
+        
+        Args:
+            url: Download URL (requires the access token)
+            
+        Returns:
+            Async context manager yielding an httpx.Response
+        """
+        return self._get_http_client().stream("GET", url, headers={"Authorization": f"Bearer {self.access_token}"})
+    
+    async def upload_media(self, content: bytes, mime_type: str, filename: str = "file") -> str:
+        """
+        Upload media to the Cloud API media endpoint.
+        
+        Args:
+            content: File content
+            mime_type: MIME type of the file (e.g., "image/jpeg")
+            filename: File name sent in the multipart form
+            
+        Returns:
+            Media id usable in messages for 30 days
+            
+        Raises:
+            httpx.HTTPError: If the request fails or Meta returns an error status
+        """
+        response = await self._get_http_client().post(
+            f"{self.base_url}/{self.phone_number_id}/media",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+            data={"messaging_product": "whatsapp", "type": mime_type},
+            files={"file": (filename, content, mime_type)}
+        )
+        response.raise_for_status()
+        return response.json()["id"]
+    
+    async def _upload_from_url(self, url: str, max_bytes: int = IMAGE_MAX_BYTES) -> str:
+        """
+        Fetch a media URL and upload it, reusing the upload of identical content.
+        
+        The download is streamed and abandoned as soon as it exceeds
+        ``max_bytes`` (Meta's limit for the media type), so an oversized or
+        endless URL never gets buffered in memory.
+        
+        Returns:
+            Media id
+            
+        Raises:
+            ValueError: If the content is larger than ``max_bytes``
+            httpx.HTTPError: If the download or the upload fails
+        """
+        chunks = []
+        size = 0
+        async with self._get_http_client().stream("GET", url, follow_redirects=True) as response:
+            response.raise_for_status()
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise ValueError(f"Media is {declared} bytes, over the {max_bytes} byte limit")
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Media exceeds the {max_bytes} byte limit")
+                chunks.append(chunk)
+            mime_type = response.headers.get("Content-Type", "application/octet-stream").split(";")[0].strip()
+        content = b"".join(chunks)
+        filename = url.rsplit("/", 1)[-1].split("?")[0] or "file"
+        key = f"sha256:{hashlib.sha256(content).hexdigest()}"
+        
+        media_id = self.media_uploads.get(key)
+        if media_id is None:
+            media_id = await self.upload_media(content, mime_type, filename)
+            self.media_uploads.put(key, media_id)
+            logger.info("Media %s uploaded as %s", url, media_id)
+        return media_id
+    
+    async def get_message_templates(self, business_account_id: str) -> List[Dict[str, Any]]:
+        """
+        List the message templates of a WhatsApp Business Account.
+        
+        Args:
+            business_account_id: WhatsApp Business Account id owning the templates
+            
+        Returns:
+            Template definitions ("name", "language", "status", "category", "components"), all pages
+            
+        Raises:
+            httpx.HTTPError: If a request fails or Meta returns an error status
+        """
+        url = f"{self.base_url}/{business_account_id}/message_templates"
+        params = {"fields": "name,language,status,category,components", "limit": 250}
+        templates = []
+        while url:
+            response = await self._get_http_client().get(url, params=params, headers=self.headers)
+            response.raise_for_status()
+            data = response.json()
+            templates.extend(data.get("data", []))
+            url = data.get("paging", {}).get("next")
+            params = None  # The next URL already carries the query
+        return templates
     
     async def send_text_message(self, to: str, message: str) -> Dict[str, Any]:
         """
@@ -30,8 +411,6 @@ class WhatsAppClient:
         Returns:
             API response as dictionary
         """
-        url = f"{self.base_url}/{self.phone_number_id}/messages"
-        
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -43,52 +422,18 @@ class WhatsAppClient:
             }
         }
         
-        logger.info(f"Sending text message to {to}")
-        logger.debug(f"Payload: {payload}")
+        logger.info("Sending text message to %s", to)
+        logger.debug("Payload: %s", payload)
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                
-                response_data = response.json()
-                
-                if response.status_code == 200:
-                    logger.info(f"Message sent successfully to {to}")
-                    logger.debug(f"Response: {response_data}")
-                    return {
-                        "success": True,
-                        "data": response_data
-                    }
-                else:
-                    logger.error(f"Failed to send message: {response.status_code} - {response_data}")
-                    return {
-                        "success": False,
-                        "error": response_data,
-                        "status_code": response.status_code
-                    }
-                    
-        except httpx.TimeoutException:
-            logger.error(f"Timeout while sending message to {to}")
-            return {
-                "success": False,
-                "error": "Request timeout"
-            }
-        except Exception as e:
-            logger.error(f"Error sending message: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        return await self._post_message(to, payload, "Message")
     
     async def send_image_message(self, to: str, image_url: str, caption: Optional[str] = None) -> Dict[str, Any]:
         """
         Send an image message via WhatsApp Cloud API.
         
+        With a media upload cache the image is uploaded once and sent by
+        media id; if the upload fails it is sent by link.
+        
         Args:
             to: Recipient phone number
             image_url: URL of the image to send
@@ -97,53 +442,58 @@ class WhatsAppClient:
         Returns:
             API response as dictionary
         """
-        url = f"{self.base_url}/{self.phone_number_id}/messages"
+        image = {"link": image_url}
+        if self.media_uploads is not None:
+            try:
+                image = {"id": await self.media_uploads.get_or_upload(image_url, partial(self._upload_from_url, image_url))}
+            except Exception as e:
+                logger.warning("Media upload failed for %s, sending by link: %s", image_url, e)
         
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
             "to": to.replace("+", ""),
             "type": "image",
-            "image": {
-                "link": image_url
-            }
+            "image": image
         }
         
         if caption:
             payload["image"]["caption"] = caption
         
-        logger.info(f"Sending image message to {to}")
-        logger.debug(f"Payload: {payload}")
+        logger.info("Sending image message to %s", to)
+        logger.debug("Payload: %s", payload)
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                
-                response_data = response.json()
-                
-                if response.status_code == 200:
-                    logger.info(f"Image sent successfully to {to}")
-                    return {
-                        "success": True,
-                        "data": response_data
-                    }
-                else:
-                    logger.error(f"Failed to send image: {response.status_code} - {response_data}")
-                    return {
-                        "success": False,
-                        "error": response_data,
-                        "status_code": response.status_code
-                    }
-                    
-        except Exception as e:
-            logger.error(f"Error sending image: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
-
+        result = await self._post_message(to, payload, "Image")
+        if not result["success"] and "id" in image and media_id_rejected(result.get("error")):
+            # The media id expired on Meta's side; upload again next time
+            self.media_uploads.invalidate(image["id"])
+        return result
+    
+    async def send_template_message(
+        self,
+        to: str,
+        template: CompiledTemplate,
+        body_params: Sequence[Any] = (),
+        header_params: Sequence[Any] = ()
+    ) -> Dict[str, Any]:
+        """
+        Send a template message via WhatsApp Cloud API.
+        
+        Args:
+            to: Recipient phone number
+            template: Compiled template (see ``TemplateCache.get``)
+            body_params: Values for the body placeholders, in order
+            header_params: Values for the header placeholders, or the media URL for media headers
+            
+        Returns:
+            API response as dictionary
+            
+        Raises:
+            TemplateError: If the parameters do not match the template
+        """
+        payload = template.build(to, body_params, header_params)
+        
+        logger.info("Sending template %s to %s", template.name, to)
+        logger.debug("Payload: %s", payload)
+        
+        return await self._post_message(to, payload, "Template")
@@ -1,29 +1,661 @@
 """WhatsApp service with webhook listener and message sender."""
+import argparse
+import asyncio
+import os
+import time
+import httpx
+from pydantic import ValidationError
 from fastapi import FastAPI, Request, HTTPException, Query, status
-from fastapi.responses import JSONResponse, PlainTextResponse
-from typing import Dict, Any
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Dict, Any, List, Literal, Optional, Set
 from datetime import datetime
 from src.models import (
     NormalizedMessage,
     SendMessageRequest,
     SendMessageResponse,
-    HealthResponse
+    HealthResponse,
+    MessageStatus,
+    StatusLookupRequest,
+    StatusLookupResponse,
+    ConversationPage
 )
+from src import jsonutil, metrics
 from src.config import settings
 from src.logger import get_logger
-from src.whatsapp_client import WhatsAppClient
+from src.whatsapp_client import WhatsAppClient, create_http_client
+from src.webhook_queue import WebhookIngestQueue
+from src.webhook_capture import WebhookCapture
+from src.core_client import CoreApiClient
+from src.core_batcher import CoreBatchForwarder
+from src.conversations import ConversationStore
+from src import export as history_export
+from src.keyed_scheduler import KeyedScheduler
+from src.outbox import Outbox, OutboxRetrier
+from src.dedup import MessageDeduplicator
+from src.bulk_sender import RequestStreamingResponse, fan_out, iter_list, iter_ndjson
+from src.rate_limiter import OutboundRateLimiter
+from src.service_window import ServiceWindowTracker
+from src.retry import CircuitBreaker, RetryPolicy
+from src.signature import verify_signature
+from src.status_store import StatusStore
+from src.media import MEDIA_TYPES, MediaCache, MediaDownloader
+from src.media_uploads import MediaUploadCache
+from src.shared_state import create_shared_state
+from src.templates import TemplateCache, TemplateError
+from src.tenants import Tenant, TenantRegistry, load_tenants
 
 logger = get_logger(__name__)
 
+# Encoded once; None disables webhook signature verification
+app_secret = settings.whatsapp_app_secret.encode("utf-8") if settings.whatsapp_app_secret else None
+
+# Dedup claims and rate limit buckets shared by worker processes (None = per-process state)
+shared_state = create_shared_state(
+    settings.shared_state_backend,
+    settings.shared_state_path,
+    settings.shared_state_redis_url
+)
+
+# Business phone numbers served by this process; the configured number is the default tenant
+tenants = TenantRegistry(
+    Tenant(
+        phone_number_id=settings.whatsapp_phone_number_id,
+        access_token=settings.whatsapp_access_token,
+        business_account_id=settings.whatsapp_business_account_id
+    ),
+    load_tenants(settings.tenants_file) if settings.tenants_file else None
+)
+
+# Initialize WhatsApp and Core API clients (their pooled HTTP clients are managed by the app lifespan)
+rate_limiter = OutboundRateLimiter(
+    messages_per_second=settings.rate_limit_messages_per_second,
+    burst=settings.rate_limit_burst,
+    pair_messages_per_second=settings.rate_limit_pair_messages_per_second,
+    pair_burst=settings.rate_limit_pair_burst,
+    shared=shared_state,
+    sender_rates={tenant.phone_number_id: tenant.messages_per_second for tenant in tenants if tenant.messages_per_second}
+) if settings.rate_limit_enabled else None
+circuit_breaker = CircuitBreaker(
+    failure_threshold=settings.circuit_breaker_failure_threshold,
+    reset_timeout=settings.circuit_breaker_reset_timeout
+)
+retry_policy = RetryPolicy(
+    max_attempts=settings.retry_max_attempts,
+    base_delay=settings.retry_base_delay,
+    max_delay=settings.retry_max_delay,
+    deadline=settings.retry_deadline
+)
+
+
+def _create_whatsapp_client(tenant: Tenant) -> WhatsAppClient:
+    """Build the client of one tenant (its own connection pool and media upload cache)."""
+    return WhatsAppClient(
+        rate_limiter=rate_limiter,
+        retry_policy=retry_policy,
+        circuit_breaker=circuit_breaker,
+        media_uploads=MediaUploadCache(
+            ttl=settings.media_upload_ttl,
+            max_entries=settings.media_upload_max_entries
+        ) if settings.media_upload_enabled else None,
+        phone_number_id=tenant.phone_number_id,
+        access_token=tenant.access_token
+    )
+
+
+whatsapp_client = _create_whatsapp_client(tenants.default)
+media_uploads = whatsapp_client.media_uploads
+whatsapp_clients = {
+    tenant.phone_number_id: whatsapp_client if tenant is tenants.default else _create_whatsapp_client(tenant)
+    for tenant in tenants
+}
+core_client = CoreApiClient(url=tenants.default.core_api_url)
+# Tenants forwarding to their own Core API endpoint (the others share core_client and the batcher)
+core_clients = {
+    tenant.phone_number_id: CoreApiClient(url=tenant.core_api_url)
+    for tenant in tenants
+    if tenant is not tenants.default and tenant.core_api_url
+}
+
+
+# Unregistered phone_number_ids already reported, so a misrouted number logs once and not per webhook
+_unregistered_phone_number_ids: Set[str] = set()
+
+
+def _warn_unregistered(phone_number_id: str):
+    """Log a webhook for an unregistered number: a warning the first time, debug afterwards."""
+    if phone_number_id in _unregistered_phone_number_ids:
+        logger.debug("Webhook for unregistered phone_number_id %s, using default routing", phone_number_id)
+        return
+    _unregistered_phone_number_ids.add(phone_number_id)
+    logger.warning("Webhook for unregistered phone_number_id %s, using default routing", phone_number_id)
+
+
+def client_for(phone_number_id: Optional[str]) -> Optional[WhatsAppClient]:
+    """
+    Return the WhatsApp client of a tenant.
+    
+    Args:
+        phone_number_id: Business phone number id, or None for the default tenant
+        
+    Returns:
+        The tenant's client, or None if the number is not registered
+    """
+    if phone_number_id is None:
+        return whatsapp_client
+    return whatsapp_clients.get(phone_number_id)
+
+
+def _create_template_cache(client: WhatsAppClient, business_account_id: str) -> TemplateCache:
+    """Build the template cache of one business account, fetched through one of its numbers' clients."""
+    return TemplateCache(
+        partial(client.get_message_templates, business_account_id),
+        refresh_interval=settings.template_refresh_interval,
+        miss_refresh_interval=settings.template_miss_refresh_interval,
+        cache_path=os.path.join(settings.template_cache_dir, f"{business_account_id}.json") if settings.template_cache_dir else None
+    )
+
+
+# Compiled templates per sending number; numbers of one business account share a cache
+template_caches: Dict[str, TemplateCache] = {}
+_account_template_caches: Dict[str, TemplateCache] = {}
+for _tenant in tenants:
+    if _tenant.business_account_id:
+        if _tenant.business_account_id not in _account_template_caches:
+            _account_template_caches[_tenant.business_account_id] = _create_template_cache(
+                whatsapp_clients[_tenant.phone_number_id],
+                _tenant.business_account_id
+            )
+        template_caches[_tenant.phone_number_id] = _account_template_caches[_tenant.business_account_id]
+core_batcher = CoreBatchForwarder(
+    core_client,
+    max_size=settings.core_batch_max_size,
+    max_wait_ms=settings.core_batch_max_wait_ms,
+    on_reply=lambda message, reply: schedule_core_reply(message, reply)
+)
+
+# Orders Core API forwards per sender (ordered_forwarding_enabled)
+keyed_scheduler = KeyedScheduler(shards=settings.ordered_forwarding_shards)
+# Sends the core's replies per sender, apart from the forwards (core_replies_enabled)
+reply_scheduler = KeyedScheduler(shards=settings.core_reply_shards)
+
+deduplicator = MessageDeduplicator(
+    max_entries=settings.dedup_max_entries,
+    ttl=settings.dedup_ttl,
+    persist_path=settings.dedup_persist_path,
+    shared=shared_state
+)
+
+outbox = Outbox(settings.outbox_path, synchronous=settings.outbox_synchronous)
+
+status_store = StatusStore(settings.status_store_path, synchronous=settings.status_store_synchronous)
+
+conversation_store = ConversationStore(settings.conversations_path)
+
+# Raw webhook requests written to rotating files for replay (webhook_capture_enabled)
+webhook_capture = WebhookCapture(
+    settings.webhook_capture_dir,
+    rotate_bytes=settings.webhook_capture_rotate_bytes,
+    max_files=settings.webhook_capture_max_files
+)
+
+# Last inbound message per customer, to answer closed-window sends without calling Meta
+service_windows = ServiceWindowTracker(
+    max_entries=settings.service_window_max_entries,
+    persist_path=settings.service_window_persist_path,
+    shared=shared_state if settings.service_window_policy != "off" else None
+)
+
+media_downloader = MediaDownloader(
+    whatsapp_client,
+    MediaCache(settings.media_cache_dir),
+    max_bytes=settings.media_max_bytes,
+    timeout=settings.media_download_timeout,
+    chunk_size=settings.media_chunk_size
+)
+
+
+async def _forward_outbox_entry(payload: Dict[str, Any]) -> bool:
+    """Forward a message stored in the outbox (used by the retry scheduler), behind the sender's queued messages."""
+    return await forward_in_order(NormalizedMessage(**payload))
+
+
+def outbox_inflight_grace() -> float:
+    """
+    Seconds a fresh outbox entry is left to its own delivery before the retrier may take it.
+    
+    Defaults to the longest a queued delivery may wait (``outbox_queue_max_wait``;
+    later ones leave their entries to the retrier) plus the time it may take
+    to forward the message: the media download and the Core API request.
+    """
+    if settings.outbox_inflight_grace is not None:
+        return settings.outbox_inflight_grace
+    return settings.outbox_queue_max_wait + settings.media_download_timeout + settings.http_timeout
+
+
+def _queued_too_long(persisted_at: Optional[float]) -> bool:
+    """Whether a queued delivery is past the wait covered by the outbox in-flight grace."""
+    return persisted_at is not None and time.monotonic() - persisted_at > settings.outbox_queue_max_wait
+
+
+outbox_retrier = OutboxRetrier(
+    outbox,
+    send=_forward_outbox_entry,
+    poll_interval=settings.outbox_retry_poll_interval,
+    base_delay=settings.outbox_retry_base_delay,
+    max_delay=settings.outbox_retry_max_delay,
+    max_attempts=settings.outbox_max_attempts
+)
+
+
+def extract_messages(body: Dict[str, Any]) -> List[NormalizedMessage]:
+    """
+    Normalize the messages of a webhook payload and handle its status updates.
+    
+    Args:
+        body: Parsed webhook payload sent by Meta
+        
+    Returns:
+        Normalized messages in payload order
+    """
+    normalized_messages = []
+    
+    for entry in body.get("entry", []):
+        for change in entry.get("changes", []):
+            value = change.get("value", {})
+            phone_number_id = value.get("metadata", {}).get("phone_number_id")
+            if phone_number_id and phone_number_id not in whatsapp_clients:
+                _warn_unregistered(phone_number_id)
+            
+            # Process messages
+            if "messages" in value:
+                for message in value["messages"]:
+                    if settings.dedup_enabled and deduplicator.is_duplicate(message.get("id")):
+                        logger.info("Duplicate message %s dropped", message.get('id'))
+                        continue
+                    
+                    with metrics.NORMALIZE_DURATION.time():
+                        normalized = normalize_message(message, value)
+                    metrics.MESSAGES_RECEIVED.labels(normalized.message_type).inc()
+                    service_windows.touch(
+                        phone_number_id or tenants.default.phone_number_id,
+                        normalized.sender,
+                        float(message.get("timestamp") or time.time())
+                    )
+                    logger.info("Normalized message %s from %s", normalized.message_id, normalized.sender)
+                    logger.debug("Normalized message: %s", normalized)
+                    normalized_messages.append(normalized)
+                    
+                    # Auto-reply example (optional)
+                    # await send_auto_reply(normalized.sender, normalized.message)
+            
+            # Process status updates
+            if "statuses" in value:
+                for status_update in value["statuses"]:
+                    logger.info("Status update %s for message %s", status_update.get("status"), status_update.get("id"))
+                    logger.debug("Status update: %s", status_update)
+                if status_store.is_open:
+                    status_store.record(value["statuses"])
+    
+    return normalized_messages
+
+
+async def claim_messages(messages: List[NormalizedMessage]) -> List[NormalizedMessage]:
+    """
+    Drop messages already taken by another worker process.
+    
+    Only does anything with a shared state backend; the in-process check in
+    ``extract_messages`` covers a single worker.
+    """
+    if deduplicator.shared is None or not settings.dedup_enabled or not messages:
+        return messages
+    claims = await asyncio.gather(*(deduplicator.claim(message.message_id) for message in messages))
+    for message, claimed in zip(messages, claims):
+        if not claimed:
+            logger.info("Duplicate message %s dropped (claimed by another worker)", message.message_id)
+    return [message for message, claimed in zip(messages, claims) if claimed]
+
+
+async def accept_messages(body: Dict[str, Any]) -> List[NormalizedMessage]:
+    """
+    Extract the new messages of a webhook payload.
+    
+    Drops the messages already seen by this or another worker and publishes
+    the customers' service windows to the other workers.
+    """
+    messages = await claim_messages(extract_messages(body))
+    await service_windows.share()
+    return messages
+
+
+async def persist_messages(messages: List[NormalizedMessage]) -> Optional[List[int]]:
+    """
+    Record messages in the durable outbox, if enabled.
+    
+    Returns:
+        Outbox ids, or None when the outbox is disabled
+    """
+    if not outbox.is_open:
+        return None
+    return await outbox.append(
+        [to_unified_message(message) for message in messages],
+        delay=outbox_inflight_grace()
+    )
+
+
+async def deliver_messages(
+    messages: List[NormalizedMessage],
+    outbox_ids: Optional[List[int]] = None,
+    persisted_at: Optional[float] = None
+):
+    """
+    Forward messages to the Core API and update their outbox entries.
+    
+    Failed entries are handed to the retry scheduler with backoff. When media
+    download is enabled, media messages are handed to the media workers and
+    forwarded once their file is cached; with ordered forwarding they keep
+    their place in the sender's queue meanwhile. Queued deliveries that waited longer
+    than ``outbox_queue_max_wait`` since ``persisted_at`` (monotonic) are
+    dropped: the retrier takes their entries over, so they are not forwarded twice.
+    """
+    if outbox_ids is not None and _queued_too_long(persisted_at):
+        logger.warning("Delivery of %s messages queued too long, leaving them to the outbox retrier", len(messages))
+        return
+    if media_queue.running and not keyed_scheduler.running:
+        messages, outbox_ids = _hand_off_media(messages, outbox_ids, persisted_at)
+    results = await forward_messages_to_core(messages)
+    await _settle_outbox(outbox_ids, results)
+
+
+async def _settle_outbox(outbox_ids: Optional[List[int]], results: List[bool]):
+    """Mark delivered outbox entries and schedule retries for the rest."""
+    if outbox_ids is None:
+        return
+    
+    delivered = [entry_id for entry_id, success in zip(outbox_ids, results) if success]
+    if delivered:
+        await outbox.mark_delivered(delivered)
+    for entry_id, success in zip(outbox_ids, results):
+        if not success:
+            await outbox_retrier.record_failure(entry_id, 1, "Core API delivery failed")
+
+
+def _hand_off_media(messages: List[NormalizedMessage], outbox_ids: Optional[List[int]], persisted_at: Optional[float] = None):
+    """
+    Queue media messages for download and return the ones to forward now.
+    
+    Returns:
+        Tuple of the remaining messages and their outbox ids (None without outbox)
+    """
+    entry_ids = outbox_ids if outbox_ids is not None else [None] * len(messages)
+    remaining, remaining_ids = [], []
+    for message, entry_id in zip(messages, entry_ids):
+        if message.media_id:
+            if media_queue.enqueue(partial(deliver_media_message, message, entry_id, persisted_at)):
+                continue
+            logger.warning("Media queue full, forwarding message %s without downloading its media", message.message_id)
+        remaining.append(message)
+        remaining_ids.append(entry_id)
+    return remaining, remaining_ids if outbox_ids is not None else None
+
+
+async def deliver_media_message(
+    message: NormalizedMessage,
+    outbox_id: Optional[int] = None,
+    persisted_at: Optional[float] = None
+):
+    """
+    Download a message's media into the local cache, then forward it to the Core API.
+    
+    If the download fails the message is still forwarded, carrying only its media id.
+    """
+    if outbox_id is not None and _queued_too_long(persisted_at):
+        logger.warning("Media message %s queued too long, leaving it to the outbox retrier", message.message_id)
+        return
+    await download_media(message)
+    success = await forward_in_order(message)
+    await _settle_outbox(None if outbox_id is None else [outbox_id], [success])
+
+
+async def download_media(message: NormalizedMessage):
+    """Download a message's media into the local cache and reference it from the message; failures are logged."""
+    try:
+        media = await media_downloader.fetch(message.media_id, client_for(message.phone_number_id))
+        message.media_path = media["path"]
+        message.media_sha256 = media["sha256"]
+        message.media_mime_type = media["mime_type"] or message.media_mime_type
+    except Exception as e:
+        logger.error("Could not download media %s of message %s: %s", message.media_id, message.message_id, e)
+
+
+def _start_media_download(message: NormalizedMessage) -> Optional[asyncio.Future]:
+    """
+    Hand a media message's download to the media workers.
+    
+    Returns:
+        Future resolved once the download finished or failed, or None when
+        there is nothing to download or the media queue is full
+    """
+    if not message.media_id or not media_queue.running:
+        return None
+    done = asyncio.get_running_loop().create_future()
+    
+    async def job():
+        try:
+            await download_media(message)
+        finally:
+            if not done.done():
+                done.set_result(None)
+    
+    if media_queue.enqueue(job):
+        return done
+    logger.warning("Media queue full, forwarding message %s without downloading its media", message.message_id)
+    return None
+
+
+async def _forward_after_download(message: NormalizedMessage, download: Optional[asyncio.Future]) -> bool:
+    """Wait for the message's media download, if any, then forward it to the core."""
+    if download is not None:
+        await download
+    return await forward_to_core(message)
+
+
+async def process_webhook_body(body: Dict[str, Any]):
+    """
+    Process a webhook payload: normalize messages, forward them and handle statuses.
+    
+    Args:
+        body: Parsed webhook payload sent by Meta
+    """
+    normalized_messages = await accept_messages(body)
+    if normalized_messages:
+        if conversation_store.is_open:
+            conversation_store.record_inbound(normalized_messages)
+        outbox_ids = await persist_messages(normalized_messages)
+        await deliver_messages(normalized_messages, outbox_ids)
+
+
+async def _flush_service_windows_periodically():
+    """Persist customer service window updates in the background."""
+    while True:
+        await asyncio.sleep(settings.service_window_flush_interval)
+        try:
+            await asyncio.to_thread(service_windows.flush)
+        except Exception as e:
+            logger.error("Error saving service windows: %s", e)
+
+
+async def _flush_dedup_periodically():
+    """Persist newly seen message ids in the background."""
+    while True:
+        await asyncio.sleep(settings.dedup_flush_interval)
+        try:
+            await asyncio.to_thread(deduplicator.flush)
+        except Exception as e:
+            logger.error("Error saving seen message ids: %s", e)
+
+
+async def _prune_statuses_periodically():
+    """Delete message statuses older than the retention period."""
+    while True:
+        await asyncio.sleep(settings.status_store_prune_interval)
+        try:
+            pruned = await status_store.prune(time.time() - settings.status_store_retention)
+            if pruned:
+                logger.info("Pruned %s expired message statuses", pruned)
+        except Exception as e:
+            logger.error("Error pruning message statuses: %s", e)
+
+
+async def _prune_outbox_periodically():
+    """Delete delivered and dead outbox entries older than the retention period."""
+    while True:
+        await asyncio.sleep(settings.outbox_prune_interval)
+        try:
+            pruned = await outbox.prune(time.time() - settings.outbox_retention)
+            if pruned:
+                logger.info("Pruned %s settled outbox entries", pruned)
+        except Exception as e:
+            logger.error("Error pruning the outbox: %s", e)
+
+
+async def _prune_conversations_periodically():
+    """Drop conversation partitions older than the retention period."""
+    while True:
+        await asyncio.sleep(settings.conversations_prune_interval)
+        try:
+            dropped = await conversation_store.prune(settings.conversations_retention_days)
+            if dropped:
+                logger.info("Dropped %s expired conversation partitions", dropped)
+        except Exception as e:
+            logger.error("Error pruning conversations: %s", e)
+
+
+# Background queue used when webhook_async_processing is enabled.
+# Items are zero-argument coroutine functions (jobs).
+webhook_queue = WebhookIngestQueue(
+    handler=lambda job: job(),
+    maxsize=settings.webhook_queue_maxsize,
+    workers=settings.webhook_workers
+)
+
+# Worker pool for inbound media downloads (media_download_enabled), kept
+# apart from the webhook workers so slow downloads never hold up text messages
+media_queue = WebhookIngestQueue(
+    handler=lambda job: job(),
+    maxsize=settings.media_queue_maxsize,
+    workers=settings.media_workers
+)
+
+# Scrape-time gauges and counters for the background components
+metrics.registry.gauge("whatsapp_media_queue_depth", "Media downloads waiting for a worker", function=lambda: media_queue.depth)
+metrics.registry.gauge("whatsapp_webhook_queue_depth", "Webhook jobs waiting for a worker", function=lambda: webhook_queue.depth)
+metrics.registry.gauge("whatsapp_ordered_shard_skew", "Busiest ordering shard depth over the mean shard depth", function=lambda: keyed_scheduler.shard_skew())
+metrics.registry.gauge("whatsapp_ordered_hot_sender_depth", "Pending forwards of the sender with the longest queue", function=lambda: keyed_scheduler.hot_key_depth())
+metrics.registry.gauge("whatsapp_core_batch_pending", "Messages waiting for the next Core API batch", function=lambda: core_batcher.stats()["pending"])
+metrics.registry.counter(
+    "whatsapp_service_window_avoided_sends",
+    "Free-form sends to closed customer service windows answered without calling Meta",
+    function=lambda: service_windows.avoided + service_windows.rerouted
+)
+metrics.registry.counter("whatsapp_dedup_hits", "Duplicate webhook messages dropped", function=lambda: deduplicator.hits)
+metrics.registry.gauge(
+    "whatsapp_circuit_open",
+    "1 while the Cloud API circuit breaker is open",
+    function=lambda: int(circuit_breaker.state != CircuitBreaker.CLOSED)
+)
+if rate_limiter is not None:
+    metrics.registry.gauge(
+        "whatsapp_throttled_seconds",
+        "Total time sends spent waiting on the rate limiter",
+        function=lambda: rate_limiter.throttled_seconds
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown."""
+    for client in [*whatsapp_clients.values(), core_client, *core_clients.values()]:
+        client.http_client = create_http_client()
+    logger.info("WhatsApp and Core API HTTP connection pools created for %s tenants", len(tenants))
+    if settings.webhook_capture_enabled:
+        webhook_capture.open()
+    window_flusher = None
+    if settings.service_window_policy != "off":
+        service_windows.load()
+        window_flusher = asyncio.create_task(_flush_service_windows_periodically())
+    dedup_flusher = None
+    if settings.dedup_enabled and settings.dedup_persist_path:
+        deduplicator.load()
+        dedup_flusher = asyncio.create_task(_flush_dedup_periodically())
+    status_pruner = None
+    if settings.status_store_enabled:
+        status_store.open()
+        status_pruner = asyncio.create_task(_prune_statuses_periodically())
+    conversation_pruner = None
+    if settings.conversations_enabled:
+        conversation_store.open()
+        conversation_pruner = asyncio.create_task(_prune_conversations_periodically())
+    outbox_pruner = None
+    if settings.outbox_enabled:
+        outbox.open()
+        await outbox_retrier.start()
+        outbox_pruner = asyncio.create_task(_prune_outbox_periodically())
+    if settings.core_batch_enabled:
+        await core_batcher.start()
+    if settings.ordered_forwarding_enabled:
+        await keyed_scheduler.start()
+    if settings.core_replies_enabled:
+        await reply_scheduler.start()
+    if settings.media_download_enabled:
+        await media_queue.start()
+    if settings.webhook_async_processing:
+        await webhook_queue.start()
+    try:
+        yield
+    finally:
+        await webhook_queue.stop(drain_timeout=settings.webhook_drain_timeout)
+        webhook_capture.close()
+        await media_queue.stop(drain_timeout=settings.webhook_drain_timeout)
+        await outbox_retrier.stop()
+        if outbox_pruner is not None:
+            outbox_pruner.cancel()
+            await asyncio.gather(outbox_pruner, return_exceptions=True)
+        await keyed_scheduler.stop(drain_timeout=settings.webhook_drain_timeout)
+        await core_batcher.stop()
+        await reply_scheduler.stop(drain_timeout=settings.webhook_drain_timeout)
+        outbox.close()
+        if status_pruner is not None:
+            status_pruner.cancel()
+            await asyncio.gather(status_pruner, return_exceptions=True)
+        status_store.close()
+        if conversation_pruner is not None:
+            conversation_pruner.cancel()
+            await asyncio.gather(conversation_pruner, return_exceptions=True)
+        conversation_store.close()
+        if dedup_flusher is not None:
+            dedup_flusher.cancel()
+            await asyncio.gather(dedup_flusher, return_exceptions=True)
+        deduplicator.close()
+        if window_flusher is not None:
+            window_flusher.cancel()
+            await asyncio.gather(window_flusher, return_exceptions=True)
+        service_windows.close()
+        if shared_state is not None:
+            await shared_state.close()
+        for client in [*whatsapp_clients.values(), core_client, *core_clients.values()]:
+            await client.aclose()
+        logger.info("WhatsApp and Core API HTTP connection pools closed")
+
+
 app = FastAPI(
     title="WhatsApp Integration Service",
     description="Service for receiving and sending WhatsApp messages via Meta Cloud API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Initialize WhatsApp client
-whatsapp_client = WhatsAppClient()
-
 
 @app.get("/", response_model=HealthResponse)
 async def root():
@@ -49,7 +681,7 @@ async def verify_webhook(
     We need to validate the verify_token and return the challenge.
     """
     logger.info("Webhook verification request received")
-    logger.debug(f"Mode: {hub_mode}, Token: {hub_verify_token}")
+    logger.debug("Mode: %s, Token: %s", hub_mode, hub_verify_token)
     
     if hub_mode == "subscribe" and hub_verify_token == settings.whatsapp_verify_token:
         logger.info("Webhook verified successfully")
@@ -70,46 +702,105 @@ async def receive_webhook(request: Request):
     This endpoint receives events from Meta WhatsApp Cloud API and normalizes them
     to a standard format for internal processing.
     """
+    metrics.WEBHOOK_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    outcome = "error"
     try:
-        body = await request.json()
-        print("🔔 Webhook event received")
-        logger.info("Webhook event received")
-        logger.debug(f"Webhook payload: {body}")
+        raw_body = await request.body()
         
-        # Extract entry data
-        if "entry" not in body:
-            logger.warning("No entry field in webhook payload")
-            return JSONResponse(content={"status": "no_entry"}, status_code=200)
+        # Reject forgeries before spending anything on parsing (or capturing them)
+        if app_secret is not None and not verify_signature(
+            raw_body, request.headers.get("x-hub-signature-256"), app_secret
+        ):
+            outcome = "invalid_signature"
+            logger.warning("Webhook rejected: invalid X-Hub-Signature-256")
+            return JSONResponse(content={"status": outcome}, status_code=status.HTTP_401_UNAUTHORIZED)
         
-        for entry in body.get("entry", []):
-            for change in entry.get("changes", []):
-                value = change.get("value", {})
-                
-                # Process messages
-                if "messages" in value:
-                    for message in value["messages"]:
-                        normalized = normalize_message(message, value)
-                        print(f"📨 Normalized message: {normalized.dict()}")
-                        logger.info(f"Normalized message: {normalized.dict()}")
-                        
-                        # Forward to Core API
-                        await forward_to_core(normalized)
-                        
-                        # Auto-reply example (optional)
-                        # await send_auto_reply(normalized.sender, normalized.message)
-                
-                # Process status updates
-                if "statuses" in value:
-                    for status_update in value["statuses"]:
-                        logger.info(f"Status update: {status_update}")
-                        # Handle delivery, read, sent statuses
+        if webhook_capture.is_open:
+            webhook_capture.record(raw_body, request.headers.get("x-hub-signature-256"))
         
-        return JSONResponse(content={"status": "ok"}, status_code=200)
+        # Parse the raw bytes directly (orjson when available) instead of request.json()
+        body = jsonutil.loads(raw_body)
+        outcome = await ingest_webhook(body)
+        return JSONResponse(content={"status": outcome}, status_code=200)
         
     except Exception as e:
-        logger.error(f"Error processing webhook: {str(e)}", exc_info=True)
+        logger.error("Error processing webhook: %s", e, exc_info=True)
         # Always return 200 to Meta to avoid retries
         return JSONResponse(content={"status": "error", "message": str(e)}, status_code=200)
+    finally:
+        metrics.WEBHOOK_IN_FLIGHT.dec()
+        metrics.WEBHOOK_DURATION.observe(time.perf_counter() - start)
+        metrics.WEBHOOK_REQUESTS.labels(outcome).inc()
+
+
+async def ingest_webhook(body: Dict[str, Any]) -> str:
+    """
+    Process a webhook payload inline or hand it to the background queue.
+    
+    Args:
+        body: Parsed webhook payload sent by Meta
+        
+    Returns:
+        Status reported back to Meta: "ok", "queued" or "no_entry"
+    """
+    logger.info("Webhook event received")
+    logger.debug("Webhook payload: %s", body)
+    
+    # Extract entry data
+    if "entry" not in body:
+        logger.warning("No entry field in webhook payload")
+        return "no_entry"
+    
+    # Ack immediately and let the background workers do the processing.
+    # With the outbox enabled messages are made durable before the ack.
+    # If the queue is full (or not running) fall back to inline processing.
+    if webhook_queue.running:
+        if outbox.is_open:
+            messages = await accept_messages(body)
+            job = partial(deliver_messages, messages, await persist_messages(messages), time.monotonic())
+        else:
+            job = partial(process_webhook_body, body)
+        if webhook_queue.enqueue(job):
+            return "queued"
+        logger.warning("Webhook queue full, processing inline")
+        await job()
+    else:
+        await process_webhook_body(body)
+    
+    return "ok"
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(
+        content=metrics.registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/stats")
+async def get_stats():
+    """Runtime statistics of the background processing components."""
+    return {
+        "capture": webhook_capture.stats(),
+        "ingest": webhook_queue.stats(),
+        "core_batcher": core_batcher.stats(),
+        "ordering": keyed_scheduler.stats(),
+        "outbox": {**outbox.stats(), **outbox_retrier.stats()},
+        "tenants": {"count": len(tenants), "phone_number_ids": [tenant.phone_number_id for tenant in tenants]},
+        "dedup": deduplicator.stats(),
+        "shared_state": shared_state.stats() if shared_state is not None else None,
+        "status_store": status_store.stats(),
+        "conversations": conversation_store.stats(),
+        "media": {"queue": media_queue.stats(), **media_downloader.stats()},
+        "media_uploads": media_uploads.stats() if media_uploads is not None else None,
+        "service_windows": {"policy": settings.service_window_policy, **service_windows.stats()},
+        "templates": {account: cache.stats() for account, cache in _account_template_caches.items()},
+        "rate_limiter": rate_limiter.stats() if rate_limiter is not None else None,
+        "circuit_breaker": circuit_breaker.stats()
+    }
 
 
 def normalize_message(message: Dict[str, Any], value: Dict[str, Any]) -> NormalizedMessage:
@@ -145,82 +836,340 @@ def normalize_message(message: Dict[str, Any], value: Dict[str, Any]) -> Normali
     else:
         message_text = f"[{message_type} message]"
     
+    # Keep the media id so the media can be downloaded later
+    media_id = None
+    media_mime_type = None
+    if message_type in MEDIA_TYPES:
+        media = message.get(message_type, {})
+        media_id = media.get("id")
+        media_mime_type = media.get("mime_type")
+    
     # Get timestamp
     timestamp = datetime.fromtimestamp(int(message.get("timestamp", 0))).isoformat()
     
-    return NormalizedMessage(
+    # Every field is built above from known types, so skip re-validation
+    return NormalizedMessage.model_construct(
         channel="whatsapp",
         sender=sender,
         message=message_text,
         timestamp=timestamp,
         message_id=message.get("id"),
-        message_type=message_type
+        message_type=message_type,
+        media_id=media_id,
+        media_mime_type=media_mime_type,
+        media_path=None,
+        media_sha256=None,
+        phone_number_id=value.get("metadata", {}).get("phone_number_id")
     )
 
 
-@app.post("/send/whatsapp", response_model=SendMessageResponse)
-async def send_message(request: SendMessageRequest):
+async def _service_window_open(phone_number_id: str, to: str) -> bool:
     """
-    Endpoint to send WhatsApp messages.
+    Whether a free-form message to a customer would be delivered.
+    
+    Answered from memory or the shared state backend; on a miss the
+    conversation history (shared by worker processes and kept across
+    restarts) is checked as well.
+    """
+    if await service_windows.check(phone_number_id, to):
+        return True
+    if conversation_store.is_open:
+        last = await conversation_store.last_inbound(
+            to,
+            phone_number_id,
+            time.time() - service_windows.window,
+            include_unaddressed=phone_number_id == tenants.default.phone_number_id
+        )
+        if last is not None:
+            service_windows.touch(phone_number_id, to, last)
+            return True
+    return False
+
+
+async def _send_template(client: WhatsAppClient, request: SendMessageRequest) -> Dict[str, Any]:
+    """
+    Send a template message, resolving the template through the sender's template cache.
     
-    Supports sending text messages and images.
+    Raises:
+        HTTPException: 400 if the template is unknown or its parameters do not match,
+            503 if the templates could not be loaded
     """
-    logger.info(f"Send message request for {request.to}")
+    cache = template_caches.get(client.phone_number_id)
+    if cache is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Templates require a business_account_id for the sending number"
+        )
+    if not request.template_name:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="template_name is required for template messages"
+        )
     
+    header_params = request.template_header_params or ([request.media_url] if request.media_url else [])
     try:
-        if request.message_type == "text":
-            result = await whatsapp_client.send_text_message(
-                to=request.to,
-                message=request.message
-            )
-        elif request.message_type == "image":
-            if not request.media_url:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="media_url is required for image messages"
+        template = await cache.get(request.template_name, request.template_language)
+        return await client.send_template_message(
+            to=request.to,
+            template=template,
+            body_params=request.template_params,
+            header_params=header_params
+        )
+    except TemplateError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except httpx.HTTPError as e:
+        logger.error("Could not load message templates: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Message templates are unavailable"
+        )
+
+
+async def dispatch_send(request: SendMessageRequest) -> SendMessageResponse:
+    """
+    Send a message through the WhatsApp client.
+    
+    Args:
+        request: Validated send request
+        
+    Returns:
+        SendMessageResponse with the Cloud API result
+        
+    Raises:
+        HTTPException: If the request is invalid for its message type
+    """
+    client = client_for(request.from_phone_number_id)
+    if client is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sender phone_number_id: {request.from_phone_number_id}"
+        )
+    
+    if request.message_type != "template" and settings.service_window_policy != "off":
+        if not await _service_window_open(client.phone_number_id, request.to):
+            if settings.service_window_policy == "template" and settings.service_window_template:
+                service_windows.record_rerouted()
+                request = request.model_copy(update={
+                    "message_type": "template",
+                    "template_name": settings.service_window_template,
+                    "template_language": settings.service_window_template_language,
+                    "template_params": [request.message],
+                    "template_header_params": [],
+                    "media_url": None
+                })
+            else:
+                service_windows.record_avoided()
+                return SendMessageResponse(
+                    success=False,
+                    error="Customer service window closed: the recipient has not written in the last 24 hours, send a template",
+                    details={"code": 131047, "window_expires_at": service_windows.expires_at(client.phone_number_id, request.to)}
                 )
-            result = await whatsapp_client.send_image_message(
-                to=request.to,
-                image_url=request.media_url,
-                caption=request.message
-            )
-        else:
+    
+    if request.message_type == "text":
+        if not request.message:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Unsupported message type: {request.message_type}"
+                detail="message is required for text messages"
             )
-        
-        if result["success"]:
-            message_id = result.get("data", {}).get("messages", [{}])[0].get("id")
-            return SendMessageResponse(
-                success=True,
-                message_id=message_id,
-                details=result.get("data")
+        result = await client.send_text_message(
+            to=request.to,
+            message=request.message
+        )
+    elif request.message_type == "image":
+        if not request.media_url:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="media_url is required for image messages"
             )
-        else:
-            return SendMessageResponse(
-                success=False,
-                error=str(result.get("error")),
-                details=result
+        result = await client.send_image_message(
+            to=request.to,
+            image_url=request.media_url,
+            caption=request.message
+        )
+    elif request.message_type == "template":
+        result = await _send_template(client, request)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported message type: {request.message_type}"
+        )
+    
+    if result["success"]:
+        message_id = result.get("data", {}).get("messages", [{}])[0].get("id")
+        if message_id and status_store.is_open:
+            status_store.record_accepted(message_id, request.to)
+        if conversation_store.is_open:
+            conversation_store.record_outbound(
+                message_id,
+                request.to,
+                request.message_type,
+                request.template_name if request.message_type == "template" else request.message,
+                phone_number_id=client.phone_number_id,
+                media_url=request.media_url
             )
-            
+        return SendMessageResponse(
+            success=True,
+            message_id=message_id,
+            details=result.get("data")
+        )
+    else:
+        return SendMessageResponse(
+            success=False,
+            error=str(result.get("error")),
+            details=result
+        )
+
+
+@app.post("/send/whatsapp", response_model=SendMessageResponse)
+async def send_message(request: SendMessageRequest):
+    """
+    Endpoint to send WhatsApp messages.
+    
+    Supports text, image and template messages. With a service window
+    policy, free-form messages to customers who have not written in the
+    last 24 hours are rejected without calling Meta, or sent as the
+    fallback template.
+    """
+    logger.info("Send message request for %s", request.to)
+    
+    try:
+        return await dispatch_send(request)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in send_message endpoint: {str(e)}", exc_info=True)
+        logger.error("Error in send_message endpoint: %s", e, exc_info=True)
         return SendMessageResponse(
             success=False,
             error=str(e)
         )
 
 
-async def forward_to_core(normalized_message: NormalizedMessage):
-    """Forward normalized message to core API."""
-    import httpx
+@app.post("/send/whatsapp/bulk")
+async def send_bulk(request: Request):
+    """
+    Endpoint to send many WhatsApp messages in one call.
+    
+    Accepts either a JSON array of send requests or an NDJSON stream
+    (Content-Type: application/x-ndjson) with one send request per line.
+    Sends are fanned out with at most ``bulk_send_concurrency`` in flight and
+    per-recipient results are streamed back as NDJSON as they complete,
+    followed by a summary line.
+    """
+    logger.info("Bulk send request received")
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        body_read = asyncio.Event()
+        return RequestStreamingResponse(
+            fan_out(iter_ndjson(request.stream(), body_read), dispatch_send, settings.bulk_send_concurrency),
+            body_read
+        )
+    
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Body must be a JSON array or NDJSON"
+        )
+    if not isinstance(body, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Body must be a JSON array of send requests"
+        )
+    # The body is fully read, so the stock response can watch for the client disconnecting
+    return StreamingResponse(
+        fan_out(iter_list(body), dispatch_send, settings.bulk_send_concurrency),
+        media_type="application/x-ndjson"
+    )
+
+
+def _require_status_store():
+    """Raise 503 when status tracking is disabled."""
+    if not status_store.is_open:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Message status tracking is disabled"
+        )
+
+
+@app.get("/messages/{message_id}/status", response_model=MessageStatus)
+async def get_message_status(message_id: str):
+    """Latest delivery status of a sent message, by WhatsApp message id (wamid)."""
+    _require_status_store()
+    found = await status_store.get(message_id)
+    if found is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No status recorded for message {message_id}"
+        )
+    return found
+
+
+@app.post("/messages/statuses", response_model=StatusLookupResponse)
+async def lookup_message_statuses(request: StatusLookupRequest):
+    """Bulk status lookup for up to 1000 message ids."""
+    _require_status_store()
+    found = await status_store.get_many(request.message_ids)
+    return StatusLookupResponse(
+        statuses=[found[message_id] for message_id in found],
+        missing=[message_id for message_id in request.message_ids if message_id not in found]
+    )
+
+
+@app.get("/conversations/{contact}", response_model=ConversationPage)
+async def get_conversation(
+    contact: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """Messages exchanged with a contact, newest first, paginated with an opaque cursor."""
+    if not conversation_store.is_open:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Conversation history is disabled"
+        )
+    try:
+        messages, next_cursor = await conversation_store.page(contact, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ConversationPage(contact="+" + contact.lstrip("+"), messages=messages, next_cursor=next_cursor)
+
+
+@app.get("/export/{kind}")
+async def export_history(
+    kind: Literal["messages", "statuses"],
+    since: Optional[datetime] = Query(None, description="Start (ISO date/time or epoch); default 24 hours before until"),
+    until: Optional[datetime] = Query(None, description="End (ISO date/time or epoch); default now"),
+    format: Literal["ndjson", "parquet"] = Query("ndjson")
+):
+    """Stream the message history or the delivery statuses of a time range as NDJSON or Parquet."""
+    end = until.timestamp() if until else time.time()
+    start = since.timestamp() if since else end - 86400
+    try:
+        chunks = history_export.export(kind, start, end, format)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No {kind} recorded (is the store enabled?)"
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
     
-    core_url = settings.core_api_url
+    filename = f"{kind}-{datetime.fromtimestamp(start):%Y%m%dT%H%M%S}.{format}"
+    return StreamingResponse(
+        chunks,
+        media_type=history_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def to_unified_message(normalized_message: NormalizedMessage) -> Dict[str, Any]:
+    """
+    Build the unified message payload expected by the Core API.
     
-    unified_message = {
+    Tenant and media fields are only included when known, so other payloads are unchanged.
+    """
+    unified = {
         "channel": normalized_message.channel,
         "sender": normalized_message.sender,
         "message": normalized_message.message,
@@ -228,19 +1177,150 @@ async def forward_to_core(normalized_message: NormalizedMessage):
         "message_id": normalized_message.message_id,
         "message_type": normalized_message.message_type
     }
+    if normalized_message.phone_number_id:
+        unified["phone_number_id"] = normalized_message.phone_number_id
+    if normalized_message.media_id:
+        unified["media_id"] = normalized_message.media_id
+        unified["media_mime_type"] = normalized_message.media_mime_type
+        unified["media_path"] = normalized_message.media_path
+        unified["media_sha256"] = normalized_message.media_sha256
+    return unified
+
+
+async def forward_to_core(normalized_message: NormalizedMessage) -> bool:
+    """
+    Forward normalized message to core API.
+    
+    Goes through the batching forwarder when it is running, otherwise the
+    message is posted on its own. A reply returned by the core is queued for
+    sending (see ``schedule_core_reply``) without waiting for it.
     
+    Returns:
+        True if the core accepted the message
+    """
+    metrics.CORE_FORWARD_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    success = False
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(core_url, json=unified_message)
-            if response.status_code == 200:
-                logger.info("✅ Message forwarded to core successfully")
-                print("✅ Message forwarded to core successfully")
-            else:
-                logger.error(f"❌ Failed to forward to core: {response.status_code}")
-                print(f"❌ Failed to forward to core: {response.status_code}")
-    except Exception as e:
-        logger.error(f"❌ Error forwarding to core: {str(e)}")
-        print(f"❌ Error forwarding to core: {str(e)}")
+        success = await _send_to_core(to_unified_message(normalized_message))
+        return success
+    finally:
+        metrics.CORE_FORWARD_IN_FLIGHT.dec()
+        metrics.CORE_FORWARD_DURATION.observe(time.perf_counter() - start)
+        metrics.CORE_FORWARD.labels("success" if success else "failure").inc()
+
+
+async def _send_to_core(unified_message: Dict[str, Any]) -> bool:
+    """Send one unified message through the batcher or as a single POST."""
+    tenant_core_client = core_clients.get(unified_message.get("phone_number_id"))
+    if tenant_core_client is None and core_batcher.running:
+        return await core_batcher.submit(unified_message)
+    
+    result = await (tenant_core_client or core_client).send_message(unified_message)
+    if result["success"]:
+        logger.info("✅ Message forwarded to core successfully")
+        if isinstance(result["data"], dict) and result["data"].get("reply"):
+            schedule_core_reply(unified_message, result["data"]["reply"])
+    elif "status_code" in result:
+        logger.error("❌ Failed to forward to core: %s", result['status_code'])
+    else:
+        logger.error("❌ Error forwarding to core: %s", result['error'])
+    return result["success"]
+
+
+def schedule_core_reply(unified_message: Dict[str, Any], reply: Any):
+    """
+    Queue the reply the core returned for a forwarded message, without waiting for it to be sent.
+    
+    Replies go to their own per-sender queues, so a sender's replies keep
+    their order while neither the forward nor the other senders' messages
+    wait for the Cloud API.
+    """
+    if not settings.core_replies_enabled or not reply:
+        return
+    if not reply_scheduler.running:
+        metrics.CORE_REPLIES.labels("dropped").inc()
+        logger.warning("Core reply to message %s dropped: the reply sender is not running", unified_message.get("message_id"))
+        return
+    future = reply_scheduler.submit(unified_message["sender"], partial(dispatch_core_reply, unified_message, reply))
+    future.add_done_callback(_log_core_reply_error)
+
+
+def _log_core_reply_error(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        metrics.CORE_REPLIES.labels("failed").inc()
+        logger.error("Error sending core reply: %s", future.exception())
+
+
+async def dispatch_core_reply(unified_message: Dict[str, Any], reply: Any):
+    """
+    Send the reply the core returned for a forwarded message.
+    
+    Instead of calling back into ``/send/whatsapp``, the core can answer a
+    forwarded message with a "reply" in its response body: a text, a send
+    request object (as accepted by ``/send/whatsapp``; "to" defaults to the
+    sender and "from" to the number that received the message) or a list of
+    them, sent in order through the pooled client. The forward already
+    succeeded, so failed replies are logged and counted, not retried.
+    
+    Args:
+        unified_message: Message that was forwarded to the core
+        reply: "reply" field of the core's response
+    """
+    phone_number_id = unified_message.get("phone_number_id")
+    for item in reply if isinstance(reply, list) else [reply]:
+        if isinstance(item, str):
+            item = {"message": item}
+        try:
+            request = SendMessageRequest.model_validate({
+                "to": unified_message["sender"],
+                "from": phone_number_id if phone_number_id in whatsapp_clients else None,
+                **item
+            })
+        except (TypeError, ValidationError) as e:
+            metrics.CORE_REPLIES.labels("invalid").inc()
+            logger.error("Invalid core reply to message %s: %s", unified_message.get("message_id"), e)
+            continue
+        try:
+            response = await dispatch_send(request)
+        except HTTPException as e:
+            response = SendMessageResponse(success=False, error=str(e.detail))
+        metrics.CORE_REPLIES.labels("sent" if response.success else "failed").inc()
+        if not response.success:
+            logger.error("Failed to send core reply to %s: %s", request.to, response.error)
+
+
+async def forward_in_order(normalized_message: NormalizedMessage) -> bool:
+    """Forward a message behind the sender's earlier messages when ordered forwarding is on."""
+    if keyed_scheduler.running:
+        return await keyed_scheduler.submit(normalized_message.sender, partial(forward_to_core, normalized_message))
+    return await forward_to_core(normalized_message)
+
+
+async def forward_messages_to_core(messages: List[NormalizedMessage]) -> List[bool]:
+    """
+    Forward several normalized messages, preserving their order.
+    
+    With ordered forwarding, messages are queued on their sender's shard so
+    concurrent webhook workers cannot reorder a conversation, while other
+    senders proceed in parallel. Media messages take their place in the
+    queue right away; their download runs on the media workers and is
+    awaited in that place, so later texts cannot overtake them. In batch mode all messages are submitted
+    together so they share a batch; otherwise they are forwarded one after
+    another.
+    
+    Returns:
+        Per-message delivery results
+    """
+    if keyed_scheduler.running:
+        futures = [
+            keyed_scheduler.submit(message.sender, partial(_forward_after_download, message, _start_media_download(message)))
+            for message in messages
+        ]
+        return list(await asyncio.gather(*futures))
+    if core_batcher.running:
+        return list(await asyncio.gather(*(forward_to_core(message) for message in messages)))
+    return [await forward_to_core(message) for message in messages]
 
 
 async def send_auto_reply(to: str, received_message: str):
@@ -253,12 +1333,52 @@ async def send_auto_reply(to: str, received_message: str):
     await whatsapp_client.send_text_message(to=to, message=reply)
 
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None):
+    """
+    Run the service with uvicorn.
+    
+    Runs a single process by default, or one worker process per CPU when a
+    shared state backend is configured. Each worker builds its clients and
+    pools once at import/startup and shares dedup claims and rate limits
+    with the others through the shared state backend; with the default
+    "memory" backend, multi-worker runs switch to the SQLite one. Workers
+    log to stdout only (no shared log file to rotate).
+    
+    Examples:
+        python -m src.whatsapp_service
+        python -m src.whatsapp_service --workers 4
+        python -m src.whatsapp_service --reload
+    """
     import uvicorn
+    
+    parser = argparse.ArgumentParser(prog="python -m src.whatsapp_service", description="WhatsApp Integration Service")
+    if settings.api_workers is None:
+        default_workers = 1 if settings.shared_state_backend == "memory" else 0
+    else:
+        default_workers = settings.api_workers
+    parser.add_argument("--workers", type=int, default=default_workers, help="Worker processes (0 = one per CPU)")
+    parser.add_argument("--reload", action="store_true", default=settings.api_reload, help="Auto-reload on code changes (single process)")
+    args = parser.parse_args(argv)
+    
+    workers = 1 if args.reload else (args.workers or os.cpu_count() or 1)
+    if workers > 1:
+        # Workers are separate processes that load their settings from the environment
+        if settings.shared_state_backend == "memory":
+            logger.warning("Running %s workers: using the sqlite shared state backend at %s", workers, settings.shared_state_path)
+            os.environ["SHARED_STATE_BACKEND"] = "sqlite"
+        if settings.log_to_file:
+            logger.warning("Running %s workers: logging to stdout only", workers)
+            os.environ["LOG_TO_FILE"] = "false"
+    
     uvicorn.run(
         "src.whatsapp_service:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=True
+        reload=args.reload,
+        workers=workers
     )
 
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,6 @@
+"""Shared test configuration."""
+import os
+import tempfile
+
+# Keep the logs of test runs out of the repository (must run before src.config is imported)
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="whatsapp-service-test-logs-")
@@ -0,0 +1,48 @@
+"""Tests for the bulk send fan-out."""
+import asyncio
+import json
+from src.bulk_sender import fan_out, iter_list, iter_ndjson
+from src.models import SendMessageResponse
+
+
+def _collect(items, send, concurrency=2):
+    async def run():
+        return [json.loads(line) async for line in fan_out(items, send, concurrency)]
+    return asyncio.run(run())
+
+
+def test_fan_out_respects_concurrency():
+    """No more than ``concurrency`` sends run at the same time."""
+    state = {"active": 0, "peak": 0}
+    
+    async def send(request):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.001)
+        state["active"] -= 1
+        return SendMessageResponse(success=True, message_id=f"wamid.{request.to}")
+    
+    items = iter_list([{"to": f"+54911{i}", "message": "Hola"} for i in range(10)])
+    lines = _collect(items, send, concurrency=3)
+    
+    assert state["peak"] <= 3
+    assert sorted(line["index"] for line in lines[:-1]) == list(range(10))
+    assert lines[-1]["summary"] == {"total": 10, "succeeded": 10, "failed": 0}
+
+
+def test_invalid_items_are_reported_per_recipient():
+    """Invalid lines produce error results without stopping the batch."""
+    async def send(request):
+        return SendMessageResponse(success=True)
+    
+    async def chunks():
+        yield b'{"to": "+1", "message": "a"}\n{"to": '
+        yield b'"+2", "message": "b"}\nnot json\n{"message": "no recipient"}'
+    
+    lines = _collect(iter_ndjson(chunks()), send)
+    results = {line["index"]: line for line in lines[:-1]}
+    
+    assert results[0]["success"] and results[1]["success"]
+    assert results[2]["success"] is False and "Invalid JSON" in results[2]["error"]
+    assert results[3]["success"] is False
+    assert lines[-1]["summary"]["failed"] == 2
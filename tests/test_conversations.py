@@ -0,0 +1,130 @@
+"""Tests for the day-partitioned conversation store."""
+import asyncio
+import sqlite3
+import time
+from datetime import datetime
+import pytest
+from src.conversations import ConversationStore, PARTITION_PREFIX, partition_day
+from src.models import NormalizedMessage
+
+
+def _inbound(i: int, sender: str = "+5491100000001") -> NormalizedMessage:
+    return NormalizedMessage(sender=sender, message=f"msg {i}", timestamp="2025-10-05T12:00:00", message_id=f"wamid.{i}")
+
+
+def _drain(store: ConversationStore):
+    """Wait until queued writes are committed."""
+    async def barrier():
+        await store._submit(lambda conn: None)
+    asyncio.run(barrier())
+
+
+def test_pages_walk_back_across_partitions(tmp_path):
+    """Keyset pages return every message once, newest first, across day partitions."""
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    store.open()
+    try:
+        store._append([(f"wamid.old{i}", "+5491100000001", "inbound", "text", f"old {i}", None, None, None, 0.0) for i in range(3)], "20250101")
+        store.record_inbound([_inbound(i) for i in range(4)])
+        store.record_inbound([_inbound(99, sender="+5491100000002")])
+        store.record_inbound([_inbound(0)])  # Redelivery: ignored by the wamid index
+        store.record_outbound("wamid.out", "5491100000001", "text", "respuesta")
+        _drain(store)
+        
+        async def read_all():
+            pages, cursor = [], None
+            while True:
+                messages, cursor = await store.page("5491100000001", limit=3, cursor=cursor)
+                pages.append([message["body"] for message in messages])
+                if cursor is None:
+                    return pages
+        
+        pages = asyncio.run(read_all())
+    finally:
+        store.close()
+    
+    assert pages == [["respuesta", "msg 3", "msg 2"], ["msg 1", "msg 0", "old 2"], ["old 1", "old 0"]]
+
+
+def test_prune_drops_expired_partitions(tmp_path):
+    """Retention drops whole day tables and keeps the current one."""
+    path = tmp_path / "conversations.db"
+    store = ConversationStore(str(path))
+    store.open()
+    store._append([("wamid.old", "+1", "inbound", "text", "old", None, None, None, 0.0)], "20200101")
+    store.record_inbound([_inbound(1)])
+    dropped = asyncio.run(store.prune(retention_days=30))
+    assert dropped == 1
+    assert store.partitions == [partition_day(time.time())]
+    store.close()
+    
+    reopened = ConversationStore(str(path))
+    reopened.open()
+    try:
+        assert reopened.partitions == [partition_day(time.time())]
+        messages, cursor = asyncio.run(reopened.page("+5491100000001"))
+        assert [message["message_id"] for message in messages] == ["wamid.1"]
+        assert cursor is None
+    finally:
+        reopened.close()
+    assert reopened.stats()["partitions"] == 1
+    with sqlite3.connect(str(path)) as conn:
+        tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        assert tables == [PARTITION_PREFIX + partition_day(time.time())]
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0  # Freed pages were released
+
+
+def test_invalid_cursor(tmp_path):
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    store.open()
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(store.page("+1", cursor="not-a-cursor"))
+    finally:
+        store.close()
+
+
+def test_partitions_created_by_another_process_are_seen(tmp_path):
+    """Stores sharing a file (one per worker) read and prune each other's day tables."""
+    path = str(tmp_path / "conversations.db")
+    reader, writer = ConversationStore(path), ConversationStore(path)
+    reader.open()
+    writer.open()
+    try:
+        writer._append([("wamid.old", "+1", "inbound", "text", "old", None, None, None, 0.0)], "20200101")
+        writer.record_inbound([_inbound(1)])
+        _drain(writer)
+        
+        messages, _ = asyncio.run(reader.page("+5491100000001"))
+        assert [message["message_id"] for message in messages] == ["wamid.1"]
+        assert asyncio.run(reader.prune(retention_days=30)) == 1
+        assert reader.partitions == [partition_day(time.time())]
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_last_inbound_uses_the_message_time_of_the_business_number(tmp_path):
+    """The service window fallback only counts messages sent to the number, by when they were sent."""
+    store = ConversationStore(str(tmp_path / "conversations.db"))
+    store.open()
+    now = time.time()
+    sent_at = int(now) - 3600
+    try:
+        late = _inbound(1).model_copy(update={"timestamp": datetime.fromtimestamp(sent_at).isoformat(), "phone_number_id": "PHONE"})
+        unaddressed = _inbound(2).model_copy(update={"timestamp": datetime.fromtimestamp(sent_at - 60).isoformat()})
+        store.record_inbound([late, unaddressed])
+        _drain(store)
+        
+        async def run():
+            since = now - 86400
+            return (
+                await store.last_inbound("+5491100000001", "PHONE", since),
+                await store.last_inbound("+5491100000001", "OTHER_PHONE", since),
+                await store.last_inbound("+5491100000001", "OTHER_PHONE", since, include_unaddressed=True),
+                await store.last_inbound("+5491100000001", "PHONE", now - 60)
+            )
+        
+        assert asyncio.run(run()) == (sent_at, None, sent_at - 60, None)
+    finally:
+        store.close()
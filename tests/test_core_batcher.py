@@ -0,0 +1,76 @@
+"""Tests for batched forwarding to the Core API."""
+import asyncio
+import json
+import httpx
+from src.core_batcher import CoreBatchForwarder
+from src.core_client import CoreApiClient
+
+
+def _core_client(handler):
+    return CoreApiClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def _run_batch(forwarder, count):
+    async def run():
+        await forwarder.start()
+        futures = [forwarder.submit({"message_id": f"wamid.{i}"}) for i in range(count)]
+        results = await asyncio.gather(*futures)
+        await forwarder.stop()
+        return results
+    return asyncio.run(run())
+
+
+def test_flushes_by_size_in_one_request():
+    """Messages submitted together are sent as a single array POST."""
+    requests = []
+    
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"results": [{"success": True}] * len(requests[-1])})
+    
+    forwarder = CoreBatchForwarder(_core_client(handler), max_size=5, max_wait_ms=1000)
+    results = _run_batch(forwarder, 5)
+    
+    assert results == [True] * 5
+    assert len(requests) == 1
+    assert [m["message_id"] for m in requests[0]] == [f"wamid.{i}" for i in range(5)]
+
+
+def test_per_item_failures():
+    """Per-item results from the core resolve each message individually."""
+    def handler(request):
+        return httpx.Response(200, json=[{"success": True}, {"success": False}, {"success": True}])
+    
+    forwarder = CoreBatchForwarder(_core_client(handler), max_size=3, max_wait_ms=10)
+    assert _run_batch(forwarder, 3) == [True, False, True]
+    assert forwarder.stats()["failed_messages"] == 1
+
+
+def test_falls_back_to_single_mode():
+    """A core without a batch endpoint gets one POST per message."""
+    paths = []
+    
+    def handler(request):
+        paths.append(request.url.path)
+        if request.url.path.endswith("/batch"):
+            return httpx.Response(404)
+        return httpx.Response(200, json={})
+    
+    forwarder = CoreBatchForwarder(_core_client(handler), max_size=10, max_wait_ms=5)
+    assert _run_batch(forwarder, 2) == [True, True]
+    assert forwarder.batch_supported is False
+    assert paths.count(paths[0]) == 1 and len(paths) == 3
+
+
+def test_replies_are_handed_to_the_callback():
+    """Replies in the batch results are passed on for accepted messages only."""
+    def handler(request):
+        return httpx.Response(200, json=[{"success": True, "reply": "Hola"}, {"success": False, "reply": "Nope"}, {}])
+    replies = []
+    
+    def on_reply(message, reply):
+        replies.append((message["message_id"], reply))
+    
+    forwarder = CoreBatchForwarder(_core_client(handler), max_size=3, max_wait_ms=10, on_reply=on_reply)
+    assert _run_batch(forwarder, 3) == [True, False, True]
+    assert replies == [("wamid.0", "Hola")]
@@ -0,0 +1,53 @@
+"""Tests for webhook message-id deduplication."""
+from src.dedup import MessageDeduplicator
+
+
+def test_detects_duplicates_and_counts():
+    """The second delivery of a wamid is a duplicate."""
+    dedup = MessageDeduplicator(max_entries=10)
+    assert dedup.is_duplicate("wamid.1") is False
+    assert dedup.is_duplicate("wamid.1") is True
+    assert dedup.is_duplicate(None) is False
+    stats = dedup.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_memory_is_bounded():
+    """The least recently seen ids are evicted past the ceiling."""
+    dedup = MessageDeduplicator(max_entries=3)
+    for i in range(5):
+        dedup.is_duplicate(f"wamid.{i}")
+    assert dedup.stats()["size"] == 3
+    assert dedup.stats()["evictions"] == 2
+    assert dedup.is_duplicate("wamid.0") is False
+    assert dedup.is_duplicate("wamid.4") is True
+
+
+def test_expired_ids_are_not_duplicates():
+    """Ids older than the TTL are accepted again."""
+    dedup = MessageDeduplicator(ttl=-1)
+    dedup.is_duplicate("wamid.1")
+    assert dedup.is_duplicate("wamid.1") is False
+
+
+def test_survives_restart(tmp_path):
+    """Flushed ids are reloaded from the SQLite file."""
+    path = str(tmp_path / "dedup.db")
+    first = MessageDeduplicator(persist_path=path)
+    first.load()
+    first.is_duplicate("wamid.1")
+    first.close()
+    
+    second = MessageDeduplicator(persist_path=path)
+    second.load()
+    assert second.is_duplicate("wamid.1") is True
+    second.close()
+
+
+def test_unsaved_buffer_is_bounded(tmp_path):
+    """Ids waiting to be persisted never outgrow the memory ceiling, even if flushes fail."""
+    dedup = MessageDeduplicator(max_entries=3, persist_path=str(tmp_path / "seen.db"))
+    for i in range(10):
+        dedup.is_duplicate(f"wamid.{i}")
+    assert len(dedup._unsaved) == 3
@@ -0,0 +1,76 @@
+"""Tests for the streaming history export."""
+import asyncio
+import io
+import json
+import sys
+import time
+import pytest
+from src import export
+from src.conversations import ConversationStore
+from src.models import NormalizedMessage
+from src.status_store import StatusStore
+
+
+def _commit(store):
+    async def barrier():
+        await store._submit(lambda conn: None)
+    asyncio.run(barrier())
+
+
+@pytest.fixture
+def stores(tmp_path):
+    conversations = ConversationStore(str(tmp_path / "conversations.db"))
+    statuses = StatusStore(str(tmp_path / "status.db"))
+    conversations.open()
+    statuses.open()
+    conversations._append([("wamid.old", "+1", "inbound", "text", "old", None, None, None, 1.0)], "19700101")
+    conversations.record_inbound([
+        NormalizedMessage(sender="+5491100000001", message=f"msg {i}", timestamp="2025-10-05T12:00:00", message_id=f"wamid.{i}")
+        for i in range(5)
+    ])
+    statuses.record([{"id": "wamid.out", "status": "delivered", "timestamp": "1700000000", "recipient_id": "5491100000001"}])
+    _commit(conversations)
+    _commit(statuses)
+    yield conversations, statuses
+    conversations.close()
+    statuses.close()
+
+
+def test_ndjson_export_streams_the_time_range(stores):
+    """Only messages in the range are exported, in small chunks."""
+    conversations, _ = stores
+    now = time.time()
+    chunks = list(export.to_ndjson(export.iter_messages(str(conversations.path), now - 60, now + 60, batch_size=2), chunk_size=100))
+    assert len(chunks) > 1
+    records = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [record["message_id"] for record in records] == [f"wamid.{i}" for i in range(5)]
+    assert records[0]["direction"] == "inbound"
+
+
+def test_parquet_export_of_statuses(stores):
+    """Statuses are written as a Parquet file one row group at a time."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    _, statuses = stores
+    now = time.time()
+    records = export.iter_statuses(str(statuses.path), now - 60, now + 60)
+    data = b"".join(export.to_parquet(records, export.STATUS_COLUMNS, row_group_size=1))
+    table = pq.read_table(io.BytesIO(data))
+    assert table.column("status").to_pylist() == ["delivered"]
+    assert table.column("delivered_at").to_pylist() == [1700000000]
+
+
+def test_missing_store_and_unknown_format(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        export.iter_messages(str(tmp_path / "missing.db"), 0, 1)
+    with pytest.raises(ValueError):
+        export.export("messages", 0, 1, "csv")
+
+
+def test_parquet_without_pyarrow_opens_no_store(monkeypatch):
+    """A missing "pyarrow" is reported before any database connection is opened."""
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    opened = []
+    monkeypatch.setattr(export, "_connect", lambda path: opened.append(path))
+    with pytest.raises(RuntimeError):
+        export.export("statuses", 0, 1, "parquet")
+    assert opened == []
@@ -0,0 +1,90 @@
+"""Tests for the per-key ordered scheduler."""
+import asyncio
+import random
+import pytest
+from src.keyed_scheduler import KeyedScheduler
+
+
+def test_jobs_run_in_order_per_key_and_in_parallel_across_keys():
+    """Jobs for a key never overlap or reorder; different keys overlap."""
+    scheduler = KeyedScheduler(shards=8)
+    done = {"a": [], "b": []}
+    running = set()
+    overlaps = []
+    
+    async def job(key, index):
+        running.add(key)
+        if len(running) > 1:
+            overlaps.append(index)
+        await asyncio.sleep(random.uniform(0, 0.003))
+        done[key].append(index)
+        running.discard(key)
+        return index
+    
+    async def run():
+        await scheduler.start()
+        futures = [scheduler.submit(key, lambda k=key, i=i: job(k, i)) for i in range(30) for key in ("a", "b")]
+        results = await asyncio.gather(*futures)
+        await scheduler.stop()
+        return results
+    
+    # Make sure the two keys land on different shards
+    assert scheduler.shard_for("a") != scheduler.shard_for("b")
+    results = asyncio.run(run())
+    assert done["a"] == list(range(30))
+    assert done["b"] == list(range(30))
+    assert results[:4] == [0, 0, 1, 1]
+    assert overlaps
+
+
+def test_failures_propagate_and_do_not_block_the_key():
+    scheduler = KeyedScheduler(shards=2)
+    
+    async def fail():
+        raise ValueError("core down")
+    
+    async def ok():
+        return True
+    
+    async def run():
+        await scheduler.start()
+        first, second = scheduler.submit("+1", fail), scheduler.submit("+1", ok)
+        with pytest.raises(ValueError):
+            await first
+        result = await second
+        await scheduler.stop()
+        return result
+    
+    assert asyncio.run(run()) is True
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_hot_sender_and_skew_metrics():
+    """A sender with a backlog shows up as a hot key and skews its shard."""
+    scheduler = KeyedScheduler(shards=4)
+    
+    async def run():
+        await scheduler.start()
+        gate = asyncio.Event()
+        futures = [scheduler.submit("+hot", gate.wait) for _ in range(10)]
+        futures.append(scheduler.submit("+cold", gate.wait))
+        await asyncio.sleep(0)
+        stats = scheduler.stats()
+        gate.set()
+        await asyncio.gather(*futures)
+        await scheduler.stop()
+        return stats
+    
+    stats = asyncio.run(run())
+    assert stats["hot_keys"][0] == {"key": "+hot", "pending": 10}
+    assert stats["hot_key_depth"] == 10
+    assert stats["shard_skew"] > 1
+    assert scheduler.stats()["depth"] == 0
+
+
+def test_submit_requires_running_scheduler():
+    async def run():
+        KeyedScheduler().submit("+1", asyncio.sleep)
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
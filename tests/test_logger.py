@@ -0,0 +1,53 @@
+"""Tests for the logging configuration."""
+import json
+import logging
+import queue
+from src.logger import ExcInfoQueueHandler, JsonFormatter, get_logger, queue_listener
+
+
+def test_module_loggers_share_service_handlers():
+    """Module loggers are children of the service logger."""
+    logger = get_logger("src.whatsapp_service")
+    assert logger.name == "whatsapp_service.src.whatsapp_service"
+    assert logger.parent is logging.getLogger("whatsapp_service")
+
+
+def test_json_formatter():
+    """JSON records contain the formatted message and level."""
+    record = logging.LogRecord("whatsapp_service", logging.INFO, __file__, 1, "Sent %s", ("wamid.1",), None)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Sent wamid.1"
+    assert entry["level"] == "INFO"
+
+
+def test_queued_exceptions_reach_the_json_formatter():
+    """logger.exception records keep their traceback through the queue."""
+    records: "queue.Queue" = queue.Queue()
+    logger = logging.getLogger("tests.queued_exception")
+    logger.propagate = False
+    logger.addHandler(ExcInfoQueueHandler(records))
+    try:
+        raise ValueError("bad payload")
+    except ValueError:
+        logger.exception("Failed to send %s", "wamid.1")
+    
+    entry = json.loads(JsonFormatter().format(records.get_nowait()))
+    assert entry["message"] == "Failed to send wamid.1"
+    assert "ValueError: bad payload" in entry["exception"]
+
+
+def test_disabled_levels_skip_formatting():
+    """Arguments of disabled levels are never converted to strings."""
+    class Expensive:
+        def __str__(self):
+            raise AssertionError("formatted a disabled log record")
+    
+    logger = get_logger("tests.lazy")
+    assert not logger.isEnabledFor(logging.DEBUG)
+    logger.debug("Payload: %s", Expensive())
+
+
+def test_records_are_written_by_background_listener():
+    """The queue listener thread owns the console and file handlers."""
+    assert queue_listener._thread is not None
+    assert len(queue_listener.handlers) == 2
@@ -0,0 +1,65 @@
+"""Tests for the inbound media download pipeline."""
+import asyncio
+import hashlib
+import httpx
+import pytest
+from src.media import MediaCache, MediaDownloader, MediaTooLarge
+from src.whatsapp_client import WhatsAppClient
+
+CONTENT = b"\x89PNG" + b"x" * 200000
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+def _downloader(tmp_path, report_sha256=True, max_bytes=10 * 1024 * 1024):
+    calls = []
+    
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path.endswith("/download"):
+            return httpx.Response(200, content=CONTENT)
+        info = {"url": "https://lookaside.example.com/download", "mime_type": "image/png"}
+        if report_sha256:
+            info["sha256"] = SHA256
+        return httpx.Response(200, json=info)
+    
+    client = WhatsAppClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return MediaDownloader(client, MediaCache(str(tmp_path / "media")), max_bytes=max_bytes, chunk_size=4096), calls
+
+
+def test_download_is_content_addressed_and_reused(tmp_path):
+    """The file is stored under its hash and a known hash skips the download."""
+    downloader, calls = _downloader(tmp_path)
+    
+    async def run():
+        return await downloader.fetch("media.1"), await downloader.fetch("media.2")
+    
+    first, second = asyncio.run(run())
+    assert first["sha256"] == SHA256 and not first["cached"]
+    assert first["path"].endswith(f"{SHA256[:2]}/{SHA256}.png")
+    assert open(first["path"], "rb").read() == CONTENT
+    assert second["cached"] and second["path"] == first["path"]
+    assert calls.count("/download") == 1
+    assert downloader.stats()["cache_hits"] == 1
+
+
+def test_duplicate_content_is_stored_once(tmp_path):
+    """Without a reported hash both files are downloaded but stored once."""
+    downloader, calls = _downloader(tmp_path, report_sha256=False)
+    
+    async def run():
+        return await asyncio.gather(downloader.fetch("media.1"), downloader.fetch("media.2"))
+    
+    first, second = asyncio.run(run())
+    assert first["path"] == second["path"]
+    assert downloader.stats()["files_stored"] == 1
+    assert downloader.stats()["duplicate_downloads"] == 1
+    assert list((tmp_path / "media" / "tmp").iterdir()) == []
+
+
+def test_oversized_download_is_discarded(tmp_path):
+    downloader, _ = _downloader(tmp_path, report_sha256=False, max_bytes=1000)
+    
+    with pytest.raises(MediaTooLarge):
+        asyncio.run(downloader.fetch("media.big"))
+    assert list((tmp_path / "media" / "tmp").iterdir()) == []
+    assert downloader.stats()["failed"] == 1
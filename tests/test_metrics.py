@@ -0,0 +1,33 @@
+"""Tests for the Prometheus-style metrics."""
+from src.metrics import Registry
+
+
+def test_counter_and_gauge_render():
+    """Counters and gauges render in the text exposition format."""
+    registry = Registry()
+    counter = registry.counter("demo_events", "Events", ["code"])
+    counter.labels("130429").inc()
+    counter.labels("130429").inc()
+    registry.gauge("demo_depth", "Depth", function=lambda: 7)
+    registry.counter("demo_hits", "Hits", function=lambda: 3)
+    
+    text = registry.render()
+    assert "# TYPE demo_events counter" in text
+    assert 'demo_events_total{code="130429"} 2' in text
+    assert "demo_depth 7" in text
+    assert "# TYPE demo_hits counter" in text
+    assert "demo_hits_total 3" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    """Histogram buckets count observations at or below each bound."""
+    registry = Registry()
+    histogram = registry.histogram("demo_latency_seconds", "Latency", buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.5):
+        histogram.observe(value)
+    
+    text = registry.render()
+    assert 'demo_latency_seconds_bucket{le="0.01"} 1' in text
+    assert 'demo_latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'demo_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_latency_seconds_count 3" in text
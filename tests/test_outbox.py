@@ -0,0 +1,114 @@
+"""Tests for the durable Core API outbox."""
+import asyncio
+import time
+from src.outbox import Outbox, OutboxRetrier, STATUS_DEAD, STATUS_DELIVERED
+
+
+def _with_outbox(tmp_path, coro_fn):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    outbox.open()
+    try:
+        return asyncio.run(coro_fn(outbox))
+    finally:
+        outbox.close()
+
+
+def test_concurrent_appends_share_commits(tmp_path):
+    """Concurrent appends are durable and grouped into fewer commits."""
+    async def run(outbox):
+        batches = await asyncio.gather(*(
+            outbox.append([{"message_id": f"wamid.{i}"}]) for i in range(200)
+        ))
+        return batches, await outbox.counts()
+    
+    batches, counts = _with_outbox(tmp_path, run)
+    outbox_ids = [ids[0] for ids in batches]
+    assert len(set(outbox_ids)) == 200
+    assert counts == {"pending": 200}
+
+
+def test_entries_survive_reopen(tmp_path):
+    """Entries written before close are visible after reopening."""
+    async def write(outbox):
+        await outbox.append([{"message_id": "wamid.1", "message": "Hola"}])
+    
+    async def read(outbox):
+        return await outbox.due(now=time.time() + 1)
+    
+    _with_outbox(tmp_path, write)
+    entries = _with_outbox(tmp_path, read)
+    assert entries[0]["payload"]["message"] == "Hola"
+
+
+def test_retrier_recovers_and_dead_letters(tmp_path):
+    """Successful retries are marked delivered, exhausted ones dead-lettered."""
+    async def run(outbox):
+        await outbox.append([{"message_id": "ok"}, {"message_id": "bad"}])
+        
+        async def send(payload):
+            return payload["message_id"] == "ok"
+        
+        retrier = OutboxRetrier(outbox, send, base_delay=0, max_delay=0, max_attempts=2)
+        await retrier.run_once()
+        await retrier.run_once()
+        return await outbox.counts(), retrier.stats()
+    
+    counts, stats = _with_outbox(tmp_path, run)
+    assert counts == {STATUS_DELIVERED: 1, STATUS_DEAD: 1}
+    assert stats["recovered"] == 1
+    assert stats["dead"] == 1
+
+
+def test_due_entries_are_leased_to_one_retrier(tmp_path):
+    """Retriers sharing the outbox file (one per worker) never claim the same entry."""
+    path = str(tmp_path / "outbox.db")
+    first, second = Outbox(path), Outbox(path)
+    first.open()
+    second.open()
+    
+    async def run():
+        await first.append([{"message_id": f"wamid.{i}"} for i in range(10)])
+        claimed = await asyncio.gather(first.due(limit=6, now=time.time() + 1), second.due(limit=6, now=time.time() + 1))
+        return [entry["id"] for entries in claimed for entry in entries]
+    
+    try:
+        ids = asyncio.run(run())
+    finally:
+        first.close()
+        second.close()
+    assert sorted(ids) == list(range(1, 11))
+
+
+def test_failing_operation_only_fails_its_caller(tmp_path):
+    """An operation raising any exception is rolled back alone; the writer keeps going."""
+    def broken(conn):
+        conn.execute("INSERT INTO outbox (payload, next_attempt_at, created_at) VALUES ('{}', 0, 0)")
+        raise TypeError("bad operation")
+    
+    async def run(outbox):
+        results = await asyncio.gather(
+            outbox.append([{"message_id": "before"}]),
+            outbox._submit(broken),
+            outbox.append([{"message_id": "after"}]),
+            return_exceptions=True
+        )
+        return results, await outbox.counts()
+    
+    results, counts = _with_outbox(tmp_path, run)
+    assert isinstance(results[1], TypeError)
+    assert counts == {"pending": 2}
+
+
+def test_prune_removes_only_settled_entries(tmp_path):
+    """Delivered and dead entries past the retention are deleted; pending ones stay."""
+    async def run(outbox):
+        delivered, dead, pending = await outbox.append([{"message_id": f"wamid.{i}"} for i in range(3)])
+        await outbox.mark_delivered([delivered])
+        await outbox.mark_failed(dead, "gave up", None)
+        kept = await outbox.prune(time.time() - 60)
+        pruned = await outbox.prune(time.time() + 1)
+        return kept, pruned, await outbox.counts()
+    
+    kept, pruned, counts = _with_outbox(tmp_path, run)
+    assert (kept, pruned) == (0, 2)
+    assert counts == {"pending": 1}
@@ -0,0 +1,62 @@
+"""Tests for outbound rate limiting."""
+import asyncio
+import time
+from src.rate_limiter import OutboundRateLimiter, TokenBucket
+
+
+def test_bucket_allows_burst_then_waits():
+    """A full bucket serves the burst immediately, then spaces out requests."""
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 <= bucket.reserve() <= 0.11
+    assert 0.19 <= bucket.reserve() <= 0.21
+
+
+def test_sends_wait_instead_of_failing():
+    """Sends over the limit are delayed and the time is accounted for."""
+    limiter = OutboundRateLimiter(messages_per_second=100, burst=1, pair_messages_per_second=1000, pair_burst=10)
+    
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire("PHONE_ID", f"+54911{i}") for i in range(5)))
+        return time.monotonic() - start
+    
+    elapsed = asyncio.run(run())
+    stats = limiter.stats()
+    assert elapsed >= 0.035
+    assert stats["throttled"] == 4
+    assert stats["throttled_seconds"] > 0
+
+
+def test_pair_rate_is_per_recipient():
+    """The pair limit only throttles repeated sends to the same recipient."""
+    limiter = OutboundRateLimiter(messages_per_second=1000, burst=1000, pair_messages_per_second=1, pair_burst=1)
+    
+    async def run():
+        first = await limiter.acquire("PHONE_ID", "+1")
+        other = await limiter.acquire("PHONE_ID", "+2")
+        return first, other, limiter._recipients["PHONE_ID:+1"].reserve()
+    
+    first, other, same = asyncio.run(run())
+    assert first == 0 and other == 0
+    assert same > 0.9
+
+
+def test_sender_rate_override_per_tenant():
+    """Each phone_number_id has its own bucket; overrides replace the default rate."""
+    limiter = OutboundRateLimiter(
+        messages_per_second=1000,
+        burst=1000,
+        pair_messages_per_second=1000,
+        pair_burst=1000,
+        sender_rates={"SLOW_ID": 10}
+    )
+    
+    async def run():
+        return [await limiter.acquire("SLOW_ID", f"+{i}") for i in range(12)], await limiter.acquire("FAST_ID", "+1")
+    
+    slow, fast = asyncio.run(run())
+    assert slow[:10] == [0.0] * 10
+    assert slow[10] > 0
+    assert fast == 0
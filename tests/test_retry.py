@@ -0,0 +1,125 @@
+"""Tests for Cloud API retries and the circuit breaker."""
+import asyncio
+import httpx
+from src.retry import CircuitBreaker, RetryPolicy, parse_retry_after
+from src.whatsapp_client import WhatsAppClient
+
+
+def _client(handler, **kwargs):
+    return WhatsAppClient(
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001, deadline=5),
+        **kwargs
+    )
+
+
+def test_retries_transient_errors_until_success():
+    """A throughput error followed by success is retried transparently."""
+    responses = [
+        httpx.Response(429, json={"error": {"code": 130429}}, headers={"Retry-After": "0"}),
+        httpx.Response(503, json={"error": {"code": 131016}}),
+        httpx.Response(200, json={"messages": [{"id": "wamid.1"}]}),
+    ]
+    client = _client(lambda request: responses.pop(0))
+    
+    result = asyncio.run(client.send_text_message("+5491112345678", "Hola"))
+    assert result["success"] is True
+    assert responses == []
+
+
+def test_does_not_retry_permanent_errors():
+    """Invalid parameter errors fail on the first attempt."""
+    calls = []
+    
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": {"code": 100}})
+    
+    result = asyncio.run(_client(handler).send_text_message("+5491112345678", "Hola"))
+    assert result["success"] is False
+    assert result["attempts"] == 1
+    assert len(calls) == 1
+
+
+def test_circuit_opens_and_fails_fast():
+    """Once the circuit is open sends fail without any network call."""
+    calls = []
+    
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("down")
+    
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client = _client(handler, circuit_breaker=breaker)
+    
+    first = asyncio.run(client.send_text_message("+5491112345678", "Hola"))
+    second = asyncio.run(client.send_text_message("+5491112345678", "Hola"))
+    
+    assert first["success"] is False and second["success"] is False
+    assert "circuit open" in second["error"]
+    assert len(calls) == 2
+    assert breaker.stats()["state"] == CircuitBreaker.OPEN
+
+
+def test_half_open_probe_closes_circuit():
+    """After the reset timeout one probe is allowed and success closes the circuit."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_parse_retry_after():
+    """Retry-After accepts seconds and ignores garbage."""
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_throttling_does_not_eat_the_send_deadline(monkeypatch):
+    """The deadline starts after the rate limiter clears the send; a timeout cut short by it leaves the circuit alone."""
+    import src.whatsapp_client
+    monkeypatch.setattr(src.whatsapp_client, "MIN_ATTEMPT_TIMEOUT", 0.01)
+    
+    class SlowLimiter:
+        async def acquire(self, phone_number_id, to):
+            await asyncio.sleep(0.3)
+            return 0.3
+    
+    async def handler(request):
+        return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+    
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = _client(handler, rate_limiter=SlowLimiter(), circuit_breaker=breaker)
+    client.retry_policy = RetryPolicy(max_attempts=1, deadline=0.2)
+    assert asyncio.run(client.send_text_message("+5491112345678", "Hola"))["success"] is True
+    
+    def slow_handler(request):
+        raise httpx.ReadTimeout("deadline", request=request)
+    
+    client = _client(slow_handler, circuit_breaker=breaker)
+    client.retry_policy = RetryPolicy(max_attempts=1, deadline=0.1)
+    assert asyncio.run(client.send_text_message("+5491112345678", "Hola"))["error"] == "Request timeout"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_probe_releases_the_half_open_slot():
+    """A probe cancelled mid-flight lets the next send probe again."""
+    async def handler(request):
+        await asyncio.sleep(10)
+    
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    client = _client(handler, circuit_breaker=breaker)
+    
+    async def run():
+        task = asyncio.create_task(client.send_text_message("+5491112345678", "Hola"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    
+    asyncio.run(run())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is True
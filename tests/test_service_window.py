@@ -0,0 +1,64 @@
+"""Tests for the customer service window tracker."""
+import asyncio
+import time
+from src.service_window import ServiceWindowTracker
+from src.shared_state import SQLiteSharedState
+
+
+def test_window_opens_with_inbound_message_and_closes_after_24h():
+    tracker = ServiceWindowTracker()
+    now = time.time()
+    assert not tracker.is_open("PHONE", "+5491100000001")
+    
+    tracker.touch("PHONE", "+5491100000001", now - 3600)
+    assert tracker.is_open("PHONE", "5491100000001")
+    assert not tracker.is_open("OTHER_PHONE", "+5491100000001")
+    assert not tracker.is_open("PHONE", "+5491100000001", now=now + 86400)
+    
+    tracker.touch("PHONE", "+5491100000001", now - 7 * 86400)  # Late redelivery does not move the window back
+    assert tracker.expires_at("PHONE", "+5491100000001") == now - 3600 + 86400
+    assert tracker.stats()["open_hits"] == 1
+
+
+def test_eviction_and_persistence_round_trip(tmp_path):
+    """The least recently active customers are evicted; open windows survive a restart."""
+    path = tmp_path / "windows.db"
+    tracker = ServiceWindowTracker(max_entries=2, persist_path=str(path))
+    tracker.load()
+    now = time.time()
+    tracker.touch("PHONE", "+1", now - 3 * 86400)
+    tracker.touch("PHONE", "+2", now - 60)
+    tracker.touch("PHONE", "+3", now - 30)
+    assert tracker.stats()["evictions"] == 1
+    tracker.touch("PHONE", "+2", now - 90000)  # Ignored (older)
+    tracker.close()
+    
+    restored = ServiceWindowTracker(persist_path=str(path))
+    restored.load()
+    assert restored.is_open("PHONE", "+2")
+    assert restored.is_open("PHONE", "+3")
+    assert not restored.is_open("PHONE", "+1")
+    assert restored.stats()["customers"] == 2
+    restored.close()
+
+
+def test_windows_are_shared_between_workers(tmp_path):
+    """A window opened by a message received on one worker is open on the others."""
+    path = str(tmp_path / "shared.db")
+    receiver = ServiceWindowTracker(shared=SQLiteSharedState(path))
+    sender = ServiceWindowTracker(shared=SQLiteSharedState(path))
+    now = time.time()
+    
+    async def run():
+        receiver.touch("PHONE", "+5491100000001", now - 60)
+        receiver.touch("PHONE", "+5491100000002", now - 2 * 86400)  # Closed: not published
+        await receiver.share()
+        assert await sender.check("PHONE", "5491100000001")
+        assert not await sender.check("OTHER_PHONE", "+5491100000001")
+        assert not await sender.check("PHONE", "+5491100000002")
+        await receiver.shared.close()
+        await sender.shared.close()
+    
+    asyncio.run(run())
+    assert sender.is_open("PHONE", "+5491100000001")  # Cached locally after the shared lookup
+    assert sender.stats()["shared_hits"] == 1
@@ -0,0 +1,88 @@
+"""Tests for the shared state backends used by multi-worker deployments."""
+import asyncio
+import pytest
+from src.dedup import MessageDeduplicator
+from src.rate_limiter import OutboundRateLimiter
+from src.shared_state import SharedState, SQLiteSharedState, create_shared_state
+
+
+def test_sqlite_claims_are_exclusive_across_instances(tmp_path):
+    """Two workers (separate connections to one file) cannot both claim an id."""
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteSharedState(path), SQLiteSharedState(path)
+    
+    async def run():
+        results = [
+            await first.add_if_absent("dedup:wamid.1", 60),
+            await second.add_if_absent("dedup:wamid.1", 60),
+            await second.add_if_absent("dedup:wamid.2", 60)
+        ]
+        expired = [await first.add_if_absent("dedup:wamid.3", 0), await second.add_if_absent("dedup:wamid.3", 0)]
+        await first.close()
+        await second.close()
+        return results, expired
+    
+    results, expired = asyncio.run(run())
+    assert results == [True, False, True]
+    assert expired == [True, True]
+
+
+def test_sqlite_token_bucket_is_shared(tmp_path):
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteSharedState(path), SQLiteSharedState(path)
+    
+    async def run():
+        waits = [await first.reserve("rate:PHONE", 10, 2), await second.reserve("rate:PHONE", 10, 2), await first.reserve("rate:PHONE", 10, 2)]
+        await first.close()
+        await second.close()
+        return waits
+    
+    waits = asyncio.run(run())
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.05 < waits[2] <= 0.1
+
+
+def test_sqlite_put_max_keeps_the_latest_value(tmp_path):
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteSharedState(path), SQLiteSharedState(path)
+    
+    async def run():
+        await first.put_max("window:PHONE:1", 200.0, 60)
+        await second.put_max("window:PHONE:1", 100.0, 60)  # Older: ignored
+        await second.put_max("window:PHONE:2", 100.0, 0)
+        values = [await second.get_value("window:PHONE:1"), await first.get_value("window:PHONE:2"), await first.get_value("missing")]
+        await first.close()
+        await second.close()
+        return values
+    
+    assert asyncio.run(run()) == [200.0, None, None]
+
+
+def test_dedup_and_rate_limiter_use_shared_state(tmp_path):
+    path = str(tmp_path / "state.db")
+    workers = [SQLiteSharedState(path), SQLiteSharedState(path)]
+    dedups = [MessageDeduplicator(shared=state) for state in workers]
+    limiters = [OutboundRateLimiter(messages_per_second=20, burst=1, pair_messages_per_second=1000, shared=state) for state in workers]
+    
+    async def run():
+        claims = [await dedups[0].claim("wamid.1"), await dedups[1].claim("wamid.1")]
+        await limiters[0].acquire("PHONE", "+1")
+        waited = await limiters[1].acquire("PHONE", "+2")
+        for state in workers:
+            await state.close()
+        return claims, waited
+    
+    claims, waited = asyncio.run(run())
+    assert claims == [True, False]
+    assert dedups[1].stats()["shared_hits"] == 1
+    assert waited > 0
+
+
+def test_create_shared_state():
+    assert create_shared_state("memory", "unused.db", None) is None
+    with pytest.raises(ValueError):
+        create_shared_state("redis", "unused.db", None)
+    with pytest.raises(ValueError):
+        create_shared_state("etcd", "unused.db", None)
+    with pytest.raises(TypeError):
+        SharedState()
@@ -0,0 +1,26 @@
+"""Tests for webhook signature verification."""
+import hashlib
+import hmac
+from src.signature import verify_signature
+
+SECRET = b"app_secret"
+BODY = b'{"object":"whatsapp_business_account","entry":[]}'
+
+
+def _sign(body, secret=SECRET):
+    return "sha256=" + hmac.new(secret, body, hashlib.sha256).hexdigest()
+
+
+def test_valid_signature():
+    assert verify_signature(BODY, _sign(BODY), SECRET) is True
+
+
+def test_rejects_tampered_body_and_wrong_secret():
+    assert verify_signature(BODY + b" ", _sign(BODY), SECRET) is False
+    assert verify_signature(BODY, _sign(BODY, b"other"), SECRET) is False
+
+
+def test_rejects_missing_or_malformed_header():
+    assert verify_signature(BODY, None, SECRET) is False
+    assert verify_signature(BODY, "sha1=abc", SECRET) is False
+    assert verify_signature(BODY, "sha256=not-hex", SECRET) is False
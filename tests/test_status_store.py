@@ -0,0 +1,73 @@
+"""Tests for the message status store."""
+import asyncio
+import time
+from src.status_store import StatusStore, status_row
+
+
+def _with_store(tmp_path, coro_fn):
+    store = StatusStore(str(tmp_path / "status.db"))
+    store.open()
+    try:
+        return asyncio.run(coro_fn(store))
+    finally:
+        store.close()
+
+
+def test_out_of_order_receipts_keep_most_advanced_status(tmp_path):
+    """A late "delivered" does not downgrade "read" but its timestamp is kept."""
+    async def run(store):
+        store.record([{"id": "wamid.1", "status": "read", "timestamp": "1700000020", "recipient_id": "549"}])
+        store.record([{"id": "wamid.1", "status": "delivered", "timestamp": "1700000010"}])
+        store.record([{"id": "wamid.1", "status": "sent", "timestamp": "1700000005"}])
+        await store._submit(lambda conn: None)  # Wait for the queued writes
+        return await store.get("wamid.1")
+    
+    found = _with_store(tmp_path, run)
+    assert found["status"] == "read"
+    assert found["recipient"] == "549"
+    assert (found["sent_at"], found["delivered_at"], found["read_at"]) == (1700000005, 1700000010, 1700000020)
+
+
+def test_failed_status_records_error(tmp_path):
+    async def run(store):
+        store.record([{
+            "id": "wamid.2",
+            "status": "failed",
+            "timestamp": "1700000000",
+            "errors": [{"code": 131047, "title": "Re-engagement message"}]
+        }])
+        await store._submit(lambda conn: None)
+        return await store.get("wamid.2")
+    
+    found = _with_store(tmp_path, run)
+    assert found["status"] == "failed"
+    assert found["error"] == "131047: Re-engagement message"
+
+
+def test_get_many_and_unknown_events(tmp_path):
+    """Bulk lookups span parameter chunks; events without an id or known status are ignored."""
+    async def run(store):
+        store.record([{"id": f"wamid.{i}", "status": "sent", "timestamp": "1"} for i in range(1200)])
+        store.record([{"status": "sent"}, {"id": "wamid.x", "status": "deleted"}])
+        await store._submit(lambda conn: None)
+        found = await store.get_many([f"wamid.{i}" for i in range(1200)] + ["wamid.x"])
+        return found, store.stats()
+    
+    found, stats = _with_store(tmp_path, run)
+    assert len(found) == 1200
+    assert stats["recorded"] == 1200
+    assert stats["ignored"] == 2
+
+
+def test_prune_removes_stale_statuses(tmp_path):
+    async def run(store):
+        store.record([{"id": "wamid.old", "status": "sent"}])
+        pruned = await store.prune(time.time() + 1)
+        return pruned, await store.get("wamid.old")
+    
+    assert _with_store(tmp_path, run) == (1, None)
+
+
+def test_status_row_defaults_timestamp_to_now():
+    row = status_row({"id": "wamid.3", "status": "delivered"}, now=1700000000.5)
+    assert row[6] == 1700000000
@@ -0,0 +1,162 @@
+"""Tests for compiled message templates and the template cache."""
+import asyncio
+import httpx
+import pytest
+from src.templates import CompiledTemplate, TemplateCache, TemplateError
+from src.whatsapp_client import WhatsAppClient
+
+ORDER_SHIPPED = {
+    "name": "order_shipped",
+    "language": "es_AR",
+    "status": "APPROVED",
+    "category": "UTILITY",
+    "components": [
+        {"type": "HEADER", "format": "IMAGE"},
+        {"type": "BODY", "text": "Hola {{1}}, tu pedido {{2}} ya salió. Gracias {{1}}!"},
+        {"type": "FOOTER", "text": "Tienda"}
+    ]
+}
+
+
+def test_build_fills_parameters_into_prepared_payload():
+    """Parameters are substituted per recipient; the static parts are shared."""
+    template = CompiledTemplate(ORDER_SHIPPED)
+    assert template.body_params == ["1", "2"]
+    
+    first = template.build("+5491100000001", ["Ana", "A-1"], ["https://cdn.example.com/box.jpg"])
+    second = template.build("+5491100000002", ["Luis", "A-2"], ["https://cdn.example.com/box.jpg"])
+    
+    assert first["to"] == "5491100000001"
+    assert first["type"] == "template"
+    assert first["template"]["language"] == {"code": "es_AR"}
+    assert first["template"]["components"] == [
+        {"type": "header", "parameters": [{"type": "image", "image": {"link": "https://cdn.example.com/box.jpg"}}]},
+        {"type": "body", "parameters": [{"type": "text", "text": "Ana"}, {"type": "text", "text": "A-1"}]}
+    ]
+    assert second["template"]["language"] is first["template"]["language"]
+
+
+def test_build_named_parameters_and_mismatches():
+    """Named placeholders carry their names; wrong parameter counts are rejected."""
+    template = CompiledTemplate({
+        "name": "welcome",
+        "language": "en_US",
+        "components": [{"type": "BODY", "text": "Hi {{first_name}}"}]
+    })
+    payload = template.build("+15550001", ["Ana"])
+    assert payload["template"]["components"][0]["parameters"] == [
+        {"type": "text", "parameter_name": "first_name", "text": "Ana"}
+    ]
+    with pytest.raises(TemplateError):
+        template.build("+15550001", [])
+
+
+def test_cache_loads_once_and_refreshes_on_miss():
+    """Templates are fetched on first use; an unknown name triggers one refresh."""
+    fetches = []
+    
+    async def fetch():
+        fetches.append(1)
+        pending = {**ORDER_SHIPPED, "name": "promo", "status": "PENDING"}
+        return [ORDER_SHIPPED, pending]
+    
+    cache = TemplateCache(fetch, miss_refresh_interval=0)
+    
+    async def run():
+        first = await cache.get("order_shipped")
+        again = await cache.get("order_shipped", "es_AR")
+        assert first is again
+        with pytest.raises(TemplateError):
+            await cache.get("promo")
+    
+    asyncio.run(run())
+    assert len(fetches) == 2
+    assert cache.stats()["templates"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_concurrent_lookups_share_one_fetch():
+    """A cold start and a burst of misses each call the Graph API once."""
+    fetches = []
+    
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return [ORDER_SHIPPED]
+    
+    cache = TemplateCache(fetch, miss_refresh_interval=0)
+    
+    async def run():
+        await asyncio.gather(*(cache.get("order_shipped") for _ in range(10)))
+        assert len(fetches) == 1
+        results = await asyncio.gather(*(cache.get("promo") for _ in range(10)), return_exceptions=True)
+        assert all(isinstance(result, TemplateError) for result in results)
+    
+    asyncio.run(run())
+    assert len(fetches) == 2
+
+
+def test_cache_falls_back_to_saved_definitions(tmp_path):
+    """When the Graph API is down at startup the last saved definitions are used."""
+    path = tmp_path / "templates" / "waba.json"
+    
+    async def fetch_ok():
+        return [ORDER_SHIPPED]
+    
+    async def fetch_down():
+        raise httpx.ConnectError("down")
+    
+    asyncio.run(TemplateCache(fetch_ok, cache_path=str(path)).get("order_shipped"))
+    cache = TemplateCache(fetch_down, cache_path=str(path))
+    template = asyncio.run(cache.get("order_shipped"))
+    assert template.header_format == "IMAGE"
+    assert cache.stats()["refresh_failures"] == 1
+    
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(TemplateCache(fetch_down).get("order_shipped"))
+
+
+def test_failed_refreshes_back_off(tmp_path):
+    """While the Graph API is down, lookups and misses do not refetch on every call."""
+    path = tmp_path / "waba.json"
+    path.write_text('[{"name": "order_shipped", "language": "es_AR", "components": []}]')
+    fetches = []
+    
+    async def fetch_down():
+        fetches.append(1)
+        raise httpx.ConnectError("down")
+    
+    cache = TemplateCache(fetch_down, cache_path=str(path))
+    
+    async def run():
+        for _ in range(5):
+            await cache.get("order_shipped")
+            with pytest.raises(TemplateError):
+                await cache.get("promo")
+            await asyncio.sleep(0)
+    
+    asyncio.run(run())
+    assert len(fetches) == 1
+    assert cache.stats()["stale"] is True
+    
+    uncached = TemplateCache(fetch_down)
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            asyncio.run(uncached.get("order_shipped"))
+    assert len(fetches) == 2
+
+
+def test_client_lists_templates_across_pages():
+    """get_message_templates follows the Graph API paging links."""
+    def handler(request):
+        if request.url.params.get("after") == "2":
+            return httpx.Response(200, json={"data": [{"name": "b", "language": "es"}]})
+        assert request.url.path.endswith("/waba-1/message_templates")
+        return httpx.Response(200, json={
+            "data": [{"name": "a", "language": "es"}],
+            "paging": {"next": "https://graph.facebook.com/v18.0/waba-1/message_templates?after=2"}
+        })
+    
+    client = WhatsAppClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    templates = asyncio.run(client.get_message_templates("waba-1"))
+    assert [template["name"] for template in templates] == ["a", "b"]
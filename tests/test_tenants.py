@@ -0,0 +1,32 @@
+"""Tests for the tenant registry."""
+import json
+import pytest
+from src.tenants import Tenant, TenantRegistry, load_tenants
+
+
+def test_registry_lookup_and_default(tmp_path):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps([
+        {"phone_number_id": "111", "access_token": "token-a", "core_api_url": "http://core-a/unified"},
+        {"phone_number_id": "222", "access_token": "token-b", "messages_per_second": 20}
+    ]))
+    default = Tenant(phone_number_id="000", access_token="default-token")
+    registry = TenantRegistry(default, load_tenants(str(path)))
+    
+    assert len(registry) == 3
+    assert registry.get(None) is default
+    assert registry.get("111").core_api_url == "http://core-a/unified"
+    assert registry.get("999") is None
+
+
+def test_registry_file_entry_overrides_default():
+    default = Tenant(phone_number_id="000", access_token="from-settings")
+    registry = TenantRegistry(default, [Tenant(phone_number_id="000", access_token="from-file")])
+    assert len(registry) == 1
+    assert registry.get(None).access_token == "from-file"
+
+
+def test_registry_rejects_duplicates():
+    default = Tenant(phone_number_id="000", access_token="token")
+    with pytest.raises(ValueError):
+        TenantRegistry(default, [Tenant(phone_number_id="111", access_token="a"), Tenant(phone_number_id="111", access_token="b")])
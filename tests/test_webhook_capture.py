@@ -0,0 +1,56 @@
+"""Tests for webhook capture and replay."""
+import asyncio
+import httpx
+from benchmarks.replay_webhooks import replay
+from src.webhook_capture import WebhookCapture, capture_files, read_capture
+
+
+def test_capture_round_trip_with_rotation(tmp_path):
+    """Captured requests are read back in order; only the newest files are kept."""
+    capture = WebhookCapture(str(tmp_path), rotate_bytes=100, max_files=3)
+    capture.open()
+    for i in range(10):
+        capture.record(b'{"entry": [%d]}' % i, "sha256=abc" if i % 2 else None)
+    capture.close()
+    
+    assert capture.stats()["captured"] == 10
+    assert len(capture_files(str(tmp_path))) == 3
+    records = list(read_capture(str(tmp_path)))
+    assert [body for _, _, body in records] == [b'{"entry": [%d]}' % i for i in range(10)][-len(records):]
+    assert {signature for _, signature, _ in records} == {"sha256=abc", None}
+    assert [arrived_at for arrived_at, _, _ in records] == sorted(arrived_at for arrived_at, _, _ in records)
+
+
+def test_truncated_capture_is_read_up_to_the_last_record(tmp_path):
+    capture = WebhookCapture(str(tmp_path))
+    capture.open()
+    for i in range(3):
+        capture.record(b"x" * 1000 + bytes([i]))
+    capture.close()
+    
+    path = capture_files(str(tmp_path))[0]
+    data = path.read_bytes()
+    path.write_bytes(data[:-20])  # Crash before the gzip trailer and part of the last record
+    bodies = [body for _, _, body in read_capture(str(path))]
+    assert 1 <= len(bodies) <= 3
+    assert bodies == [b"x" * 1000 + bytes([i]) for i in range(len(bodies))]
+
+
+def test_replay_posts_bodies_with_their_signatures():
+    received = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append((request.content, request.headers.get("x-hub-signature-256")))
+        return httpx.Response(200 if request.content != b"bad" else 401)
+    
+    records = [(1000.0, "sha256=1", b"one"), (1000.05, None, b"bad"), (1000.1, "sha256=3", b"three")]
+    
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://service") as client:
+            return await replay(client, records, speed=10, concurrency=2)
+    
+    result = asyncio.run(run())
+    assert received == [(b"one", "sha256=1"), (b"bad", None), (b"three", "sha256=3")]
+    assert result["requests"] == 3
+    assert result["statuses"] == {"200": 2, "401": 1}
+    assert "lag_p99_ms" in result
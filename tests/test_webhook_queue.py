@@ -0,0 +1,63 @@
+"""Tests for the asynchronous webhook ingest queue."""
+import asyncio
+from src.webhook_queue import WebhookIngestQueue
+
+
+def test_queue_processes_and_drains():
+    """Queued items are processed by the workers and drained on stop."""
+    processed = []
+    
+    async def handler(item):
+        await asyncio.sleep(0.001)
+        processed.append(item)
+    
+    async def run():
+        queue = WebhookIngestQueue(handler, maxsize=100, workers=3)
+        await queue.start()
+        for i in range(20):
+            assert queue.enqueue({"n": i})
+        await queue.stop(drain_timeout=5)
+        return queue.stats()
+    
+    stats = asyncio.run(run())
+    assert len(processed) == 20
+    assert stats["processed"] == 20
+    assert stats["depth"] == 0
+    assert stats["running"] is False
+
+
+def test_queue_full_rejects():
+    """Enqueue reports backpressure instead of blocking when full."""
+    async def handler(item):
+        await asyncio.sleep(10)
+    
+    async def run():
+        queue = WebhookIngestQueue(handler, maxsize=1, workers=1)
+        await queue.start()
+        results = [queue.enqueue(i) for i in range(3)]
+        await queue.stop(drain_timeout=0.01)
+        return results, queue.stats()
+    
+    results, stats = asyncio.run(run())
+    assert results[0] is True
+    assert False in results
+    assert stats["rejected"] >= 1
+
+
+def test_handler_errors_are_counted():
+    """A failing handler does not kill the worker."""
+    async def handler(item):
+        if item == "bad":
+            raise ValueError("boom")
+    
+    async def run():
+        queue = WebhookIngestQueue(handler, maxsize=10, workers=1)
+        await queue.start()
+        queue.enqueue("bad")
+        queue.enqueue("good")
+        await queue.stop()
+        return queue.stats()
+    
+    stats = asyncio.run(run())
+    assert stats["failed"] == 1
+    assert stats["processed"] == 1
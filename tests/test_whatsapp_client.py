@@ -0,0 +1,171 @@
+"""Tests for the WhatsApp Cloud API client."""
+import asyncio
+import json
+import httpx
+from src.whatsapp_client import WhatsAppClient
+
+
+def _mock_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_send_text_reuses_injected_client():
+    """All sends go through the same injected pooled client."""
+    calls = []
+    
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"messages": [{"id": f"wamid.{len(calls)}"}]})
+    
+    http_client = _mock_client(handler)
+    client = WhatsAppClient(http_client=http_client)
+    
+    async def run():
+        first = await client.send_text_message("+5491112345678", "Hola")
+        second = await client.send_image_message("+5491112345678", "https://example.com/a.jpg", "Caption")
+        return first, second
+    
+    first, second = asyncio.run(run())
+    assert first["success"] and second["success"]
+    assert client.http_client is http_client
+    assert len(calls) == 2
+    assert calls[0].url.path.endswith("/messages")
+    assert calls[0].headers["Authorization"].startswith("Bearer ")
+
+
+def test_send_text_error_response():
+    """Non-200 responses are reported as failures with the status code."""
+    client = WhatsAppClient(http_client=_mock_client(
+        lambda request: httpx.Response(400, json={"error": {"code": 100}})
+    ))
+    
+    result = asyncio.run(client.send_text_message("+5491112345678", "Hola"))
+    assert result["success"] is False
+    assert result["status_code"] == 400
+
+
+def test_aclose_releases_client():
+    """Closing the client drops the pool; the next send creates a new one."""
+    client = WhatsAppClient(http_client=_mock_client(lambda request: httpx.Response(200, json={})))
+    asyncio.run(client.aclose())
+    assert client.http_client is None
+
+
+def test_image_uploaded_once_and_sent_by_id():
+    """Concurrent image sends share one upload and reference the media id."""
+    from src.media_uploads import MediaUploadCache
+    uploads = []
+    sent = []
+    
+    async def handler(request):
+        if request.url.host == "cdn.example.com":
+            return httpx.Response(200, content=b"jpeg", headers={"Content-Type": "image/jpeg"})
+        if request.url.path.endswith("/media"):
+            uploads.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"id": "media.1"})
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+    
+    cache = MediaUploadCache()
+    client = WhatsAppClient(http_client=_mock_client(handler), media_uploads=cache)
+    
+    async def run():
+        await asyncio.gather(*(
+            client.send_image_message(f"+54911000000{i}", "https://cdn.example.com/promo.jpg") for i in range(5)
+        ))
+        # Same content under another URL reuses the upload too
+        await client.send_image_message("+5491100000009", "https://cdn.example.com/promo-copy.jpg")
+    
+    asyncio.run(run())
+    assert len(uploads) == 1
+    assert b'name="type"' in uploads[0].content
+    assert all(payload["image"] == {"id": "media.1"} for payload in sent)
+    assert len(sent) == 6
+
+
+def test_image_falls_back_to_link_when_upload_fails():
+    from src.media_uploads import MediaUploadCache
+    sent = []
+    
+    def handler(request):
+        if request.url.host == "cdn.example.com":
+            return httpx.Response(404)
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+    
+    cache = MediaUploadCache()
+    client = WhatsAppClient(http_client=_mock_client(handler), media_uploads=cache)
+    result = asyncio.run(client.send_image_message("+5491100000001", "https://cdn.example.com/missing.jpg"))
+    assert result["success"]
+    assert sent[0]["image"] == {"link": "https://cdn.example.com/missing.jpg"}
+    assert cache.stats()["failures"] == 1
+
+
+def test_media_upload_cache_expiry_and_invalidation():
+    from src.media_uploads import MediaUploadCache
+    cache = MediaUploadCache(ttl=0)
+    cache.put("https://cdn.example.com/a.jpg", "media.1")
+    assert cache.get("https://cdn.example.com/a.jpg") is None
+    
+    cache = MediaUploadCache(max_entries=1)
+    cache.put("a", "media.a")
+    cache.put("b", "media.b")
+    assert cache.get("a") is None
+    cache.invalidate("media.b")
+    assert cache.get("b") is None
+
+
+def test_only_media_errors_invalidate_the_uploaded_id():
+    """A bad recipient keeps the cached media id; an expired media id drops it."""
+    from src.media_uploads import MediaUploadCache
+    errors = [
+        {"error": {"code": 131026, "message": "Message undeliverable"}},
+        {"error": {"code": 100, "message": "Invalid parameter", "error_data": {"details": "Param to is not a valid phone number"}}},
+        {"error": {"code": 131053, "message": "Media upload error"}}
+    ]
+    
+    def handler(request):
+        return httpx.Response(400, json=errors.pop(0))
+    
+    cache = MediaUploadCache()
+    cache.put("https://cdn.example.com/promo.jpg", "media.1")
+    client = WhatsAppClient(http_client=_mock_client(handler), media_uploads=cache)
+    for _ in range(2):
+        asyncio.run(client.send_image_message("+5491100000001", "https://cdn.example.com/promo.jpg"))
+        assert cache.get("https://cdn.example.com/promo.jpg") == "media.1"
+    asyncio.run(client.send_image_message("+5491100000001", "https://cdn.example.com/promo.jpg"))
+    assert cache.get("https://cdn.example.com/promo.jpg") is None
+
+
+def test_oversized_image_is_sent_by_link():
+    """Images over Meta's size limit are not buffered or uploaded; the link is sent instead."""
+    from src.media_uploads import MediaUploadCache
+    from src.whatsapp_client import IMAGE_MAX_BYTES
+    uploads = []
+    sent = []
+    
+    class EndlessStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            while True:
+                yield b"x" * 65536
+    
+    def handler(request):
+        if request.url.host == "cdn.example.com":
+            if request.url.path == "/large.jpg":
+                return httpx.Response(200, content=b"x" * (IMAGE_MAX_BYTES + 1))
+            return httpx.Response(200, stream=EndlessStream())
+        if request.url.path.endswith("/media"):
+            uploads.append(request)
+            return httpx.Response(200, json={"id": "media.1"})
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+    
+    client = WhatsAppClient(http_client=_mock_client(handler), media_uploads=MediaUploadCache())
+    for url in ("https://cdn.example.com/large.jpg", "https://cdn.example.com/endless.jpg"):
+        assert asyncio.run(client.send_image_message("+5491100000001", url))["success"]
+    assert uploads == []
+    assert [payload["image"] for payload in sent] == [
+        {"link": "https://cdn.example.com/large.jpg"},
+        {"link": "https://cdn.example.com/endless.jpg"}
+    ]
@@ -1,4 +1,5 @@
 """Basic tests for WhatsApp service."""
+import json
 import pytest
 from fastapi.testclient import TestClient
 from src.whatsapp_service import app
@@ -77,3 +78,633 @@ def test_webhook_receive_message():
     data = response.json()
     assert data["status"] == "ok"
 
+
+
+def test_stats_endpoint():
+    """Test the runtime stats endpoint."""
+    response = client.get("/stats")
+    assert response.status_code == 200
+    assert "ingest" in response.json()
+
+
+def test_webhook_async_mode_acks_immediately(monkeypatch):
+    """In async mode the webhook is queued and acked before processing."""
+    from src.config import settings
+    monkeypatch.setattr(settings, "webhook_async_processing", True)
+    payload = {"object": "whatsapp_business_account", "entry": [{"changes": [{"value": {}}]}]}
+    
+    with TestClient(app) as async_client:
+        response = async_client.post("/webhook/whatsapp", json=payload)
+        assert response.status_code == 200
+        assert response.json()["status"] == "queued"
+
+
+def _text_message_payload(message_id="wamid.test123"):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "changes": [{
+                "value": {
+                    "messages": [{
+                        "from": "5491112345678",
+                        "id": message_id,
+                        "timestamp": "1633024800",
+                        "text": {"body": "Hola"},
+                        "type": "text"
+                    }]
+                }
+            }]
+        }]
+    }
+
+
+def test_webhook_outbox_keeps_undelivered_messages(monkeypatch, tmp_path):
+    """Messages the core did not accept stay pending in the outbox."""
+    from src import whatsapp_service
+    from src.config import settings
+    monkeypatch.setattr(settings, "outbox_enabled", True)
+    monkeypatch.setattr(whatsapp_service.outbox, "path", tmp_path / "outbox.db")
+    
+    async def core_down(message):
+        return False
+    monkeypatch.setattr(whatsapp_service, "forward_to_core", core_down)
+    
+    with TestClient(app) as outbox_client:
+        response = outbox_client.post("/webhook/whatsapp", json=_text_message_payload("wamid.outbox"))
+        assert response.json()["status"] == "ok"
+        stats = outbox_client.get("/stats").json()["outbox"]
+        assert stats["operations"] >= 2
+
+
+def test_outbox_retries_keep_sender_order_and_skip_stale_deliveries(monkeypatch):
+    """Retries go through the ordered path; deliveries queued past the grace are left to the retrier."""
+    import asyncio
+    import time
+    from src import whatsapp_service
+    from src.models import NormalizedMessage
+    forwarded = []
+    
+    async def capture(message):
+        forwarded.append(message.message_id)
+        return True
+    monkeypatch.setattr(whatsapp_service, "forward_in_order", capture)
+    monkeypatch.setattr(whatsapp_service, "forward_to_core", capture)
+    
+    message = NormalizedMessage(sender="+5491100000001", message="Hola", timestamp="2025-10-05T12:00:00", message_id="wamid.retry")
+    assert asyncio.run(whatsapp_service._forward_outbox_entry(message.model_dump()))
+    stale = time.monotonic() - whatsapp_service.settings.outbox_queue_max_wait - 1
+    asyncio.run(whatsapp_service.deliver_messages([message], [1], stale))
+    assert forwarded == ["wamid.retry"]
+    assert whatsapp_service.outbox_inflight_grace() > whatsapp_service.settings.outbox_queue_max_wait + whatsapp_service.settings.http_timeout
+
+
+def test_webhook_drops_redelivered_messages(monkeypatch):
+    """A redelivered wamid is not forwarded to the core twice."""
+    from src import whatsapp_service
+    forwarded = []
+    
+    async def capture(message):
+        forwarded.append(message.message_id)
+        return True
+    monkeypatch.setattr(whatsapp_service, "forward_to_core", capture)
+    
+    for _ in range(2):
+        response = client.post("/webhook/whatsapp", json=_text_message_payload("wamid.redelivered"))
+        assert response.status_code == 200
+    assert forwarded == ["wamid.redelivered"]
+
+
+def test_bulk_send_streams_results(monkeypatch):
+    """The bulk endpoint streams one result per recipient plus a summary."""
+    from src import whatsapp_service
+    
+    async def fake_send(to, message):
+        return {"success": True, "data": {"messages": [{"id": f"wamid.{to}"}]}}
+    monkeypatch.setattr(whatsapp_service.whatsapp_client, "send_text_message", fake_send)
+    
+    response = client.post("/send/whatsapp/bulk", json=[
+        {"to": "+5491100000001", "message": "Hola"},
+        {"to": "+5491100000002", "message": "Hola", "message_type": "image"}
+    ])
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results = {line["index"]: line for line in lines if "index" in line}
+    assert results[0]["message_id"] == "wamid.+5491100000001"
+    assert "media_url is required" in results[1]["error"]
+    assert lines[-1]["summary"]["total"] == 2
+
+
+def test_metrics_endpoint():
+    """Webhook requests show up in the Prometheus metrics."""
+    client.post("/webhook/whatsapp", json={"object": "whatsapp_business_account"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'whatsapp_webhook_requests_total{status="no_entry"}' in response.text
+    assert "whatsapp_send_duration_seconds" in response.text
+    assert "# TYPE whatsapp_dedup_hits counter" in response.text
+    assert "whatsapp_service_window_avoided_sends_total " in response.text
+
+
+def test_bulk_send_accepts_ndjson_stream(monkeypatch):
+    """NDJSON bodies are read while results are being streamed back."""
+    from src import whatsapp_service
+    
+    async def fake_send(to, message):
+        return {"success": True, "data": {"messages": [{"id": f"wamid.{to}"}]}}
+    monkeypatch.setattr(whatsapp_service.whatsapp_client, "send_text_message", fake_send)
+    
+    body = "".join(json.dumps({"to": f"+54911000000{i}", "message": "Hola"}) + "\n" for i in range(3))
+    response = client.post("/send/whatsapp/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1]["summary"] == {"total": 3, "succeeded": 3, "failed": 0}
+
+
+
+@pytest.mark.parametrize("content_type", ["application/json", "application/x-ndjson"])
+def test_bulk_send_stops_when_the_client_disconnects(monkeypatch, content_type):
+    """Aborting a bulk request cancels the sends that have not started yet."""
+    import asyncio
+    from src import whatsapp_service
+    from src.config import settings
+    monkeypatch.setattr(settings, "bulk_send_concurrency", 2)
+    sent = []
+    
+    async def fake_send(to, message):
+        sent.append(to)
+        await asyncio.sleep(0.01)
+        return {"success": True, "data": {"messages": [{"id": f"wamid.{to}"}]}}
+    monkeypatch.setattr(whatsapp_service.whatsapp_client, "send_text_message", fake_send)
+    
+    items = [{"to": f"+5491100{i:06d}", "message": "Hola"} for i in range(200)]
+    if content_type == "application/json":
+        body = json.dumps(items).encode()
+    else:
+        body = b"".join(json.dumps(item).encode() + b"\n" for item in items)
+    
+    async def run():
+        disconnected = asyncio.Event()
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                disconnected.set()  # The client reads one result and goes away
+        
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": "/send/whatsapp/bulk", "raw_path": b"/send/whatsapp/bulk",
+            "query_string": b"", "root_path": "", "client": ("test", 1), "server": ("test", 80),
+            "headers": [(b"content-type", content_type.encode())]
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+        stopped_at = len(sent)
+        await asyncio.sleep(0.05)
+        return stopped_at
+    
+    stopped_at = asyncio.run(run())
+    assert stopped_at < len(items)
+    assert len(sent) == stopped_at
+
+def test_webhook_invalid_json_is_acknowledged():
+    """Malformed bodies are reported but still acknowledged with 200."""
+    response = client.post("/webhook/whatsapp", content=b"{not json", headers={"Content-Type": "application/json"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "error"
+
+
+def test_normalize_message_fast_path():
+    """Normalized messages built without validation still serialize correctly."""
+    from src.whatsapp_service import normalize_message, to_unified_message
+    message = {"from": "5491112345678", "id": "wamid.fast", "timestamp": "1633024800", "type": "text", "text": {"body": "Hola"}}
+    unified = to_unified_message(normalize_message(message, {}))
+    assert unified["sender"] == "+5491112345678"
+    assert unified["message"] == "Hola"
+    assert unified["channel"] == "whatsapp"
+
+
+def test_webhook_signature_required_when_secret_set(monkeypatch):
+    """With an app secret configured, unsigned webhooks are rejected."""
+    import hashlib
+    import hmac
+    from src import whatsapp_service
+    monkeypatch.setattr(whatsapp_service, "app_secret", b"app_secret")
+    body = json.dumps({"object": "whatsapp_business_account"}).encode()
+    
+    forged = client.post("/webhook/whatsapp", content=body)
+    assert forged.status_code == 401
+    
+    signature = "sha256=" + hmac.new(b"app_secret", body, hashlib.sha256).hexdigest()
+    signed = client.post("/webhook/whatsapp", content=body, headers={"X-Hub-Signature-256": signature})
+    assert signed.status_code == 200
+
+
+def test_message_status_endpoints(monkeypatch, tmp_path):
+    """Receipts from webhooks are queryable by wamid, singly and in bulk."""
+    from src import whatsapp_service
+    from src.config import settings
+    monkeypatch.setattr(settings, "status_store_enabled", True)
+    monkeypatch.setattr(whatsapp_service.status_store, "path", tmp_path / "status.db")
+    
+    async def fake_send(to, message):
+        return {"success": True, "data": {"messages": [{"id": "wamid.sent"}]}}
+    monkeypatch.setattr(whatsapp_service.whatsapp_client, "send_text_message", fake_send)
+    
+    statuses = [
+        {"id": "wamid.sent", "status": "read", "timestamp": "1700000020", "recipient_id": "5491100000001"},
+        {"id": "wamid.sent", "status": "delivered", "timestamp": "1700000010", "recipient_id": "5491100000001"}
+    ]
+    payload = {"object": "whatsapp_business_account", "entry": [{"id": "1", "changes": [
+        {"field": "messages", "value": {"messaging_product": "whatsapp", "statuses": statuses}}
+    ]}]}
+    
+    with TestClient(app) as status_client:
+        assert status_client.post("/send/whatsapp", json={"to": "+5491100000001", "message": "Hola"}).json()["success"]
+        status_client.post("/webhook/whatsapp", json=payload)
+        
+        found = status_client.get("/messages/wamid.sent/status").json()
+        assert found["status"] == "read"
+        assert found["delivered_at"] == 1700000010
+        assert found["accepted_at"] is not None
+        assert status_client.get("/messages/wamid.unknown/status").status_code == 404
+        
+        bulk = status_client.post("/messages/statuses", json={"message_ids": ["wamid.sent", "wamid.unknown"]}).json()
+        assert [s["message_id"] for s in bulk["statuses"]] == ["wamid.sent"]
+        assert bulk["missing"] == ["wamid.unknown"]
+    
+    assert client.get("/messages/wamid.sent/status").status_code == 503
+
+
+def test_media_message_forwarded_with_local_reference(monkeypatch):
+    """Media messages keep their media id and are forwarded after the download."""
+    from src import whatsapp_service
+    from src.config import settings
+    monkeypatch.setattr(settings, "media_download_enabled", True)
+    forwarded = []
+    
+    async def capture(message):
+        forwarded.append(whatsapp_service.to_unified_message(message))
+        return True
+    
+    async def fake_fetch(media_id, client=None):
+        return {"path": "/cache/ab/abc.jpg", "sha256": "abc", "mime_type": "image/jpeg", "size": 3, "cached": False}
+    monkeypatch.setattr(whatsapp_service, "forward_to_core", capture)
+    monkeypatch.setattr(whatsapp_service.media_downloader, "fetch", fake_fetch)
+    
+    payload = _text_message_payload("wamid.media")
+    message = payload["entry"][0]["changes"][0]["value"]["messages"][0]
+    message["type"] = "image"
+    message["image"] = {"id": "media.1", "mime_type": "image/jpeg", "caption": "Foto"}
+    
+    with TestClient(app) as media_client:
+        media_client.post("/webhook/whatsapp", json=payload)
+    
+    assert forwarded[0]["media_id"] == "media.1"
+    assert forwarded[0]["media_path"] == "/cache/ab/abc.jpg"
+
+
+def test_multi_tenant_routing(monkeypatch):
+    """Sends use the client named by "from"; inbound messages go to their tenant's core."""
+    from src import whatsapp_service
+    from src.whatsapp_client import WhatsAppClient
+    
+    tenant_client = WhatsAppClient(phone_number_id="TENANT_B", access_token="token-b")
+    sent_from = []
+    
+    async def fake_send(to, message):
+        sent_from.append(tenant_client.phone_number_id)
+        return {"success": True, "data": {"messages": [{"id": "wamid.b"}]}}
+    monkeypatch.setattr(tenant_client, "send_text_message", fake_send)
+    monkeypatch.setitem(whatsapp_service.whatsapp_clients, "TENANT_B", tenant_client)
+    
+    class FakeCore:
+        def __init__(self):
+            self.received = []
+        
+        async def send_message(self, message):
+            self.received.append(message)
+            return {"success": True, "status_code": 200, "data": None}
+    tenant_core = FakeCore()
+    monkeypatch.setitem(whatsapp_service.core_clients, "TENANT_B", tenant_core)
+    
+    response = client.post("/send/whatsapp", json={"from": "TENANT_B", "to": "+5491100000001", "message": "Hola"})
+    assert response.json()["message_id"] == "wamid.b"
+    assert sent_from == ["TENANT_B"]
+    assert client.post("/send/whatsapp", json={"from": "UNKNOWN", "to": "+1", "message": "Hola"}).status_code == 400
+    
+    payload = _text_message_payload("wamid.tenant")
+    payload["entry"][0]["changes"][0]["value"]["metadata"] = {"phone_number_id": "TENANT_B"}
+    client.post("/webhook/whatsapp", json=payload)
+    assert tenant_core.received[0]["phone_number_id"] == "TENANT_B"
+    assert tenant_core.received[0]["message_id"] == "wamid.tenant"
+
+
+def test_unregistered_phone_number_id_is_reported_once(monkeypatch):
+    """Messages for a phone number id with no tenant log one warning per id, not one per message."""
+    from src import whatsapp_service
+    warnings = []
+    monkeypatch.setattr(whatsapp_service.logger, "warning", lambda msg, *args: warnings.append(args))
+    monkeypatch.setattr(whatsapp_service, "_unregistered_phone_number_ids", set())
+    
+    for message_id in ("wamid.unregistered.1", "wamid.unregistered.2"):
+        payload = _text_message_payload(message_id)
+        payload["entry"][0]["changes"][0]["value"]["metadata"] = {"phone_number_id": "UNREGISTERED"}
+        whatsapp_service.extract_messages(payload)
+    assert warnings == [("UNREGISTERED",)]
+
+
+def test_ordered_forwarding_keeps_sender_order(monkeypatch):
+    """With async workers and ordered forwarding, a sender's messages reach the core in order."""
+    import asyncio
+    import random
+    from src import whatsapp_service
+    from src.config import settings
+    monkeypatch.setattr(settings, "webhook_async_processing", True)
+    monkeypatch.setattr(settings, "ordered_forwarding_enabled", True)
+    forwarded = []
+    
+    async def slow_core(message):
+        await asyncio.sleep(random.uniform(0, 0.005))
+        forwarded.append(message.message_id)
+        return True
+    monkeypatch.setattr(whatsapp_service, "forward_to_core", slow_core)
+    
+    with TestClient(app) as ordered_client:
+        for i in range(20):
+            ordered_client.post("/webhook/whatsapp", json=_text_message_payload(f"wamid.order.{i}"))
+    
+    assert forwarded == [f"wamid.order.{i}" for i in range(20)]
+
+
+def test_ordered_forwarding_keeps_media_in_place(monkeypatch):
+    """A text sent after a media message waits for the media download instead of overtaking it."""
+    import asyncio
+    from src import whatsapp_service
+    from src.config import settings
+    monkeypatch.setattr(settings, "ordered_forwarding_enabled", True)
+    monkeypatch.setattr(settings, "media_download_enabled", True)
+    forwarded = []
+    
+    async def capture(message):
+        forwarded.append((message.message_id, message.media_path))
+        return True
+    
+    async def slow_fetch(media_id, client=None):
+        await asyncio.sleep(0.05)
+        return {"path": "/cache/ab/abc.jpg", "sha256": "abc", "mime_type": "image/jpeg", "size": 3, "cached": False}
+    monkeypatch.setattr(whatsapp_service, "forward_to_core", capture)
+    monkeypatch.setattr(whatsapp_service.media_downloader, "fetch", slow_fetch)
+    
+    payload = _text_message_payload("wamid.photo")
+    messages = payload["entry"][0]["changes"][0]["value"]["messages"]
+    messages[0]["type"] = "image"
+    messages[0]["image"] = {"id": "media.1", "mime_type": "image/jpeg"}
+    messages.append(_text_message_payload("wamid.after")["entry"][0]["changes"][0]["value"]["messages"][0])
+    
+    with TestClient(app) as ordered_client:
+        ordered_client.post("/webhook/whatsapp", json=payload)
+    
+    assert forwarded == [("wamid.photo", "/cache/ab/abc.jpg"), ("wamid.after", None)]
+
+
+def test_send_template_message(monkeypatch):
+    """Template sends resolve the sender's compiled template and post a template payload."""
+    from src import whatsapp_service
+    from src.templates import TemplateCache
+    
+    async def fetch():
+        return [{
+            "name": "order_shipped",
+            "language": "es_AR",
+            "status": "APPROVED",
+            "components": [{"type": "BODY", "text": "Hola {{1}}, tu pedido {{2}} ya salió"}]
+        }]
+    monkeypatch.setitem(whatsapp_service.template_caches, whatsapp_service.whatsapp_client.phone_number_id, TemplateCache(fetch))
+    
+    posted = []
+    
+    async def fake_post(to, payload, kind):
+        posted.append(payload)
+        return {"success": True, "data": {"messages": [{"id": "wamid.template"}]}}
+    monkeypatch.setattr(whatsapp_service.whatsapp_client, "_post_message", fake_post)
+    
+    response = client.post("/send/whatsapp", json={
+        "to": "+5491100000001",
+        "message_type": "template",
+        "template_name": "order_shipped",
+        "template_params": ["Ana", "A-1"]
+    })
+    assert response.json()["message_id"] == "wamid.template"
+    assert posted[0]["template"]["name"] == "order_shipped"
+    assert posted[0]["template"]["components"][0]["parameters"][1] == {"type": "text", "text": "A-1"}
+    
+    wrong = client.post("/send/whatsapp", json={
+        "to": "+5491100000001",
+        "message_type": "template",
+        "template_name": "order_shipped",
+        "template_params": ["Ana"]
+    })
+    assert wrong.status_code == 400
+    assert client.post("/send/whatsapp", json={"to": "+5491100000001"}).status_code == 400
+
+
+def test_conversation_history_endpoint(monkeypatch, tmp_path):
+    """Inbound webhooks and outbound sends are listed newest first with cursor pagination."""
+    import asyncio
+    from src import whatsapp_service
+    from src.config import settings
+    
+    monkeypatch.setattr(settings, "conversations_enabled", True)
+    monkeypatch.setattr(whatsapp_service.conversation_store, "path", tmp_path / "conversations.db")
+    
+    async def fake_send(to, message):
+        return {"success": True, "data": {"messages": [{"id": "wamid.reply"}]}}
+    
+    async def capture(message):
+        return True
+    monkeypatch.setattr(whatsapp_service.whatsapp_client, "send_text_message", fake_send)
+    monkeypatch.setattr(whatsapp_service, "forward_to_core", capture)
+    
+    assert client.get("/conversations/+5491112345678").status_code == 503
+    with TestClient(app) as history_client:
+        history_client.post("/webhook/whatsapp", json=_text_message_payload("wamid.history"))
+        history_client.post("/send/whatsapp", json={"to": "+5491112345678", "message": "Respuesta"})
+        
+        async def committed():
+            await whatsapp_service.conversation_store._submit(lambda conn: None)
+        asyncio.run(committed())  # Records are written without waiting
+        
+        first = history_client.get("/conversations/5491112345678", params={"limit": 1}).json()
+        assert [m["direction"] for m in first["messages"]] == ["outbound"]
+        second = history_client.get("/conversations/5491112345678", params={"limit": 1, "cursor": first["next_cursor"]}).json()
+        assert second["messages"][0]["message_id"] == "wamid.history"
+        assert second["next_cursor"] is None
+        assert history_client.get("/conversations/5491112345678", params={"cursor": "bogus"}).status_code == 400
+
+
+def test_export_endpoint(monkeypatch, tmp_path):
+    """The export endpoint streams the recorded statuses as NDJSON."""
+    import asyncio
+    from src import whatsapp_service
+    from src.config import settings
+    
+    path = tmp_path / "status.db"
+    monkeypatch.setattr(settings, "status_store_enabled", True)
+    monkeypatch.setattr(settings, "status_store_path", str(path))
+    monkeypatch.setattr(whatsapp_service.status_store, "path", path)
+    
+    monkeypatch.setattr(settings, "conversations_path", str(tmp_path / "missing.db"))
+    assert client.get("/export/messages", params={"since": 0}).status_code == 404
+    with TestClient(app) as export_client:
+        whatsapp_service.status_store.record_accepted("wamid.exported", "+5491100000001")
+        
+        async def committed():
+            await whatsapp_service.status_store._submit(lambda conn: None)
+        asyncio.run(committed())
+        
+        response = export_client.get("/export/statuses")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert records[0]["message_id"] == "wamid.exported"
+        assert records[0]["status"] == "accepted"
+        assert export_client.get("/export/statuses", params={"format": "csv"}).status_code == 422
+
+
+def test_service_window_policy(monkeypatch):
+    """Free-form sends to customers outside the 24h window never reach the Graph API."""
+    import time
+    from src import whatsapp_service
+    from src.config import settings
+    from src.service_window import ServiceWindowTracker
+    from src.templates import TemplateCache
+    
+    monkeypatch.setattr(settings, "service_window_policy", "reject")
+    monkeypatch.setattr(whatsapp_service, "service_windows", ServiceWindowTracker())
+    posted = []
+    
+    async def fake_post(to, payload, kind):
+        posted.append(payload)
+        return {"success": True, "data": {"messages": [{"id": f"wamid.{len(posted)}"}]}}
+    
+    async def capture(message):
+        return True
+    monkeypatch.setattr(whatsapp_service.whatsapp_client, "_post_message", fake_post)
+    monkeypatch.setattr(whatsapp_service, "forward_to_core", capture)
+    
+    rejected = client.post("/send/whatsapp", json={"to": "+5491112345678", "message": "Hola"}).json()
+    assert rejected["success"] is False
+    assert rejected["details"]["code"] == 131047
+    assert posted == []
+    
+    payload = _text_message_payload("wamid.window")
+    payload["entry"][0]["changes"][0]["value"]["messages"][0]["timestamp"] = str(int(time.time()))
+    client.post("/webhook/whatsapp", json=payload)
+    assert client.post("/send/whatsapp", json={"to": "+5491112345678", "message": "Hola"}).json()["success"] is True
+    assert posted[0]["type"] == "text"
+    
+    async def fetch():
+        return [{"name": "follow_up", "language": "es_AR", "components": [{"type": "BODY", "text": "Tenemos novedades: {{1}}"}]}]
+    monkeypatch.setattr(settings, "service_window_policy", "template")
+    monkeypatch.setattr(settings, "service_window_template", "follow_up")
+    monkeypatch.setitem(whatsapp_service.template_caches, whatsapp_service.whatsapp_client.phone_number_id, TemplateCache(fetch))
+    assert client.post("/send/whatsapp", json={"to": "+5491100000009", "message": "Hola"}).json()["success"] is True
+    assert posted[1]["template"]["components"][0]["parameters"] == [{"type": "text", "text": "Hola"}]
+    assert whatsapp_service.service_windows.stats()["avoided_sends"] == 1
+    assert whatsapp_service.service_windows.stats()["rerouted_to_template"] == 1
+
+
+def test_webhook_capture(monkeypatch, tmp_path):
+    """With capture enabled, raw bodies of verified webhooks are written for replay."""
+    import hashlib
+    import hmac
+    from src import whatsapp_service
+    from src.config import settings
+    from src.webhook_capture import read_capture
+    
+    async def capture(message):
+        return True
+    monkeypatch.setattr(settings, "webhook_capture_enabled", True)
+    monkeypatch.setattr(whatsapp_service.webhook_capture, "directory", tmp_path)
+    monkeypatch.setattr(whatsapp_service, "forward_to_core", capture)
+    monkeypatch.setattr(whatsapp_service, "app_secret", b"app_secret")
+    
+    body = json.dumps(_text_message_payload("wamid.captured")).encode()
+    forged = json.dumps(_text_message_payload("wamid.forged")).encode()
+    signature = "sha256=" + hmac.new(b"app_secret", body, hashlib.sha256).hexdigest()
+    with TestClient(app) as capture_client:
+        for content in (forged, body):
+            capture_client.post(
+                "/webhook/whatsapp",
+                content=content,
+                headers={"Content-Type": "application/json", "X-Hub-Signature-256": signature}
+            )
+        assert capture_client.get("/stats").json()["capture"]["enabled"] is True
+    
+    records = list(read_capture(str(tmp_path)))
+    assert [record[2] for record in records] == [body]
+
+
+def test_core_reply_is_sent_without_a_second_request(monkeypatch):
+    """A reply in the core's response is sent to the sender through the pooled client."""
+    from src import whatsapp_service
+    from src.config import settings
+    monkeypatch.setattr(settings, "core_replies_enabled", True)
+    posted = []
+    
+    async def fake_post(to, payload, kind):
+        posted.append((to, payload))
+        return {"success": True, "data": {"messages": [{"id": f"wamid.reply{len(posted)}"}]}}
+    monkeypatch.setattr(whatsapp_service.whatsapp_client, "_post_message", fake_post)
+    
+    async def fake_core(message):
+        return {"success": True, "status_code": 200, "data": {"reply": [
+            "¡Hola! ¿En qué te ayudo?",
+            {"message_type": "image", "media_url": "https://example.com/menu.png", "message": "Menú"},
+            {"message_type": "video"}
+        ]}}
+    monkeypatch.setattr(whatsapp_service.core_client, "send_message", fake_core)
+    
+    with TestClient(app) as reply_client:
+        reply_client.post("/webhook/whatsapp", json=_text_message_payload("wamid.conversation"))
+    assert [to for to, _ in posted] == ["+5491112345678", "+5491112345678"]
+    assert posted[0][1]["text"]["body"] == "¡Hola! ¿En qué te ayudo?"
+    assert posted[1][1]["image"]["link"] == "https://example.com/menu.png"
+    assert 'whatsapp_core_replies_total{result="invalid"} 1' in client.get("/metrics").text
+
+
+def test_core_reply_does_not_hold_up_the_forward(monkeypatch):
+    """The forward completes while the reply is still being sent."""
+    import asyncio
+    from src import whatsapp_service
+    from src.config import settings
+    from src.models import NormalizedMessage
+    monkeypatch.setattr(settings, "core_replies_enabled", True)
+    posted = []
+    
+    async def fake_core(message):
+        return {"success": True, "status_code": 200, "data": {"reply": "Gracias"}}
+    monkeypatch.setattr(whatsapp_service.core_client, "send_message", fake_core)
+    
+    async def run():
+        release = asyncio.Event()
+        
+        async def slow_post(to, payload, kind):
+            await release.wait()
+            posted.append(to)
+            return {"success": True, "data": {"messages": [{"id": "wamid.reply"}]}}
+        monkeypatch.setattr(whatsapp_service.whatsapp_client, "_post_message", slow_post)
+        
+        await whatsapp_service.reply_scheduler.start()
+        message = NormalizedMessage(sender="+5491100000001", message="Hola", timestamp="2025-10-05T12:00:00", message_id="wamid.fast")
+        assert await asyncio.wait_for(whatsapp_service.forward_to_core(message), timeout=1)
+        assert posted == []
+        release.set()
+        await whatsapp_service.reply_scheduler.stop()
+    
+    asyncio.run(run())
+    assert posted == ["+5491100000001"]